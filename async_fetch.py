@@ -0,0 +1,282 @@
+import asyncio
+import argparse
+import json
+import logging
+import os
+import time
+import urllib.parse as urlparse
+from datetime import datetime
+from functools import partial
+
+import aiohttp
+import pytz
+
+from bms_request import BASE_URL, DEFAULT_EVENT_CODE, build_city_request, load_cities, save_data
+from http_pool import ConnectionStats
+from coverage_cache import CoverageCache
+from delta_capture import DeltaCapture
+from snapshot_store import SnapshotStore
+from region_index import DedupIndex, plan_regions
+from rollups import RollupEngine
+from rate_limit import AdaptiveConcurrency, RateLimiter, is_throttle, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def connection_trace_config(stats):
+    """
+    Builds an aiohttp TraceConfig that counts requests and newly opened connections.
+    Args:
+        stats (ConnectionStats): Counters to update.
+    Returns:
+        aiohttp.TraceConfig
+    """
+    async def on_request_start(session, context, params):
+        stats.record(requests=1)
+
+    async def on_connection_create_end(session, context, params):
+        stats.record(new_connections=1)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+def snapshot_timestamp():
+    """
+    Returns:
+        str: Current IST time formatted as a snapshot id, e.g. '20240924_153045'.
+    """
+    return datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%Y%m%d_%H%M%S')
+
+
+def create_snapshot_directory(base_directory='data'):
+    """
+    Creates the data/<IST timestamp>/ directory for a sweep.
+    Args:
+        base_directory (str): Parent directory for all snapshots.
+    Returns:
+        str: Path of the created snapshot directory.
+    """
+    directory_name = os.path.join(base_directory, snapshot_timestamp())
+    os.makedirs(directory_name, exist_ok=True)
+    logger.info(f"Created directory: {directory_name}")
+    print(f"Created time-stamped directory: '{directory_name}'.")
+    return directory_name
+
+
+async def fetch_city_async(session, city, concurrency, limiter, proxy_pool=None,
+                           base_url=BASE_URL, event_code=DEFAULT_EVENT_CODE,
+                           retries=3, backoff_factor=2, date_code=None):
+    """
+    Fetches data for a single city without blocking the event loop.
+    Args:
+        session (aiohttp.ClientSession): Shared client session.
+        city (dict): City data dictionary.
+        concurrency (AdaptiveConcurrency): Limit on in-flight requests, adjusted on throttling.
+        limiter (RateLimiter): Per-host and per-proxy rate budgets.
+        proxy_pool (ProxyPool): Optional scored proxy pool; requests go direct without one.
+        base_url (str): Endpoint to fetch from (live API or a replay server).
+        event_code (str): BookMyShow event code.
+        retries (int): Number of retry attempts.
+        backoff_factor (int): Backoff factor for sleep between retries.
+        date_code (str): Show date as YYYYMMDD (None for the server's default date).
+    Returns:
+        dict or str: JSON data if successful, raw text otherwise, None on failure.
+    """
+    url, headers = build_city_request(city, event_code, base_url, date_code)
+    host = urlparse.urlsplit(url).netloc
+    code = city['sub_region_code']
+
+    for attempt in range(retries):
+        proxy = proxy_pool.choose() if proxy_pool else None
+        started = time.perf_counter()
+        try:
+            await limiter.acquire_async(host, proxy)
+            async with concurrency.async_slot():
+                logger.debug(f"Attempt {attempt + 1}: Sending GET request to {url} using proxy {proxy}")
+                async with session.get(url, headers=headers,
+                                       proxy=f"http://{proxy}" if proxy else None) as response:
+                    text = await response.text()
+                    concurrency.record(response.status)
+                    if is_throttle(response.status):
+                        # Only a direct request's throttle pauses the shared host bucket; a proxy throttles alone
+                        limiter.penalize(None if proxy else host, proxy,
+                                         seconds=retry_after_seconds(response, default=30))
+                    response.raise_for_status()
+            try:
+                data = json.loads(text)
+            except ValueError:
+                logger.warning(f"Response is not in JSON format for city {code}.")
+                return text
+            if proxy:
+                proxy_pool.report_success(proxy, time.perf_counter() - started)
+            logger.info(f"Data fetched successfully for city: {code}")
+            return data
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"HTTP error for city {code}: {e.status} {e.message}")
+            if proxy:
+                proxy_pool.report_failure(proxy, f"HTTP {e.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Request exception for city {code}: {e!r}")
+            if proxy:
+                proxy_pool.report_failure(proxy, type(e).__name__)
+
+        # Exponential backoff before retrying; the concurrency slot is released while waiting
+        if attempt + 1 < retries:
+            await asyncio.sleep(backoff_factor ** attempt)
+
+    logger.error(f"All {retries} attempts failed for city {code}.")
+    return None
+
+
+async def fetch_and_save_all_cities_async(cities, save, concurrency=200,
+                                          host_rate=50.0, proxy_rate=0.5, proxy_pool=None,
+                                          base_url=BASE_URL, event_code=DEFAULT_EVENT_CODE,
+                                          timeout=30, trace_configs=None):
+    """
+    Fetches all cities concurrently and saves each response as soon as it arrives.
+    Args:
+        cities (list): List of city dictionaries.
+        save (callable): save(region_code, data), run in a worker thread as each response arrives.
+        concurrency (int): Maximum number of in-flight requests.
+        host_rate (float): Requests per second allowed per host (0 disables the limit).
+        proxy_rate (float): Requests per second allowed per proxy (0 disables the limit).
+        proxy_pool (ProxyPool): Optional scored proxy pool; requests go direct without one.
+        base_url (str): Endpoint to fetch from (live API or a replay server).
+        event_code (str): BookMyShow event code.
+        timeout (int): Total timeout in seconds for one request.
+        trace_configs (list): Extra aiohttp TraceConfigs, e.g. for latency measurements.
+    Returns:
+        tuple: (success_count, failure_count)
+    """
+    controller = AdaptiveConcurrency(initial=min(50, concurrency), max_limit=concurrency)
+    limiter = RateLimiter(host_rate=host_rate, proxy_rate=proxy_rate)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    connection_stats = ConnectionStats()
+
+    success_count = 0
+    failure_count = 0
+    total_cities = len(cities)
+    start = time.perf_counter()
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                     trace_configs=[connection_trace_config(connection_stats),
+                                                    *(trace_configs or [])]) as session:
+
+        async def fetch_and_save(city):
+            # One region's failure (a bad payload, a full disk) must not abort the rest of the sweep
+            try:
+                data = await fetch_city_async(session, city, controller, limiter, proxy_pool,
+                                              base_url, event_code)
+                if data:
+                    # Keyed by sub-region so overlapping sub-regions of one city don't overwrite each other
+                    await asyncio.to_thread(save, city['sub_region_code'], data)
+            except Exception as e:
+                logger.error(f"Unhandled exception for city {city['sub_region_code']}: {e!r}")
+                return city, None
+            return city, data
+
+        tasks = [asyncio.create_task(fetch_and_save(city)) for city in cities]
+        for completed, task in enumerate(asyncio.as_completed(tasks), start=1):
+            city, data = await task
+            if data:
+                success_count += 1
+            else:
+                logger.warning(f"No data returned for city {city['sub_region_code']}.")
+                failure_count += 1
+            if completed % 100 == 0 or completed == total_cities:
+                print(f"Progress: {completed}/{total_cities} cities processed.")
+
+    elapsed = time.perf_counter() - start
+    summary = (
+        f"Data fetching completed: {success_count} succeeded, {failure_count} failed "
+        f"in {elapsed:.1f}s ({total_cities / elapsed if elapsed else 0:.1f} cities/s)."
+    )
+    print(summary)
+    logger.info(summary)
+    logger.info(f"Final concurrency limit {controller.limit}, {controller.throttles} throttled responses.")
+    stats = connection_stats.snapshot()
+    print(f"Connection reuse: {stats['reused']}/{stats['requests']} requests ({stats['reuse_rate']:.1%}), "
+          f"{stats['new_connections']} new connections.")
+    return success_count, failure_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio sweep of showtimes-by-event over all regions.")
+    parser.add_argument('--cities', default='region_data_output.json', help="City data JSON file.")
+    parser.add_argument('--base-url', default=BASE_URL, help="Endpoint, e.g. a local replay server.")
+    parser.add_argument('--event-code', default=DEFAULT_EVENT_CODE)
+    parser.add_argument('--concurrency', type=int, default=200, help="Maximum in-flight requests.")
+    parser.add_argument('--host-rate', type=float, default=50.0, help="Requests/sec per host, 0 = unlimited.")
+    parser.add_argument('--format', choices=['parquet', 'delta', 'json'], default='parquet',
+                        help="parquet: columnar snapshot store, delta: only changed seat availability, "
+                             "json: legacy data/<timestamp>/<CODE>.json files.")
+    parser.add_argument('--output', default=None,
+                        help="Snapshot store root (parquet), database file (delta) or base directory (json).")
+    parser.add_argument('--keep-raw', action='store_true', help="Also keep gzipped raw JSON (parquet format).")
+    parser.add_argument('--cover', action='store_true',
+                        help="Only fetch the minimal set of regions covering all venues in the snapshot store.")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Store each venue/session/category once per snapshot (parquet format).")
+    parser.add_argument('--skip-empty', action='store_true',
+                        help="Skip regions recently known to have no shows and fetch the largest regions first.")
+    parser.add_argument('--coverage-db', default=None, help="Coverage cache database (default: snapshots/coverage.db).")
+    parser.add_argument('--rollups', action='store_true', help="Keep city/language/national totals as regions arrive.")
+    args = parser.parse_args()
+
+    cities = load_cities(args.cities)
+    if not cities:
+        return
+    if args.cover:
+        cover, _ = plan_regions(SnapshotStore(args.output or 'snapshots'))
+        if cover:
+            planned = set(cover)
+            cities = [city for city in cities if city['sub_region_code'] in planned]
+            print(f"Fetching {len(cities)} regions covering all previously seen venues.")
+        else:
+            print("No snapshot history to plan from; fetching all regions.")
+    if args.format == 'json':
+        save = partial(save_data, create_snapshot_directory(args.output or 'data'))
+    elif args.format == 'delta':
+        capture = DeltaCapture(args.output) if args.output else DeltaCapture()
+        save = partial(capture.write_region, snapshot_timestamp())
+    else:
+        store = SnapshotStore(args.output or 'snapshots', keep_raw=args.keep_raw,
+                              dedup_index=DedupIndex() if args.dedup else None)
+        save = partial(store.write_region, snapshot_timestamp())
+    if args.skip_empty:
+        coverage = CoverageCache(args.coverage_db) if args.coverage_db else CoverageCache()
+        cities, skipped = coverage.plan(args.event_code, cities)
+        print(f"Fetching {len(cities)} regions, skipping {len(skipped)} known-empty regions.")
+        store_region = save
+
+        def save(region_code, data):
+            store_region(region_code, data)
+            coverage.record_response(args.event_code, region_code, data)
+
+    rollups = None
+    if args.rollups:
+        rollups = RollupEngine()
+        save_region = save
+
+        def save(region_code, data):
+            save_region(region_code, data)
+            rollups.update_response(region_code, data)
+
+    asyncio.run(fetch_and_save_all_cities_async(
+        cities, save,
+        concurrency=args.concurrency,
+        host_rate=args.host_rate,
+        base_url=args.base_url,
+        event_code=args.event_code,
+    ))
+    if rollups is not None:
+        rollups.log_summary()
+        print(rollups.totals('city').sort_by([('BookedGross', 'descending')]).slice(0, 10).to_pandas().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
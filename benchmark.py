@@ -0,0 +1,261 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+FETCHERS = ('async', 'threaded', 'serial')
+SHOWTIMES_PATH = "/api/movies-data/showtimes-by-event"
+
+
+class LatencyRecorder:
+    """
+    Collects per-request latency (time to response headers) and status codes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.statuses = []
+
+    def record(self, seconds, status):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.statuses.append(status)
+
+    def summary(self):
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            'requests': len(self.latencies),
+            'ok_responses': sum(1 for status in self.statuses if status == 200),
+            'p50_ms': float(np.percentile(latencies, 50) * 1000),
+            'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        }
+
+
+def requests_hook(recorder):
+    def hook(response, *args, **kwargs):
+        recorder.record(response.elapsed.total_seconds(), response.status_code)
+    return hook
+
+
+def aiohttp_trace_config(recorder):
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        recorder.record(time.perf_counter() - context.started, params.response.status)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+def run_async(cities, base_url, store, recorder, args):
+    from async_fetch import fetch_and_save_all_cities_async
+    snapshot = time.strftime('%Y%m%d_%H%M%S')
+    return asyncio.run(fetch_and_save_all_cities_async(
+        cities, lambda code, data: store.write_region(snapshot, code, data),
+        concurrency=args.concurrency, host_rate=args.host_rate, base_url=base_url,
+        trace_configs=[aiohttp_trace_config(recorder)],
+    ))
+
+
+def run_threaded(cities, base_url, store, recorder, args):
+    # Drives test5's sweep orchestration (journal + RetryScheduler) so retries match a real threaded run
+    from functools import partial
+    from http_pool import get_session_pool
+    from rate_limit import AdaptiveConcurrency, get_rate_limiter
+    from sweep_journal import SweepJournal
+    from test5 import fetch_data_for_city, fetch_regions
+    logging.getLogger().setLevel(logging.WARNING)
+    get_rate_limiter().host_rate = args.host_rate
+    get_session_pool(cloudflare=True).session_for(None).hooks['response'].append(requests_hook(recorder))
+
+    snapshot = time.strftime('%Y%m%d_%H%M%S')
+    cities_by_region = {}
+    for city in cities:
+        cities_by_region.setdefault(city['sub_region_code'], city)
+    journal = SweepJournal(os.path.join(os.getcwd(), 'sweeps.db'))
+    journal.start(snapshot, cities_by_region)
+    concurrency = AdaptiveConcurrency(initial=min(10, args.workers), max_limit=args.workers)
+    fetch = partial(fetch_data_for_city, proxy_pool=None, concurrency=concurrency, base_url=base_url)
+    success_count = fetch_regions(cities_by_region, snapshot, journal, store, fetch, args.workers, concurrency)
+    return success_count, len(cities_by_region) - success_count
+
+
+def run_serial(cities, base_url, store, recorder, args):
+    from bms_api import fetch_showtimes
+    from http_pool import get_session_pool
+    from rate_limit import get_rate_limiter
+    get_rate_limiter().host_rate = args.host_rate
+    get_session_pool().session_for(None).hooks['response'].append(requests_hook(recorder))
+
+    cities = cities[:args.serial_limit]
+    for city in cities:
+        fetch_showtimes(city['sub_region_code'], city['sub_region_code'], base_url=base_url)
+    ok = recorder.summary()['ok_responses']
+    return ok, len(cities) - ok
+
+
+RUNNERS = {'async': run_async, 'threaded': run_threaded, 'serial': run_serial}
+
+
+def run_fetcher(name, base_url, args):
+    """
+    Runs one fetcher in this process and measures it.
+    Returns:
+        dict: Throughput, latency, CPU and memory figures.
+    """
+    sys.path.insert(0, REPO_DIR)
+    from snapshot_store import SnapshotStore
+    from bms_request import load_cities
+
+    cities = load_cities(os.path.join(REPO_DIR, args.cities))
+    if args.limit:
+        cities = cities[:args.limit]
+    store = SnapshotStore(os.path.join(os.getcwd(), 'snapshots'))
+    recorder = LatencyRecorder()
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    success_count, failure_count = RUNNERS[name](cities, base_url, store, recorder, args)
+    wall = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    result = {
+        'fetcher': name,
+        'cities': success_count + failure_count,
+        'succeeded': success_count,
+        'failed': failure_count,
+        'wall_s': wall,
+        'cities_per_s': (success_count + failure_count) / wall if wall else 0.0,
+        'cpu_s': cpu,
+        'cpu_pct': 100 * cpu / wall if wall else 0.0,
+        'max_rss_mb': usage_after.ru_maxrss / 1024,  # ru_maxrss is in KiB on Linux
+    }
+    result.update(recorder.summary())
+    result['requests_per_s'] = result['requests'] / wall if wall else 0.0
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_replay_server(args, port):
+    """
+    Starts replay_server.py in its own process so its CPU and memory are not
+    counted against the fetcher being measured.
+    """
+    command = [
+        sys.executable, os.path.join(REPO_DIR, 'replay_server.py'), '--port', str(port),
+        '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--error-rate', str(args.error_rate), '--throttle-rate', str(args.throttle_rate),
+        '--challenge-rate', str(args.challenge_rate), '--seed', '1',
+    ]
+    if args.snapshot:
+        command += ['--snapshot', os.path.abspath(args.snapshot)]
+    server = subprocess.Popen(command, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("Replay server exited during startup.")
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Replay server did not start listening in time.")
+
+
+def print_table(results):
+    columns = [
+        ('fetcher', '{}'), ('cities', '{}'), ('succeeded', '{}'), ('requests', '{}'),
+        ('requests_per_s', '{:.1f}'), ('p50_ms', '{:.1f}'), ('p99_ms', '{:.1f}'),
+        ('cpu_s', '{:.2f}'), ('cpu_pct', '{:.0f}'), ('max_rss_mb', '{:.0f}'), ('wall_s', '{:.2f}'),
+    ]
+    rows = [[name for name, _ in columns]]
+    for result in results:
+        rows.append([fmt.format(result[name]) for name, fmt in columns])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print('  '.join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the showtimes fetchers against replay_server.py.")
+    parser.add_argument('--fetchers', nargs='+', choices=FETCHERS, default=list(FETCHERS))
+    parser.add_argument('--snapshot', default=None, help="Snapshot to replay (defaults to the latest under data/).")
+    parser.add_argument('--cities', default='region_data_output.json')
+    parser.add_argument('--limit', type=int, default=None, help="Only fetch the first N cities.")
+    parser.add_argument('--serial-limit', type=int, default=50, help="Cities for the serial fetcher (writes Excel).")
+    parser.add_argument('--concurrency', type=int, default=200, help="Async in-flight limit.")
+    parser.add_argument('--workers', type=int, default=32, help="Threaded fetcher worker count.")
+    parser.add_argument('--host-rate', type=float, default=0.0, help="Per-host requests/sec, 0 = unlimited.")
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--challenge-rate', type=float, default=0.0)
+    parser.add_argument('--json', default=None, help="Also write the results to this JSON file.")
+    parser.add_argument('--run', choices=FETCHERS, help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        # Child process: measure a single fetcher and hand the figures back through a file
+        result = run_fetcher(args.run, args.base_url, args)
+        with open(args.result_file, 'w') as f:
+            json.dump(result, f)
+        return
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}{SHOWTIMES_PATH}"
+    server = start_replay_server(args, port)
+    results = []
+    try:
+        for name in args.fetchers:
+            with tempfile.TemporaryDirectory() as workdir:
+                result_file = os.path.join(workdir, 'result.json')
+                subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), *sys.argv[1:], '--run', name,
+                     '--base-url', base_url, '--result-file', result_file],
+                    cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+                )
+                with open(result_file) as f:
+                    results.append(json.load(f))
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats") as response:
+            server_stats = json.load(response)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print_table(results)
+    print(f"Replay server: {server_stats}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results, 'server': server_stats}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,34 @@
 import requests
-import pandas as pd
-import time
+import urllib.parse as urlparse
 from datetime import datetime
 import pytz
+from http_pool import DEFAULT_TIMEOUT, get_session_pool
+from rate_limit import get_rate_limiter, is_throttle, retry_after_seconds
+from excel_export import ExportWorker, export_columns
+from showtime_parser import parse_response, to_dataframe
+from bms_request import BASE_URL, DEFAULT_EVENT_CODE
 
-def fetch_showtimes(city_code, city_name):
+def build_showtimes_request(city_code, city_name, event_code=DEFAULT_EVENT_CODE, date_code=None, base_url=BASE_URL):
     """
-    Fetches showtimes for a given city and saves the data to an Excel file.
+    Builds the query parameters and headers of a showtimes-by-event request.
 
     Parameters:
     - city_code (str): The region/sub-region code for the city (e.g., 'HYD', 'BANG', 'CHEN').
     - city_name (str): The name of the city (e.g., 'HYD', 'Bangalore', 'Chennai').
+    - event_code (str): The event to fetch, e.g. a language variant listed in ChildEvents.
+    - date_code (str): Show date as YYYYMMDD; None fetches the server's default date.
+    - base_url (str): Endpoint the request is sent to, used for the Host header.
+
+    Returns:
+    - tuple: (params, headers)
     """
-    # Define the base URL with placeholders for region and sub-region codes
-    base_url = "https://in.bookmyshow.com/api/movies-data/showtimes-by-event"
-    
+
     # Common query parameters
     params = {
         "appCode": "MOBAND2",
         "appVersion": "14304",
         "language": "en",
-        "eventCode": "ET00310216",
+        "eventCode": event_code,
         "regionCode": city_code,
         "subRegion": city_code,
         "bmsId": "1.21345445.1703250084656",
@@ -29,13 +37,12 @@ def fetch_showtimes(city_code, city_name):
         "lon": "77.59457",
         "query": ""
     }
-    
-    # Construct the full URL with query parameters
-    response_url = f"{base_url}?{'&'.join([f'{key}={value}' for key, value in params.items()])}"
+    if date_code:
+        params["dateCode"] = date_code
     
     # Define headers with dynamic region and sub-region codes
     headers = {
-        "Host": "in.bookmyshow.com",
+        "Host": urlparse.urlsplit(base_url).netloc,
         "x-bms-id": "1.21345445.1703250084656",
         "x-region-code": city_code,
         "x-subregion-code": city_code,
@@ -62,70 +69,74 @@ def fetch_showtimes(city_code, city_name):
         "user-agent": "Dalvik/2.1.0 (Linux; U; Android 12; Pixel XL Build/SP2A.220505.008)"
     }
     
+    return params, headers
+
+
+def request_showtimes(city_code, city_name, base_url=BASE_URL, event_code=DEFAULT_EVENT_CODE, date_code=None,
+                      timeout=DEFAULT_TIMEOUT):
+    """
+    Fetches showtimes for a city and flattens them into columns.
+
+    Parameters:
+    - city_code, city_name, event_code, date_code: As for build_showtimes_request.
+    - base_url (str): The showtimes-by-event endpoint (the live API or a local replay server).
+    - timeout (tuple): (connect, read) timeout in seconds; a stalled response raises instead of blocking.
+
+    Returns:
+    - dict: Column name -> NumPy array (see showtime_parser).
+
+    Raises:
+    - requests.exceptions.RequestException on HTTP and connection errors.
+    """
+    params, headers = build_showtimes_request(city_code, city_name, event_code, date_code, base_url)
+
+    # Wait for the shared per-host rate budget instead of a fixed sleep between cities
+    get_rate_limiter().acquire(headers["Host"])
     try:
-        # Make the GET request with headers and parameters
-        response = requests.get(base_url, headers=headers, params=params)
+        # Make the GET request with headers and parameters over the shared keep-alive session
+        response = get_session_pool().get(base_url, headers=headers, params=params, stream=True, timeout=timeout)
         response.raise_for_status()  # Check for HTTP errors
+    except requests.exceptions.HTTPError as http_err:
+        if is_throttle(error=http_err):
+            # Back off the whole host, honouring Retry-After when the server sends it
+            get_rate_limiter().penalize(headers["Host"], seconds=retry_after_seconds(http_err.response, default=20))
+        raise
 
-        # Parse the JSON response
-        data = response.json()
-
-        # Initialize an empty list to store results
-        results = []
-
-        # Traverse the JSON data to extract required information
-        for show_detail in data.get('ShowDetails', []):
-            for venue in show_detail.get('Venues', []):
-                venue_name = venue.get('VenueName', '')
-                for show_time in venue.get('ShowTimes', []):
-                    show_time_str = show_time.get('ShowTime', '')
-                    for category in show_time.get('Categories', []):
-                        max_seats = int(category.get('MaxSeats', '0'))
-                        seats_avail = int(category.get('SeatsAvail', '0'))
-                        booked_tickets = max_seats - seats_avail
-                        current_price = float(category.get('CurPrice', '0'))
-
-                        # Calculate BookedGross and TotalGross
-                        booked_gross = booked_tickets * current_price
-                        total_gross = max_seats * current_price
-
-                        # Append the extracted data to results list
-                        results.append({
-                            'VenueName': venue_name,
-                            'ShowTime': show_time_str,
-                            'Category': category.get('PriceDesc', ''),
-                            'MaxSeats': max_seats,
-                            'SeatsAvailable': seats_avail,
-                            'BookedTickets': booked_tickets,
-                            'CurrentPrice': current_price,
-                            'BookedGross': booked_gross,
-                            'TotalGross': total_gross
-                        })
-
-        # Create a DataFrame from the results
-        df = pd.DataFrame(results)
+    # Flatten ShowDetails -> Venues -> ShowTimes -> Categories into columns (incrementally for large payloads)
+    return parse_response(response, streamed=True)
+
+
+def fetch_showtimes(city_code, city_name, base_url=BASE_URL, event_code=DEFAULT_EVENT_CODE, date_code=None,
+                    exporter=None, formats=('xlsx',)):
+    """
+    Fetches showtimes for a given city and saves the data to an Excel file.
+
+    Parameters:
+    - city_code (str): The region/sub-region code for the city (e.g., 'HYD', 'BANG', 'CHEN').
+    - city_name (str): The name of the city (e.g., 'HYD', 'Bangalore', 'Chennai').
+    - base_url (str): The showtimes-by-event endpoint (the live API or a local replay server).
+    - event_code (str): The event to fetch, e.g. a language variant listed in ChildEvents.
+    - date_code (str): Show date as YYYYMMDD; None fetches the server's default date.
+    - exporter (ExportWorker): Writes the files on a background thread; without one they are written here.
+    - formats (tuple): Output formats when writing here ('xlsx', 'csv', 'parquet').
+    """
+    try:
+        columns = request_showtimes(city_code, city_name, base_url, event_code, date_code)
         print(f"Data for {city_name}:")
-        print(df.head())  # Display first few rows for verification
+        print(to_dataframe({name: values[:5] for name, values in columns.items()}))  # First few rows for verification
 
         # Generate timestamp in Indian Standard Time (IST)
         ist = pytz.timezone('Asia/Kolkata')
         timestamp = datetime.now(ist).strftime('%Y%m%d_%H%M%S')
 
-        # Define the Excel filename
-        filename = f"{city_name}_{timestamp}.xlsx"
-
-        # Save the DataFrame to an Excel file with two sheets
-        with pd.ExcelWriter(filename) as writer:
-            # Sheet1 with detailed data
-            df.to_excel(writer, sheet_name='DetailedData', index=False)
-
-            # Sheet2 with aggregated data
-            # Remove 'Category' and 'CurrentPrice' before grouping
-            grouped_df = df.drop(columns=['Category', 'CurrentPrice']).groupby(['VenueName', 'ShowTime'], as_index=False).sum()
-
-            grouped_df.to_excel(writer, sheet_name='AggregatedData', index=False)
-
-        print(f"Data for {city_name} has been saved to '{filename}' with two sheets.\n")
+        # DetailedData and AggregatedData sheets in <city>_<timestamp>.xlsx (plus CSV/Parquet if asked for)
+        basename = f"{city_name}_{timestamp}"
+        if exporter is not None:
+            exporter.submit(columns, basename)
+            print(f"Data for {city_name} queued for export to '{basename}'.\n")
+        else:
+            paths = export_columns(columns, basename, formats)
+            print(f"Data for {city_name} has been saved to {', '.join(paths)}.\n")
 
     except requests.exceptions.HTTPError as http_err:
         print(f'HTTP error occurred for {city_name}: {http_err}\n')
@@ -140,9 +151,12 @@ def main():
         {'code': 'HYD', 'name': 'HYD'},
     ]
 
-    for city in city_info:
-        fetch_showtimes(city['code'], city['name'])
-        time.sleep(20)  # Wait for 2 seconds between requests to prevent rate limiting
+    # Files are written on a background thread while the next city is fetched
+    with ExportWorker() as exporter:
+        for city in city_info:
+            fetch_showtimes(city['code'], city['name'], exporter=exporter)
+
+    get_session_pool().log_stats()
 
 if __name__ == "__main__":
     main()
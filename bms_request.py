@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import random
+import urllib.parse as urlparse
+
+logger = logging.getLogger(__name__)
+
+# Live endpoint for showtimes-by-event; override to point fetchers at a local replay server
+BASE_URL = "https://in.bookmyshow.com/api/movies-data/showtimes-by-event"
+
+# Default event (Devara - Part 1, Telugu)
+DEFAULT_EVENT_CODE = "ET00310216"
+
+# List of User-Agents for rotation
+user_agents = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/115.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "Version/14.0.3 Safari/605.1.15",
+    # Add more User-Agents as needed
+]
+
+
+def build_city_url(city, event_code=DEFAULT_EVENT_CODE, base_url=BASE_URL, date_code=None):
+    """
+    Builds the showtimes-by-event URL for a single city.
+    Args:
+        city (dict): City data dictionary (as in region_data_output.json).
+        event_code (str): BookMyShow event code to fetch showtimes for.
+        base_url (str): Endpoint to send the request to.
+        date_code (str): Show date as YYYYMMDD; None lets the server pick its default date.
+    Returns:
+        str: Fully qualified request URL.
+    """
+    return (
+        f"{base_url}?"
+        f"appCode=MOBAND2&appVersion=14304&language=en&eventCode={event_code}&"
+        f"regionCode={city['region_code']}&subRegion={city['sub_region_code']}&"
+        f"bmsId=1.21345445.1703250084656&token=67x1xa33b4x422b361ba&"
+        f"lat={city['latitude']}&lon={city['longitude']}&query="
+        + (f"&dateCode={date_code}" if date_code else "")
+    )
+
+
+def build_city_headers(city, base_url=BASE_URL):
+    """
+    Builds the request headers for a single city.
+    Args:
+        city (dict): City data dictionary (as in region_data_output.json).
+        base_url (str): Endpoint the request is sent to, used for the Host header.
+    Returns:
+        dict: Request headers with a rotated User-Agent.
+    """
+    return {
+        "Host": urlparse.urlsplit(base_url).netloc,
+        "x-bms-id": "1.21345445.1703250084656",
+        "x-region-code": city['region_code'],
+        "x-subregion-code": city['sub_region_code'],
+        "x-region-slug": city['region_slug'],
+        "x-platform": "AND",
+        "x-platform-code": "ANDROID",
+        "x-app-code": "MOBAND2",
+        "x-device-make": "Google-Pixel XL",
+        "x-screen-height": "2392",
+        "x-screen-width": "1440",
+        "x-screen-density": "3.5",
+        "x-app-version": "14.3.4",
+        "x-app-version-code": "14304",
+        "x-network": "Android | WIFI",
+        "x-latitude": city['latitude'],
+        "x-longitude": city['longitude'],
+        "lang": "en",
+        "User-Agent": random.choice(user_agents)  # Rotate User-Agent
+    }
+
+
+def build_city_request(city, event_code=DEFAULT_EVENT_CODE, base_url=BASE_URL, date_code=None):
+    """
+    Builds the URL and headers for a single city's showtimes request.
+    Args:
+        city (dict): City data dictionary (as in region_data_output.json).
+        event_code (str): BookMyShow event code to fetch showtimes for.
+        base_url (str): Endpoint to send the request to.
+        date_code (str): Show date as YYYYMMDD (None for the server's default date).
+    Returns:
+        tuple: (url, headers)
+    """
+    return build_city_url(city, event_code, base_url, date_code), build_city_headers(city, base_url)
+
+
+def load_cities(file_path):
+    """
+    Loads city data from a JSON file.
+    Args:
+        file_path (str): Path to the JSON file containing city data.
+    Returns:
+        list: List of city dictionaries.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            cities = json.load(f)
+            logger.debug(f"Loaded {len(cities)} cities from {file_path}.")
+            print(f"Loaded {len(cities)} cities from '{file_path}'.")
+            return cities
+    except Exception as e:
+        logger.error(f"Error loading cities from {file_path}: {e}")
+        print(f"Error loading cities from '{file_path}': {e}")
+        return []
+
+
+def save_data(directory_name, city_code, data):
+    """
+    Saves fetched data to a file.
+    Args:
+        directory_name (str): Directory to save the data.
+        city_code (str): Code of the city, used for filename.
+        data (dict or str): Data to save.
+    """
+    try:
+        if isinstance(data, dict):
+            # Define filename
+            filename = f"{city_code}.json"
+            # Full path to save the JSON file
+            file_path = os.path.join(directory_name, filename)
+            # Save JSON data to file
+            with open(file_path, 'w', encoding='utf-8') as json_file:
+                json.dump(data, json_file, ensure_ascii=False, indent=4)
+                logger.info(f"Data saved to {file_path}")
+                print(f"Saved JSON data for {city_code} to {file_path}.")
+        else:
+            # If data is raw text
+            filename = f"{city_code}.txt"
+            file_path = os.path.join(directory_name, filename)
+            with open(file_path, 'w', encoding='utf-8') as text_file:
+                text_file.write(data)
+                logger.info(f"Raw response saved to {file_path}")
+                print(f"Saved raw response for {city_code} to {file_path}.")
+    except Exception as e:
+        logger.error(f"Error saving data for city {city_code}: {e}")
+        print(f"Error saving data for {city_code}: {e}")
@@ -0,0 +1,147 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from showtime_parser import iter_venues
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join("snapshots", "coverage.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS region_coverage (
+    event_code TEXT NOT NULL,
+    region TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    venues INTEGER NOT NULL,
+    empty_streak INTEGER NOT NULL,
+    last_checked REAL NOT NULL,
+    last_nonempty REAL,
+    PRIMARY KEY (event_code, region)
+)
+"""
+
+
+def count_rows(data):
+    """
+    Returns:
+        tuple: (category_rows, venues) in a decoded showtimes-by-event response.
+    """
+    rows = venues = 0
+    for venue in iter_venues(data):
+        venues += 1
+        for show in venue.get('ShowTimes', []):
+            rows += len(show.get('Categories', []))
+    return rows, venues
+
+
+class CoverageCache:
+    """
+    Remembers which regions returned ShowDetails for an event, so a sweep can
+    skip regions that keep answering with the empty "no shows" payload and
+    start with the regions that return the most rows.
+
+    An empty region is re-checked after `empty_interval` seconds, doubling
+    with every further empty answer up to `max_empty_interval`. Regions that
+    had shows, and regions never checked, are always due.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, empty_interval=6 * 3600, max_empty_interval=48 * 3600):
+        self.path = path
+        self.empty_interval = empty_interval
+        self.max_empty_interval = max_empty_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # Written once per fetched region from many threads; WAL keeps each commit an append without fsync
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._lock = threading.Lock()
+
+    def record(self, event_code, region, rows, venues=0, checked_at=None):
+        """
+        Records the outcome of one successful fetch.
+        Args:
+            event_code (str): Event the region was queried for.
+            region (str): Region/sub-region code.
+            rows (int): Category rows in the response.
+            venues (int): Venues in the response.
+            checked_at (float): Epoch seconds (defaults to now).
+        """
+        checked_at = checked_at or time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO region_coverage (event_code, region, rows, venues, empty_streak, last_checked, "
+                "last_nonempty) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(event_code, region) DO UPDATE SET rows=excluded.rows, venues=excluded.venues, "
+                "empty_streak=CASE WHEN excluded.rows > 0 THEN 0 ELSE region_coverage.empty_streak + 1 END, "
+                "last_checked=excluded.last_checked, "
+                "last_nonempty=COALESCE(excluded.last_nonempty, region_coverage.last_nonempty)",
+                (event_code, region, rows, venues, 0 if rows else 1, checked_at, checked_at if rows else None),
+            )
+
+    def record_response(self, event_code, region, data):
+        """
+        Records a fetched response; non-JSON responses are ignored.
+        Returns:
+            int: Category rows in the response.
+        """
+        if not isinstance(data, dict):
+            return 0
+        rows, venues = count_rows(data)
+        self.record(event_code, region, rows, venues)
+        return rows
+
+    def entries(self, event_code):
+        """
+        Returns:
+            dict: Region code -> (rows, venues, empty_streak, last_checked, last_nonempty).
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT region, rows, venues, empty_streak, last_checked, last_nonempty "
+                "FROM region_coverage WHERE event_code = ?",
+                (event_code,),
+            )
+            return {row[0]: row[1:] for row in cursor}
+
+    def recheck_interval(self, empty_streak):
+        return min(self.max_empty_interval, self.empty_interval * 2 ** max(0, empty_streak - 1))
+
+    def plan(self, event_code, cities, now=None):
+        """
+        Orders a sweep: regions with the most rows first, then never-checked
+        regions, then empty regions whose re-check is due.
+        Args:
+            event_code (str): Event being swept.
+            cities (list): City dicts with a 'sub_region_code'.
+            now (float): Epoch seconds (defaults to now).
+        Returns:
+            tuple: (due, skipped) lists of city dicts.
+        """
+        now = now or time.time()
+        entries = self.entries(event_code)
+        ranked, skipped = [], []
+        for position, city in enumerate(cities):
+            entry = entries.get(city['sub_region_code'])
+            if entry is None:
+                ranked.append(((1, 0, position), city))
+                continue
+            rows, _, empty_streak, last_checked, _ = entry
+            if rows:
+                ranked.append(((0, -rows, position), city))
+            elif now - last_checked >= self.recheck_interval(empty_streak):
+                ranked.append(((2, 0, position), city))
+            else:
+                skipped.append(city)
+        ranked.sort(key=lambda item: item[0])
+        due = [city for _, city in ranked]
+        logger.info(f"Planned {len(due)} regions for {event_code}, skipping {len(skipped)} known-empty regions.")
+        return due, skipped
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
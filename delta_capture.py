@@ -0,0 +1,235 @@
+import logging
+import os
+import sqlite3
+import threading
+
+from showtime_parser import iter_venues
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join("snapshots", "deltas.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS venues (
+    venue_code TEXT PRIMARY KEY,
+    venue_name TEXT,
+    sub_region_code TEXT,
+    address TEXT,
+    latitude REAL,
+    longitude REAL,
+    message TEXT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    venue_code TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    event_code TEXT,
+    show_date_time TEXT,
+    show_time TEXT,
+    cut_off_date_time TEXT,
+    PRIMARY KEY (venue_code, session_id)
+);
+CREATE TABLE IF NOT EXISTS categories (
+    venue_code TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    area_cat_code TEXT NOT NULL,
+    price_desc TEXT,
+    cur_price REAL,
+    max_seats INTEGER,
+    PRIMARY KEY (venue_code, session_id, area_cat_code)
+);
+CREATE TABLE IF NOT EXISTS availability (
+    snapshot TEXT NOT NULL,
+    venue_code TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    area_cat_code TEXT NOT NULL,
+    seats_avail INTEGER NOT NULL,
+    percent_avail INTEGER,
+    avail_status INTEGER,
+    PRIMARY KEY (venue_code, session_id, area_cat_code, snapshot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS captures (
+    snapshot TEXT NOT NULL,
+    region TEXT NOT NULL,
+    rows_seen INTEGER NOT NULL,
+    rows_changed INTEGER NOT NULL,
+    PRIMARY KEY (snapshot, region)
+);
+"""
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class DeltaCapture:
+    """
+    Incremental snapshot capture for high-frequency polling.
+
+    Venue, session and category details (names, addresses, terms text,
+    prices, capacities) go into dimension tables the first time they are
+    seen. Each poll then only appends the (VenueCode, SessionId, AreaCatCode)
+    rows whose SeatsAvail/PercentAvail/AvailStatus differ from the last
+    recorded value. The last known state is cached in memory, so unchanged
+    rows cost a dict lookup and no write.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL + NORMAL sync: one cheap append per poll instead of a full fsync per transaction
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._state = {}  # (venue, session, area) -> (seats_avail, percent_avail, avail_status)
+        self._known_venues = set()
+        self._known_sessions = set()
+        self._load_state()
+
+    def _load_state(self):
+        cursor = self._conn.execute(
+            "SELECT a.venue_code, a.session_id, a.area_cat_code, a.seats_avail, a.percent_avail, a.avail_status "
+            "FROM availability a JOIN (SELECT venue_code, session_id, area_cat_code, MAX(snapshot) AS snapshot "
+            "FROM availability GROUP BY venue_code, session_id, area_cat_code) latest "
+            "USING (venue_code, session_id, area_cat_code, snapshot)"
+        )
+        for venue, session, area, seats, percent, status in cursor:
+            self._state[(venue, session, area)] = (seats, percent, status)
+        self._known_venues = {row[0] for row in self._conn.execute("SELECT venue_code FROM venues")}
+        self._known_sessions = set(self._conn.execute("SELECT venue_code, session_id FROM sessions"))
+        logger.debug(f"Loaded {len(self._state)} availability rows from {self.path}")
+
+    def capture(self, snapshot, region_code, data):
+        """
+        Records one region's response as dimension inserts plus availability changes.
+        Args:
+            snapshot (str): Snapshot timestamp.
+            region_code (str): Region/sub-region code.
+            data (dict): Decoded showtimes-by-event response.
+        Returns:
+            tuple: (rows_seen, rows_changed)
+        """
+        venues, sessions, categories, changes = [], [], [], []
+        # Applied to the in-memory state only once the transaction commits, so a failed write is retried next poll
+        new_venues, new_sessions, new_state = set(), set(), {}
+        rows_seen = 0
+        with self._lock:
+            for venue in iter_venues(data):
+                venue_code = venue.get('VenueCode', '')
+                if venue_code not in self._known_venues and venue_code not in new_venues:
+                    new_venues.add(venue_code)
+                    venues.append((
+                        venue_code, venue.get('VenueName'), venue.get('SubRegCode'), venue.get('VenueAdd'),
+                        _to_float(venue.get('Lat')), _to_float(venue.get('Lng')), venue.get('Message'),
+                    ))
+                for show in venue.get('ShowTimes', []):
+                    session_id = show.get('SessionId', '')
+                    session_key = (venue_code, session_id)
+                    if session_key not in self._known_sessions and session_key not in new_sessions:
+                        new_sessions.add(session_key)
+                        sessions.append((
+                            venue_code, session_id, show.get('EventCode'), show.get('ShowDateTime'),
+                            show.get('ShowTime'), show.get('CutOffDateTime'),
+                        ))
+                    for category in show.get('Categories', []):
+                        rows_seen += 1
+                        area = category.get('AreaCatCode', '')
+                        key = (venue_code, session_id, area)
+                        value = (
+                            _to_int(category.get('SeatsAvail')) or 0,
+                            _to_int(category.get('PercentAvail')),
+                            _to_int(category.get('AvailStatus')),
+                        )
+                        previous = new_state[key] if key in new_state else self._state.get(key)
+                        if previous is None:
+                            categories.append((
+                                venue_code, session_id, area, category.get('PriceDesc'),
+                                _to_float(category.get('CurPrice')), _to_int(category.get('MaxSeats')),
+                            ))
+                        if previous != value:
+                            new_state[key] = value
+                            changes.append((snapshot, venue_code, session_id, area) + value)
+
+            with self._conn:
+                self._conn.executemany("INSERT OR IGNORE INTO venues VALUES (?, ?, ?, ?, ?, ?, ?)", venues)
+                self._conn.executemany("INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?, ?, ?)", sessions)
+                self._conn.executemany("INSERT OR IGNORE INTO categories VALUES (?, ?, ?, ?, ?, ?)", categories)
+                self._conn.executemany("INSERT OR REPLACE INTO availability VALUES (?, ?, ?, ?, ?, ?, ?)", changes)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO captures VALUES (?, ?, ?, ?)",
+                    (snapshot, region_code, rows_seen, len(changes)),
+                )
+            self._known_venues |= new_venues
+            self._known_sessions |= new_sessions
+            self._state.update(new_state)
+        logger.info(f"Captured {region_code} for {snapshot}: {len(changes)}/{rows_seen} rows changed")
+        return rows_seen, len(changes)
+
+    def write_region(self, snapshot, region_code, data, part=None):
+        """
+        Storage hook with the same signature as SnapshotStore.write_region.
+        Returns:
+            int: Number of changed rows written.
+        Raises:
+            Exception: If the capture could not be written; nothing is recorded, so the region can be retried.
+        """
+        if part:
+            region_code = f"{region_code}/{part}"
+        if not isinstance(data, dict):
+            logger.warning(f"Non-JSON response for {region_code} not captured.")
+            return 0
+        try:
+            return self.capture(snapshot, region_code, data)[1]
+        except Exception as e:
+            logger.error(f"Error saving data for city {region_code}: {e}")
+            print(f"Error saving data for {region_code}: {e}")
+            raise
+
+    def availability(self, snapshot=None):
+        """
+        Reconstructs seat availability as of a snapshot.
+        Args:
+            snapshot (str): Snapshot timestamp (None means the latest state).
+        Returns:
+            list: (venue_code, session_id, area_cat_code, seats_avail, percent_avail,
+            avail_status, max_seats, cur_price) tuples.
+        """
+        bound = "WHERE snapshot <= ?" if snapshot else ""
+        query = (
+            "SELECT a.venue_code, a.session_id, a.area_cat_code, a.seats_avail, a.percent_avail, "
+            "a.avail_status, c.max_seats, c.cur_price "
+            "FROM availability a JOIN (SELECT venue_code, session_id, area_cat_code, MAX(snapshot) AS snapshot "
+            f"FROM availability {bound} GROUP BY venue_code, session_id, area_cat_code) latest "
+            "USING (venue_code, session_id, area_cat_code, snapshot) "
+            "JOIN categories c USING (venue_code, session_id, area_cat_code)"
+        )
+        with self._lock:
+            return self._conn.execute(query, (snapshot,) if snapshot else ()).fetchall()
+
+    def history(self, venue_code, session_id):
+        """
+        Returns:
+            list: (snapshot, area_cat_code, seats_avail, percent_avail, avail_status) changes, oldest first.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT snapshot, area_cat_code, seats_avail, percent_avail, avail_status FROM availability "
+                "WHERE venue_code = ? AND session_id = ? ORDER BY snapshot, area_cat_code",
+                (venue_code, session_id),
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
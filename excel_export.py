@@ -0,0 +1,270 @@
+import argparse
+import logging
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+from showtime_parser import DETAIL_COLUMNS, to_arrow
+from snapshot_pipeline import AGGREGATE_KEYS, aggregate, parse_directory
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('xlsx', 'csv', 'parquet')
+
+# Rows converted to Python objects at a time while streaming a sheet
+BATCH_ROWS = 10000
+
+
+def _decoded(table):
+    """
+    Casts dictionary-encoded columns back to plain strings (CSV writers want them plain).
+    """
+    columns = [
+        column.cast(column.type.value_type) if pa.types.is_dictionary(column.type) else column
+        for column in table.columns
+    ]
+    return pa.Table.from_arrays(columns, names=table.column_names)
+
+
+def _rows(table):
+    # One record batch of Python values at a time, so the row objects never exist for the whole table
+    for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def write_xlsx(sheets, filename):
+    """
+    Writes tables to an .xlsx workbook row by row in constant memory.
+    Uses xlsxwriter's constant_memory mode when installed, otherwise an
+    openpyxl write-only workbook; either way each row is flushed as it is
+    written instead of building the whole sheet first.
+    Args:
+        sheets (list): (sheet name, pyarrow.Table) pairs, in sheet order.
+        filename (str): Workbook path.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+
+    if xlsxwriter is not None:
+        # Values come from parsed JSON, never formulas or links, so skip write()'s URL and formula sniffing
+        options = {'constant_memory': True, 'strings_to_urls': False, 'strings_to_formulas': False}
+        with xlsxwriter.Workbook(filename, options) as workbook:
+            for name, table in sheets:
+                worksheet = workbook.add_worksheet(name)
+                worksheet.write_row(0, 0, table.column_names)
+                for row_number, row in enumerate(_rows(table), start=1):
+                    worksheet.write_row(row_number, 0, row)
+        return
+
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for name, table in sheets:
+        worksheet = workbook.create_sheet(name)
+        worksheet.append(table.column_names)
+        for row in _rows(table):
+            worksheet.append(row)
+    workbook.save(filename)
+
+
+def aggregated_data(detailed):
+    """
+    Returns:
+        pyarrow.Table: AggregatedData sorted by venue and showtime, as pandas' groupby orders it.
+    """
+    return _decoded(aggregate(detailed)).sort_by([(key, 'ascending') for key in AGGREGATE_KEYS])
+
+
+def export_tables(detailed, aggregated, basename, formats=('xlsx',)):
+    """
+    Writes DetailedData and AggregatedData in the requested formats.
+    Args:
+        detailed (pyarrow.Table): Category rows.
+        aggregated (pyarrow.Table): Per (VenueName, ShowTime) sums.
+        basename (str): Output path without extension, e.g. 'HYD_20240924_153045'.
+        formats (iterable): Any of FORMATS.
+    Returns:
+        list: Paths written.
+    """
+    paths = []
+    if 'xlsx' in formats:
+        paths.append(f"{basename}.xlsx")
+        write_xlsx([('DetailedData', detailed), ('AggregatedData', aggregated)], paths[-1])
+    if 'csv' in formats:
+        paths += [f"{basename}.csv", f"{basename}_aggregated.csv"]
+        pcsv.write_csv(_decoded(detailed), paths[-2])
+        pcsv.write_csv(_decoded(aggregated), paths[-1])
+    if 'parquet' in formats:
+        paths += [f"{basename}.parquet", f"{basename}_aggregated.parquet"]
+        pq.write_table(detailed, paths[-2], compression='zstd')
+        pq.write_table(aggregated, paths[-1], compression='zstd')
+    return paths
+
+
+def export_columns(columns, basename, formats=('xlsx',)):
+    """
+    Exports parsed rows (see showtime_parser) the way fetch_showtimes saves a city.
+    Returns:
+        list: Paths written.
+    """
+    detailed = to_arrow(columns, metadata=False)
+    aggregated = aggregated_data(detailed)
+    return export_tables(detailed, aggregated, basename, formats)
+
+
+class ExportWorker:
+    """
+    Runs exports on a background thread so the fetch loop only hands over
+    parsed columns and moves on to the next city. At most `max_pending`
+    exports wait at a time; beyond that submit() blocks, which keeps memory
+    bounded if fetching outpaces writing.
+    """
+
+    def __init__(self, formats=('xlsx',), workers=1, max_pending=4):
+        self.formats = tuple(formats)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._futures = []
+        self.files = 0
+        self.failures = 0
+        self.seconds = 0.0
+
+    def _run(self, columns, basename):
+        started = time.perf_counter()
+        try:
+            paths = export_columns(columns, basename, self.formats)
+            logger.info(f"Exported {', '.join(paths)}")
+            with self._lock:
+                self.files += len(paths)
+            return paths
+        except Exception as e:
+            logger.error(f"Export of {basename} failed: {e}")
+            print(f"Export of {basename} failed: {e}")
+            with self._lock:
+                self.failures += 1
+            return []
+        finally:
+            with self._lock:
+                self.seconds += time.perf_counter() - started
+            self._slots.release()
+
+    def submit(self, columns, basename):
+        """
+        Queues an export of parsed rows.
+        Returns:
+            concurrent.futures.Future: Resolves to the list of paths written.
+        """
+        self._slots.acquire()
+        future = self._executor.submit(self._run, columns, basename)
+        self._futures.append(future)
+        return future
+
+    def close(self):
+        """
+        Waits for queued exports to finish.
+        """
+        self._executor.shutdown(wait=True)
+        message = f"Exports: {self.files} files written, {self.failures} failed, {self.seconds:.1f}s off the fetch thread."
+        logger.info(message)
+        print(message)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def pandas_excel(detailed, filename):
+    """
+    The previous export path: pd.ExcelWriter with the default engine and a
+    pandas groupby, as bms_api.fetch_showtimes used to write.
+    """
+    import pandas as pd
+    df = detailed.to_pandas()
+    with pd.ExcelWriter(filename) as writer:
+        df.to_excel(writer, sheet_name='DetailedData', index=False)
+        grouped_df = df.drop(columns=['Category', 'CurrentPrice']).groupby(['VenueName', 'ShowTime'], as_index=False).sum()
+        grouped_df.to_excel(writer, sheet_name='AggregatedData', index=False)
+
+
+def _benchmark_method(method, directory, output_dir, scale=1):
+    """
+    Process-pool worker: parses the snapshot, then times one export method.
+    `scale` repeats the snapshot's rows to approximate a national-scale export.
+    Returns:
+        dict: method, seconds, peak RSS growth while exporting, bytes written.
+    """
+    logging.getLogger().setLevel(logging.WARNING)
+    detailed = parse_directory(directory, workers=1).select(DETAIL_COLUMNS)
+    if scale > 1:
+        detailed = pa.concat_tables([detailed] * scale).combine_chunks()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    basename = os.path.join(output_dir, method)
+    started = time.perf_counter()
+    if method == 'pandas':
+        pandas_excel(detailed, f"{basename}.xlsx")
+        paths = [f"{basename}.xlsx"]
+    else:
+        aggregated = aggregated_data(detailed)
+        paths = export_tables(detailed, aggregated, basename, [method])
+    seconds = time.perf_counter() - started
+    return {
+        'method': method,
+        'rows': detailed.num_rows,
+        'seconds': seconds,
+        'peak_rss_growth_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+        'bytes': sum(os.path.getsize(path) for path in paths),
+    }
+
+
+def benchmark(directory, output_dir, methods=('pandas',) + FORMATS, scale=1):
+    """
+    Times each export method on a full snapshot, each in a fresh process so
+    peak memory figures don't carry over from the previous method.
+    Returns:
+        list: One result dict per method.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    for method in methods:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(_benchmark_method, method, directory, output_dir, scale).result())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a snapshot directory to Excel/CSV/Parquet, or benchmark the export paths.")
+    parser.add_argument('directory', help="Snapshot directory with <CODE>.json(.gz) files.")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['xlsx'])
+    parser.add_argument('--output', default=None, help="Output path without extension (default: <snapshot>_national).")
+    parser.add_argument('--benchmark', action='store_true', help="Time the pandas ExcelWriter path against each format.")
+    parser.add_argument('--scale', type=int, default=1, help="Benchmark with the snapshot's rows repeated N times.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    snapshot = os.path.basename(os.path.normpath(args.directory))
+    if args.benchmark:
+        output_dir = args.output or f"{snapshot}_export_benchmark"
+        for result in benchmark(args.directory, output_dir, scale=args.scale):
+            print(f"{result['method']:>8}: {result['rows']} rows in {result['seconds']:.2f}s, "
+                  f"peak RSS +{result['peak_rss_growth_mb']:.0f} MB, {result['bytes'] / 1e6:.1f} MB written")
+        return
+
+    detailed = parse_directory(args.directory).select(DETAIL_COLUMNS)
+    aggregated = aggregated_data(detailed)
+    started = time.perf_counter()
+    paths = export_tables(detailed, aggregated, args.output or f"{snapshot}_national", args.formats)
+    print(f"Exported {detailed.num_rows} rows to {', '.join(paths)} in {time.perf_counter() - started:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) seconds applied when a caller passes no timeout, so a stalled server can't hold a worker forever
+DEFAULT_TIMEOUT = (10, 30)
+
+
+class ConnectionStats:
+    """
+    Thread-safe counters for requests sent and TCP/TLS connections opened.
+    A reuse rate close to 1.0 means almost no request paid for a handshake.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record(self, requests=0, new_connections=0):
+        with self._lock:
+            self.requests += requests
+            self.new_connections += new_connections
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: requests, new_connections, reused and reuse_rate.
+        """
+        with self._lock:
+            reused = max(0, self.requests - self.new_connections)
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused': reused,
+                'reuse_rate': reused / self.requests if self.requests else 0.0,
+            }
+
+
+def _adapter_counters(adapter):
+    """
+    Sums request and connection counts over every urllib3 pool of an adapter,
+    including the per-proxy pool managers.
+    Returns:
+        tuple: (requests, new_connections)
+    """
+    managers = [adapter.poolmanager, *adapter.proxy_manager.values()]
+    total_requests = 0
+    total_connections = 0
+    for manager in managers:
+        if manager is None:
+            continue
+        for key in manager.pools.keys():
+            pool = manager.pools.get(key)
+            if pool is not None:
+                total_requests += pool.num_requests
+                total_connections += pool.num_connections
+    return total_requests, total_connections
+
+
+def _session_counters(session):
+    """
+    Sums the adapter counters of a session; 'http://' and 'https://' share one adapter.
+    Returns:
+        tuple: (requests, new_connections)
+    """
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    counters = [_adapter_counters(adapter) for adapter in adapters.values()]
+    return sum(c[0] for c in counters), sum(c[1] for c in counters)
+
+
+class SessionPool:
+    """
+    Keep-alive HTTP sessions shared by all fetch paths, one per proxy.
+
+    Each proxy gets its own session so its connections and (for cloudscraper)
+    its Cloudflare cookies are reused across cities. The least recently used
+    session is closed once `max_sessions` is exceeded.
+    """
+
+    def __init__(self, cloudflare=False, pool_maxsize=20, max_sessions=256):
+        self.cloudflare = cloudflare
+        self.pool_maxsize = pool_maxsize
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # proxy -> session
+        self._lock = threading.Lock()
+        self._closed_stats = ConnectionStats()  # counters of already closed sessions
+
+    def _create_session(self):
+        adapter = HTTPAdapter(pool_connections=self.pool_maxsize, pool_maxsize=self.pool_maxsize)
+        if self.cloudflare:
+            import cloudscraper  # Only needed for the Cloudflare-protected fetchers
+            session = cloudscraper.create_scraper()
+            # Keep cloudscraper's cipher-suite adapter for https, only enlarge its pools
+            https_adapter = session.adapters['https://']
+            https_adapter._pool_connections = self.pool_maxsize
+            https_adapter._pool_maxsize = self.pool_maxsize
+            https_adapter.init_poolmanager(self.pool_maxsize, self.pool_maxsize)
+        else:
+            session = requests.Session()
+            session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def session_for(self, proxy=None):
+        """
+        Returns the shared session for a proxy, creating it on first use.
+        Args:
+            proxy (str): Proxy in 'ip:port' format, or None for direct connections.
+        Returns:
+            requests.Session: Session (a CloudScraper when cloudflare=True).
+        """
+        with self._lock:
+            session = self._sessions.get(proxy)
+            if session is not None:
+                self._sessions.move_to_end(proxy)
+                return session
+            session = self._create_session()
+            self._sessions[proxy] = session
+            if len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self._close_session(evicted)
+            return session
+
+    def get(self, url, proxy=None, **kwargs):
+        """
+        Sends a GET request through the pooled session for `proxy`.
+        Args:
+            url (str): Request URL.
+            proxy (str): Proxy in 'ip:port' format, or None for direct connections.
+            **kwargs: Passed on to Session.get (headers, params, timeout...); timeout defaults to DEFAULT_TIMEOUT.
+        Returns:
+            requests.Response
+        """
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+        if proxy:
+            kwargs['proxies'] = {
+                "http": f"http://{proxy}",
+                "https": f"http://{proxy}",  # Using HTTP proxy for HTTPS requests
+            }
+        return self.session_for(proxy).get(url, **kwargs)
+
+    def _close_session(self, session):
+        self._closed_stats.record(*_session_counters(session))
+        session.close()
+
+    def stats(self):
+        """
+        Connection reuse counters across all sessions, open and closed.
+        Returns:
+            dict: requests, new_connections, reused and reuse_rate.
+        """
+        stats = ConnectionStats()
+        closed = self._closed_stats.snapshot()
+        stats.record(closed['requests'], closed['new_connections'])
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            stats.record(*_session_counters(session))
+        return stats.snapshot()
+
+    def log_stats(self):
+        stats = self.stats()
+        message = (
+            f"Connection reuse: {stats['reused']}/{stats['requests']} requests on kept-alive connections "
+            f"({stats['reuse_rate']:.1%}), {stats['new_connections']} new connections."
+        )
+        logger.info(message)
+        print(message)
+        return stats
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            self._close_session(session)
+
+
+_default_pools = {}
+_default_pools_lock = threading.Lock()
+
+
+def get_session_pool(cloudflare=False):
+    """
+    Returns the process-wide SessionPool (plain requests or cloudscraper).
+    Args:
+        cloudflare (bool): Whether sessions must solve Cloudflare challenges.
+    Returns:
+        SessionPool
+    """
+    with _default_pools_lock:
+        pool = _default_pools.get(cloudflare)
+        if pool is None:
+            pool = _default_pools[cloudflare] = SessionPool(cloudflare=cloudflare)
+        return pool
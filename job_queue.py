@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from itertools import product
+
+import aiohttp
+
+from async_fetch import connection_trace_config, fetch_city_async, snapshot_timestamp
+from bms_request import BASE_URL, DEFAULT_EVENT_CODE, load_cities
+from delta_capture import DeltaCapture
+from http_pool import ConnectionStats
+from rate_limit import AdaptiveConcurrency, RateLimiter
+from showtime_parser import child_events, returned_dates, show_dates
+from snapshot_store import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join("snapshots", "jobs.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    event_code TEXT NOT NULL,
+    region_code TEXT NOT NULL,
+    date_code TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (event_code, region_code, date_code)
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, priority DESC, enqueued_at);
+"""
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+
+class FetchJob(namedtuple('FetchJob', ['event_code', 'region_code', 'date_code'])):
+    """
+    One unit of work: showtimes of one event in one region on one date
+    (date_code None means whatever date the server returns by default).
+    """
+    __slots__ = ()
+
+    @property
+    def part(self):
+        # File name within the region's snapshot partition, unique per event and date
+        return f"{self.event_code}-{self.date_code or 'default'}"
+
+
+def expand_jobs(event_codes, region_codes, date_codes=(None,)):
+    """
+    Returns:
+        list: FetchJob for every (event, region, date) combination.
+    """
+    combinations = product(event_codes, region_codes, date_codes)
+    return [FetchJob(event, region, date) for event, region, date in combinations]
+
+
+def discovered_jobs(job, data):
+    """
+    Follow-up jobs advertised by a response: the other language/format
+    variants in ChildEvents for the same region and date, and the other
+    enabled dates in ShowDatesArray for the same event and region.
+    """
+    jobs = [
+        FetchJob(code, job.region_code, job.date_code)
+        for code in child_events(data) if code != job.event_code
+    ]
+    already_returned = set(returned_dates(data)) | {job.date_code}
+    jobs += [
+        FetchJob(job.event_code, job.region_code, date)
+        for date in show_dates(data) if date not in already_returned
+    ]
+    return jobs
+
+
+class JobQueue:
+    """
+    Persistent SQLite work queue of FetchJobs. A job is identified by
+    (event_code, region_code, date_code), so enqueueing it again while it is
+    queued or finished is a no-op; requeue() starts another round.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(self, jobs, priority=0):
+        """
+        Adds jobs that are not already in the queue.
+        Args:
+            jobs (iterable): FetchJobs.
+            priority (int): Higher runs first.
+        Returns:
+            int: Number of jobs added.
+        """
+        now = time.time()
+        rows = [(job.event_code, job.region_code, job.date_code or '', PENDING, priority, 0, now, now) for job in jobs]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (event_code, region_code, date_code, status, priority, attempts, "
+                "enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    def claim(self, limit=1):
+        """
+        Marks up to `limit` pending jobs as running, highest priority and oldest first.
+        Returns:
+            list: Claimed FetchJobs.
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT event_code, region_code, date_code FROM jobs WHERE status = ? "
+                "ORDER BY priority DESC, enqueued_at LIMIT ?",
+                (PENDING, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE event_code = ? AND region_code = ? AND date_code = ?",
+                [(RUNNING, time.time()) + row for row in rows],
+            )
+        return [FetchJob(event, region, date or None) for event, region, date in rows]
+
+    def _finish(self, job, status, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, updated_at = ? "
+                "WHERE event_code = ? AND region_code = ? AND date_code = ?",
+                (status, error, time.time(), job.event_code, job.region_code, job.date_code or ''),
+            )
+
+    def complete(self, job):
+        self._finish(job, DONE)
+
+    def fail(self, job, error=None):
+        self._finish(job, FAILED, error)
+
+    def requeue(self, statuses=(DONE, FAILED, RUNNING)):
+        """
+        Puts finished (and abandoned running) jobs back to pending for another round.
+        Returns:
+            int: Number of jobs requeued.
+        """
+        placeholders = ', '.join('?' for _ in statuses)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET status = ?, updated_at = ? WHERE status IN ({placeholders})",
+                (PENDING, time.time(), *statuses),
+            )
+            return cursor.rowcount
+
+    def counts(self):
+        """
+        Returns:
+            dict: Status -> number of jobs.
+        """
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+async def run_jobs_async(queue, cities, save, concurrency=200, host_rate=50.0, proxy_rate=0.5,
+                         proxy_pool=None, base_url=BASE_URL, timeout=30, discover=False):
+    """
+    Drains the queue over one shared session. Every job, whatever its event
+    or date, shares the same adaptive concurrency limit and host rate budget.
+    Args:
+        queue (JobQueue): Queue to drain.
+        cities (list): City dictionaries, looked up by sub_region_code.
+        save (callable): save(job, data), run in a worker thread for every successful job.
+        concurrency (int): Maximum number of jobs in flight.
+        host_rate (float): Requests per second allowed per host (0 disables the limit).
+        proxy_rate (float): Requests per second allowed per proxy (0 disables the limit).
+        proxy_pool (ProxyPool): Optional scored proxy pool; requests go direct without one.
+        base_url (str): Endpoint to fetch from (live API or a replay server).
+        timeout (int): Total timeout in seconds for one request.
+        discover (bool): Enqueue the child events and dates each response advertises.
+    Returns:
+        tuple: (success_count, failure_count)
+    """
+    cities_by_code = {city['sub_region_code']: city for city in cities}
+    controller = AdaptiveConcurrency(initial=min(50, concurrency), max_limit=concurrency)
+    limiter = RateLimiter(host_rate=host_rate, proxy_rate=proxy_rate)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    connection_stats = ConnectionStats()
+    success_count = failure_count = 0
+    start = time.perf_counter()
+
+    def finish(job, data):
+        if not data:
+            queue.fail(job, "no data")
+            return False
+        save(job, data)
+        if discover and isinstance(data, dict):
+            added = queue.enqueue(discovered_jobs(job, data))
+            if added:
+                logger.info(f"Discovered {added} new jobs from {job}")
+        queue.complete(job)
+        return True
+
+    async def run_job(job):
+        city = cities_by_code.get(job.region_code)
+        if city is None:
+            await asyncio.to_thread(queue.fail, job, "unknown region")
+            return False
+        # One job's failure (a bad payload, a full disk) marks only that job failed; the queue keeps draining
+        try:
+            data = await fetch_city_async(session, city, controller, limiter, proxy_pool,
+                                          base_url, job.event_code, date_code=job.date_code)
+            return await asyncio.to_thread(finish, job, data)
+        except Exception as e:
+            logger.error(f"Unhandled exception for job {job}: {e!r}")
+            await asyncio.to_thread(queue.fail, job, repr(e))
+            return False
+
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout),
+                                     trace_configs=[connection_trace_config(connection_stats)]) as session:
+        in_flight = set()
+        while True:
+            # Top up to the concurrency bound; discovered jobs become claimable as soon as they are added
+            if len(in_flight) < concurrency:
+                for job in await asyncio.to_thread(queue.claim, concurrency - len(in_flight)):
+                    in_flight.add(asyncio.create_task(run_job(job)))
+            if not in_flight:
+                break
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result():
+                    success_count += 1
+                else:
+                    failure_count += 1
+            completed = success_count + failure_count
+            if completed // 100 > (completed - len(done)) // 100:
+                print(f"Progress: {completed} jobs processed, {len(in_flight)} in flight.")
+
+    elapsed = time.perf_counter() - start
+    summary = (
+        f"Job run completed: {success_count} succeeded, {failure_count} failed in {elapsed:.1f}s "
+        f"({(success_count + failure_count) / elapsed if elapsed else 0:.1f} jobs/s)."
+    )
+    print(summary)
+    logger.info(summary)
+    stats = connection_stats.snapshot()
+    print(f"Connection reuse: {stats['reused']}/{stats['requests']} requests ({stats['reuse_rate']:.1%}).")
+    return success_count, failure_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch showtimes for several events, regions and dates from a persistent job queue.")
+    parser.add_argument('--events', nargs='+', default=[DEFAULT_EVENT_CODE], help="Event codes to enqueue.")
+    parser.add_argument('--dates', nargs='*', default=None, help="Date codes (YYYYMMDD); default: the server's default date.")
+    parser.add_argument('--regions', nargs='*', default=None, help="Sub-region codes; default: all regions in --cities.")
+    parser.add_argument('--cities', default='region_data_output.json', help="City data JSON file.")
+    parser.add_argument('--discover', action='store_true', help="Also fetch the child events and dates each response lists.")
+    parser.add_argument('--queue', default=DEFAULT_PATH, help="Job queue database.")
+    parser.add_argument('--requeue', action='store_true', help="Run finished and failed jobs again.")
+    parser.add_argument('--base-url', default=BASE_URL, help="Endpoint, e.g. a local replay server.")
+    parser.add_argument('--concurrency', type=int, default=200, help="Maximum jobs in flight across all events and dates.")
+    parser.add_argument('--host-rate', type=float, default=50.0, help="Requests/sec per host, 0 = unlimited.")
+    parser.add_argument('--format', choices=['parquet', 'delta'], default='parquet')
+    parser.add_argument('--output', default=None, help="Snapshot store root (parquet) or database file (delta).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    cities = load_cities(args.cities)
+    if not cities:
+        return
+    regions = args.regions or list(dict.fromkeys(city['sub_region_code'] for city in cities))
+
+    queue = JobQueue(args.queue)
+    if args.requeue:
+        print(f"Requeued {queue.requeue()} jobs.")
+    else:
+        # Jobs a killed run left as running would otherwise never be claimed again
+        queue.requeue(statuses=(RUNNING,))
+    added = queue.enqueue(expand_jobs(args.events, regions, args.dates or [None]))
+    print(f"Enqueued {added} new jobs; queue: {queue.counts()}")
+
+    snapshot = snapshot_timestamp()
+    if args.format == 'delta':
+        writer = DeltaCapture(args.output) if args.output else DeltaCapture()
+    else:
+        writer = SnapshotStore(args.output or 'snapshots')
+
+    def save(job, data):
+        writer.write_region(snapshot, job.region_code, data, part=job.part)
+
+    asyncio.run(run_jobs_async(queue, cities, save, concurrency=args.concurrency, host_rate=args.host_rate,
+                               base_url=args.base_url, discover=args.discover))
+    print(f"Queue: {queue.counts()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,125 @@
-from flask import Flask, render_template
-from fetch_showtimes import fetch_showtimes
+import json
+import logging
+import os
+from functools import partial
 
-# Fetch data for a specific city
-city_code = 'WAR'
-city_name = 'WAR'
-print(f"Fetching data for city: {city_name}")
-df = fetch_showtimes(city_code, city_name)
-print(f"Data fetching completed for city: {city_name}")
+from flask import Flask, Response, abort, render_template, request
+from fetch_showtimes import BASE_URL, fetch_showtimes
+from showtime_cache import LOADING, ShowtimeCache
+from showtime_index import DEFAULT_LIMIT, FILTER_COLUMNS, QueryError, ShowtimeIndex
+
+# Cities kept warm, as CODE or CODE:Name, e.g. SHOWTIME_CITIES="WAR,HYD:Hyderabad"
+CITIES = [
+    (code, name or code)
+    for code, _, name in (item.strip().partition(':') for item in os.environ.get('SHOWTIME_CITIES', 'WAR').split(','))
+    if code
+]
+TABLE_CLASSES = 'table table-striped table-hover table-bordered'
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Step 1: Keep showtimes cached and refreshed in the background; startup doesn't wait for the network
+cache = ShowtimeCache(
+    partial(fetch_showtimes, base_url=os.environ.get('SHOWTIMES_BASE_URL', BASE_URL)),
+    CITIES,
+    ttl=float(os.environ.get('SHOWTIME_TTL', 300)),
+    stale_for=float(os.environ.get('SHOWTIME_STALE_FOR', 1800)),
+    renderers={
+        'index': lambda entry: ShowtimeIndex(entry.df, entry.version),
+        'json': lambda entry: entry.df.to_json(orient='records'),
+    },
+).start()
+print(f"Serving cities: {', '.join(code for code, _ in CITIES)} (data loads in the background)")
 
 # Step 2: Display as a visually appealing webpage using Flask
 app = Flask(__name__)
 
+
+def cached_response(code, name, mimetype, render):
+    """
+    Serves a city's cached fragment with its data version as ETag.
+    """
+    if code not in cache.cities:
+        abort(404)
+    body, entry, status = cache.fragment(code, name, render)
+    if entry is None:
+        return None
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(entry.version)
+    response.headers['X-Cache'] = status
+    response.last_modified = entry.fetched_at
+    return response.make_conditional(request)
+
+
+def render_page(entry):
+    # The page shell (columns and filter menus) is rendered once per data version; rows load from /api/showtimes
+    index = entry.fragments['index']
+    filters = {param: index.values(param) for param in FILTER_COLUMNS}
+    return render_template('home.html', columns=index.columns, filters=filters, table_classes=TABLE_CLASSES)
+
+
 @app.route('/')
-def home():
-    print("Rendering home page...")
-    # Convert the DataFrame to HTML
-    html_table = df.to_html(classes='table table-striped table-hover table-bordered', index=False)
-    print("DataFrame converted to HTML table.")
-    
-    # Render the HTML template with the data
-    return render_template('home.html', html_table=html_table)
+@app.route('/city/<code>')
+def home(code=None):
+    code = code or CITIES[0][0]
+    response = cached_response(code, 'page', 'text/html', render_page)
+    if response is None:
+        loading = render_template('home.html', message=f"Fetching showtimes for {code}\u2026")
+        return Response(loading, status=503, headers={'Retry-After': '5', 'Refresh': '5', 'X-Cache': LOADING})
+    return response
+
+
+@app.route('/city/<code>.json')
+def city_json(code):
+    response = cached_response(code, 'json', 'application/json', lambda entry: entry.fragments['json'])
+    if response is None:
+        return Response('[]', status=503, mimetype='application/json', headers={'Retry-After': '5', 'X-Cache': LOADING})
+    return response
+
+
+@app.route('/api/showtimes')
+def api_showtimes():
+    """
+    One page of a city's rows: ?city=&venue=&showtime=&category= (repeatable),
+    &sort=Column or -Column, &limit=, &cursor= (next_cursor of the previous page).
+    """
+    code = request.args.get('city', CITIES[0][0])
+    if code not in cache.cities:
+        abort(404)
+    index, _, status = cache.fragment(code, 'index', lambda entry: ShowtimeIndex(entry.df, entry.version))
+    if index is None:
+        return Response('{"error":"loading"}', status=503, mimetype='application/json', headers={'Retry-After': '5'})
+    filters = {param: request.args.getlist(param) for param in FILTER_COLUMNS}
+    sort = request.args.get('sort') or None
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+
+    # The validator depends on the negotiated encoding: gzip and identity bodies differ byte for byte
+    compress = 'gzip' in request.accept_encodings
+    etag = index.etag(filters, sort, cursor, limit, compress)
+    if request.if_none_match.contains(etag):
+        # Same data version, query and encoding: nothing to build or serialise
+        response = Response(status=304)
+    else:
+        try:
+            etag, body = index.response(code, filters, sort, cursor, limit, compress=compress)
+        except QueryError as e:
+            return Response(json.dumps({'error': str(e)}), status=400, mimetype='application/json')
+        response = Response(body, mimetype='application/json')
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['X-Cache'] = status
+    return response
+
+
+@app.route('/cache/stats')
+def cache_stats():
+    return cache.stats()
+
 
 if __name__ == '__main__':
     print("Starting Flask server...")
-    app.run(debug=True, host='0.0.0.0')
+    # The reloader would start a second process with its own refresher thread
+    app.run(debug=True, host='0.0.0.0', use_reloader=False)
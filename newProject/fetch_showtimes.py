@@ -1,16 +1,22 @@
+import os
+import sys
+import urllib.parse as urlparse
 import requests
-import pandas as pd
-from datetime import datetime
-import pytz
 
-def fetch_showtimes(city_code, city_name):
+# Shared modules (showtime_parser, ...) live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bms_request import BASE_URL, DEFAULT_EVENT_CODE
+from http_pool import DEFAULT_TIMEOUT, get_session_pool
+from showtime_parser import parse_response, to_dataframe
+
+
+def fetch_showtimes(city_code, city_name, base_url=BASE_URL, timeout=DEFAULT_TIMEOUT):
     print(f"Fetching showtimes for {city_name}...")
-    base_url = "https://in.bookmyshow.com/api/movies-data/showtimes-by-event"
     params = {
         "appCode": "MOBAND2",
         "appVersion": "14304",
         "language": "en",
-        "eventCode": "ET00310216",
+        "eventCode": DEFAULT_EVENT_CODE,
         "regionCode": city_code,
         "subRegion": city_code,
         "bmsId": "1.21345445.1703250084656",
@@ -20,7 +26,7 @@ def fetch_showtimes(city_code, city_name):
         "query": ""
     }
     headers = {
-        "Host": "in.bookmyshow.com",
+        "Host": urlparse.urlsplit(base_url).netloc,
         "x-bms-id": "1.21345445.1703250084656",
         "x-region-code": city_code,
         "x-subregion-code": city_code,
@@ -33,47 +39,15 @@ def fetch_showtimes(city_code, city_name):
     
     try:
         print(f"Sending request to URL: {base_url} with params: {params} and headers: {headers}")
-        response = requests.get(base_url, headers=headers, params=params)
+        # Pooled keep-alive session shared with the other fetch paths, so connections are reused;
+        # the timeout keeps a stalled server from hanging the refresher thread
+        response = get_session_pool().get(base_url, headers=headers, params=params, stream=True, timeout=timeout)
         response.raise_for_status()
         print(f"Response status code: {response.status_code}")
-        data = response.json()
-        print(f"Response data: {data}")
-
-        results = []
-        for show_detail in data.get('ShowDetails', []):
-            print(f"Processing show detail: {show_detail}")
-            for venue in show_detail.get('Venues', []):
-                venue_name = venue.get('VenueName', '')
-                print(f"Processing venue: {venue_name}")
-                for show_time in venue.get('ShowTimes', []):
-                    show_time_str = show_time.get('ShowTime', '')
-                    print(f"Processing show time: {show_time_str}")
-                    for category in show_time.get('Categories', []):
-                        max_seats = int(category.get('MaxSeats', '0'))
-                        seats_avail = int(category.get('SeatsAvail', '0'))
-                        booked_tickets = max_seats - seats_avail
-                        current_price = float(category.get('CurPrice', '0'))
-
-                        booked_gross = booked_tickets * current_price
-                        total_gross = max_seats * current_price
-
-                        print(f"Processed category: {category.get('PriceDesc', '')}, MaxSeats: {max_seats}, SeatsAvailable: {seats_avail}, BookedTickets: {booked_tickets}, CurrentPrice: {current_price}")
-
-                        results.append({
-                            'VenueName': venue_name,
-                            'ShowTime': show_time_str,
-                            'Category': category.get('PriceDesc', ''),
-                            'MaxSeats': max_seats,
-                            'SeatsAvailable': seats_avail,
-                            'BookedTickets': booked_tickets,
-                            'CurrentPrice': current_price,
-                            'BookedGross': booked_gross,
-                            'TotalGross': total_gross
-                        })
 
-        df = pd.DataFrame(results)
+        df = to_dataframe(parse_response(response, streamed=True))
         print(f"Data fetched for {city_name}. DataFrame shape: {df.shape}")
         return df
     except requests.exceptions.RequestException as e:
         print(f"Request error occurred for {city_name}: {e}")
-        return pd.DataFrame()
+        return None
@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import threading
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FRESH, STALE, EXPIRED, LOADING = 'fresh', 'stale', 'expired', 'loading'
+
+
+class CacheEntry:
+    """
+    One city's data plus everything rendered from it. `version` is a hash
+    of the data, so a refresh that returns identical rows keeps the
+    rendered fragments.
+    """
+
+    def __init__(self, df, version, fetched_at):
+        self.df = df
+        self.version = version
+        self.fetched_at = fetched_at
+        self.fragments = {}  # name -> rendered str/bytes for this version
+
+
+def data_version(df):
+    """
+    Returns:
+        str: Short content hash of a DataFrame, used as cache version and ETag.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(','.join(map(str, df.columns)).encode())
+    if len(df):
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+class ShowtimeCache:
+    """
+    Per-city showtimes cache with background refresh.
+
+    A refresher thread re-fetches each city once its data is older than
+    `ttl`, so requests normally find fresh data. If the refresher falls
+    behind or a fetch fails, data up to `ttl + stale_for` old is still
+    served immediately (stale-while-revalidate) and a refresh is kicked off;
+    only older data makes a request wait, at most `max_wait` seconds, for
+    the refresh. Failed fetches keep the previous data.
+
+    Rendered output (HTML tables, JSON, whole pages) is memoized per data
+    version: renderers are run once when the data changes, not per request.
+    """
+
+    def __init__(self, fetch, cities, ttl=300, stale_for=1800, error_interval=60, max_wait=10, renderers=None):
+        """
+        Args:
+            fetch (callable): fetch(city_code, city_name) -> DataFrame (empty if the city has no shows),
+                None or an exception on failure.
+            cities (list): (city_code, city_name) pairs to keep cached.
+            ttl (float): Seconds data stays fresh.
+            stale_for (float): Further seconds stale data is served while it is refreshed.
+            error_interval (float): Seconds before retrying a city whose fetch failed.
+            max_wait (float): Longest a request waits for expired data to be refreshed.
+            renderers (dict): Fragment name -> render(CacheEntry), pre-rendered after every data change.
+        """
+        self.fetch = fetch
+        self.cities = dict(cities)
+        self.ttl = ttl
+        self.stale_for = stale_for
+        self.error_interval = error_interval
+        self.max_wait = max_wait
+        self.renderers = dict(renderers or {})
+        self._entries = {}  # city code -> CacheEntry
+        self._refreshing = {}  # city code -> threading.Event set when its refresh finishes
+        self._retry_at = {}  # city code -> earliest retry after a failed fetch
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.refreshes = 0
+        self.failures = 0
+
+    def start(self):
+        """
+        Starts the refresher thread; returns immediately, the first fetches happen in the background.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='showtime-cache-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _due(self, code):
+        entry = self._entries.get(code)
+        return max(entry.fetched_at + self.ttl if entry else 0, self._retry_at.get(code, 0))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            for code in list(self.cities):
+                if self._due(code) <= time.time():
+                    self.refresh(code)
+            next_due = min((self._due(code) for code in list(self.cities)), default=time.time() + self.ttl)
+            self._wake.wait(max(1.0, next_due - time.time()))
+            self._wake.clear()
+
+    def _claim(self, code):
+        # Returns (event to set when done, or None if already refreshing; event to wait on)
+        with self._lock:
+            if code in self._refreshing:
+                return None, self._refreshing[code]
+            done = self._refreshing[code] = threading.Event()
+            return done, done
+
+    def refresh(self, code):
+        """
+        Fetches one city now, unless a refresh of it is already running.
+        Returns:
+            bool: True if the data changed.
+        """
+        done, _ = self._claim(code)
+        return self._refresh(code, done) if done is not None else False
+
+    def _refresh_async(self, code):
+        done, pending = self._claim(code)
+        if done is not None:
+            threading.Thread(target=self._refresh, args=(code, done), daemon=True).start()
+        return pending
+
+    def _refresh(self, code, done):
+        try:
+            started = time.time()
+            df = self.fetch(code, self.cities.get(code, code))
+            if df is None:
+                # Keep serving what we have; the fetcher returns None on errors.
+                # An empty DataFrame is a valid answer (no shows in the city) and is cached like any other
+                self.failures += 1
+                self._retry_at[code] = time.time() + self.error_interval
+                logger.warning(f"Refresh of {code} failed; keeping the cached copy.")
+                return False
+            version = data_version(df)
+            with self._lock:
+                entry = self._entries.get(code)
+                changed = entry is None or entry.version != version
+                if changed:
+                    entry = CacheEntry(df, version, started)
+                else:
+                    entry.fetched_at = started
+            self._retry_at.pop(code, None)
+            self.refreshes += 1
+            if changed:
+                # Render before publishing the entry, so requests never render on the hot path
+                for name, render in self.renderers.items():
+                    entry.fragments[name] = render(entry)
+                with self._lock:
+                    self._entries[code] = entry
+                logger.info(f"Refreshed {code}: {len(df)} rows, version {version}.")
+            return changed
+        except Exception as e:
+            self.failures += 1
+            self._retry_at[code] = time.time() + self.error_interval
+            logger.error(f"Refresh of {code} failed: {e}")
+            return False
+        finally:
+            with self._lock:
+                del self._refreshing[code]
+            done.set()
+
+    def status(self, code, now=None):
+        entry = self._entries.get(code)
+        if entry is None:
+            return LOADING
+        age = (now or time.time()) - entry.fetched_at
+        if age < self.ttl:
+            return FRESH
+        return STALE if age < self.ttl + self.stale_for else EXPIRED
+
+    def get(self, code):
+        """
+        Returns the cached entry of a configured city without blocking on the
+        network unless its data has expired.
+        Returns:
+            tuple: (CacheEntry or None, status)
+        Raises:
+            KeyError: If the city is not one of the cached cities.
+        """
+        if code not in self.cities:
+            raise KeyError(code)
+        status = self.status(code)
+        if status == FRESH:
+            return self._entries[code], status
+        pending = self._refresh_async(code)
+        if status == EXPIRED and pending is not None:
+            pending.wait(self.max_wait)
+            status = self.status(code)
+        return self._entries.get(code), status
+
+    def fragment(self, code, name, render):
+        """
+        Returns a rendered fragment of a city's current data, rendering it at
+        most once per data version.
+        Args:
+            render (callable): render(CacheEntry) -> str/bytes.
+        Returns:
+            tuple: (fragment or None, CacheEntry or None, status)
+        """
+        entry, status = self.get(code)
+        if entry is None:
+            return None, None, status
+        fragment = entry.fragments.get(name)
+        if fragment is None:
+            fragment = entry.fragments[name] = render(entry)
+        return fragment, entry, status
+
+    def stats(self):
+        return {
+            'cities': {code: self.status(code) for code in self.cities},
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+        }
@@ -0,0 +1,195 @@
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Query parameter -> column with a posting-list index
+FILTER_COLUMNS = {
+    'venue': 'VenueName',
+    'showtime': 'ShowTime',
+    'category': 'Category',
+}
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class QueryError(ValueError):
+    """
+    A request the index cannot answer: unknown sort column, bad or expired cursor.
+    """
+
+
+def normalize_filters(filters):
+    """
+    Returns:
+        list: (param, sorted values) pairs of the non-empty filters, in a canonical order.
+    """
+    return sorted((param, sorted(values)) for param, values in (filters or {}).items() if values)
+
+
+def encode_cursor(version, sort, position):
+    raw = json.dumps([version, sort, int(position)], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, version, sort):
+    """
+    Returns:
+        int: Position, in the query's sort order, of the last row already returned.
+    Raises:
+        QueryError: If the cursor is malformed, from another sort, or from an older data version.
+    """
+    try:
+        cursor_version, cursor_sort, position = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise QueryError("Malformed cursor.")
+    if cursor_sort != sort:
+        raise QueryError("Cursor belongs to a different sort order.")
+    if cursor_version != version:
+        raise QueryError("Data has been refreshed since this cursor was issued; start again from the first page.")
+    return position
+
+
+class ShowtimeIndex:
+    """
+    Read-only query index over one version of a city's flattened rows.
+
+    Built once per data version: each FILTER_COLUMNS value maps to the
+    sorted positions of its rows (a posting list), and every column has a
+    precomputed stable sort order plus each row's rank in it. A query ORs
+    the posting lists of each filter, ANDs the filters into a row mask,
+    walks the chosen sort order keeping masked rows, and serialises only
+    the requested page. Cursors carry the sort position of the last row
+    returned, so the next page is a binary search rather than an offset scan.
+    """
+
+    def __init__(self, df, version, cache_size=256):
+        self.df = df.reset_index(drop=True)
+        self.version = version
+        self.columns = list(self.df.columns)
+        self._postings = {}
+        for param, column in FILTER_COLUMNS.items():
+            if column not in self.df:
+                continue
+            codes, uniques = self.df[column].factorize()
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self._postings[param] = {
+                value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)
+            }
+        self._orders = {}
+        self._ranks = {}
+        for column in self.columns:
+            order = np.argsort(self.df[column].to_numpy(), kind='stable')
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            self._orders[column] = order
+            self._ranks[column] = rank
+        self._responses = OrderedDict()  # (filters, sort, cursor, limit, gzip) -> (etag, body)
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def values(self, param):
+        """
+        Returns:
+            list: Distinct values of a filterable column, for building filter menus.
+        """
+        return sorted(map(str, self._postings.get(param, {})))
+
+    def _mask(self, filters):
+        mask = None
+        for param, values in filters.items():
+            postings = self._postings.get(param, {})
+            selected = np.zeros(len(self.df), dtype=bool)
+            for value in values:
+                selected[postings.get(value, [])] = True
+            mask = selected if mask is None else mask & selected
+        return mask
+
+    def _positions(self, rows, column, descending):
+        # Position of rows in the walk order of a query (the sort order, reversed if descending)
+        if column is None:
+            return rows
+        ranks = self._ranks[column][rows]
+        return len(self.df) - 1 - ranks if descending else ranks
+
+    def query(self, filters=None, sort=None, cursor=None, limit=DEFAULT_LIMIT):
+        """
+        Args:
+            filters (dict): Query parameter ('venue', 'showtime', 'category') -> accepted values.
+            sort (str): Column to sort by, '-Column' for descending; None keeps row order.
+            cursor (str): next_cursor of the previous page.
+            limit (int): Rows per page (at most MAX_LIMIT).
+        Returns:
+            dict: total, count, rows (JSON text of the page), next_cursor.
+        """
+        filters = {param: values for param, values in (filters or {}).items() if values}
+        descending = bool(sort) and sort.startswith('-')
+        column = sort.lstrip('-') if sort else None
+        if column is not None and column not in self._orders:
+            raise QueryError(f"Unknown sort column '{column}'.")
+        limit = max(1, min(int(limit), MAX_LIMIT))
+
+        order = self._orders[column] if column else np.arange(len(self.df))
+        if descending:
+            order = order[::-1]
+        mask = self._mask(filters)
+        rows = order if mask is None else order[mask[order]]
+        total = len(rows)
+        if cursor:
+            # Rows are in walk order, so their positions increase: resume with a binary search
+            after = decode_cursor(cursor, self.version, sort)
+            rows = rows[np.searchsorted(self._positions(rows, column, descending), after, side='right'):]
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(self.version, sort, self._positions(page[-1:], column, descending)[0])
+        return {
+            'total': total,
+            'count': len(page),
+            'rows': self.df.iloc[page].to_json(orient='records'),
+            'next_cursor': next_cursor,
+        }
+
+    def etag(self, filters, sort, cursor, limit, compress=False):
+        """
+        Returns:
+            str: ETag of a page, known before the page is built. Gzipped bodies get a
+                '-gz' suffix so they never share a strong validator with the identity body.
+        """
+        key = json.dumps([self.version, normalize_filters(filters), sort, cursor, limit], separators=(',', ':'))
+        etag = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+        return f'{etag}-gz' if compress else etag
+
+    def response(self, city, filters=None, sort=None, cursor=None, limit=DEFAULT_LIMIT, compress=False):
+        """
+        Serialised JSON page, gzipped if asked for; recent pages are kept in a small LRU.
+        Returns:
+            tuple: (etag, body bytes)
+        """
+        key = (json.dumps(normalize_filters(filters)), sort, cursor, limit, compress)
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached is not None:
+                self._responses.move_to_end(key)
+                return cached
+        result = self.query(dict(normalize_filters(filters)), sort, cursor, limit)
+        body = (
+            f'{{"city":{json.dumps(city)},"version":"{self.version}","total":{result["total"]},'
+            f'"count":{result["count"]},"next_cursor":{json.dumps(result["next_cursor"])},'
+            f'"rows":{result["rows"]}}}'
+        ).encode()
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+        cached = (self.etag(filters, sort, cursor, limit, compress), body)
+        with self._lock:
+            self._responses[key] = cached
+            if len(self._responses) > self._cache_size:
+                self._responses.popitem(last=False)
+        return cached
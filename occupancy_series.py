@@ -0,0 +1,285 @@
+import argparse
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from showtime_parser import num_rows
+from snapshot_store import DEFAULT_ROOT, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# Series attributes a query can group by, and the column each is encoded from
+GROUP_COLUMNS = {
+    'venue': 'VenueName',
+    'region': 'SubRegCode',
+    'event': 'EventCode',
+    'session': 'SessionId',
+    'category': 'Category',
+}
+
+
+def snapshot_epoch(snapshot):
+    """
+    Returns:
+        int: Epoch seconds of a snapshot id such as '20240924_153045' (IST).
+    """
+    return int(IST.localize(datetime.strptime(snapshot, '%Y%m%d_%H%M%S')).timestamp())
+
+
+class _Codes:
+    """
+    Interns strings as dense int32 codes, so each series stores a few
+    integers instead of repeating venue names and session ids.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def encode(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, codes):
+        return np.array(self.values, dtype=object)[codes] if self.values else np.array([], dtype=object)
+
+
+class OccupancySeries:
+    """
+    In-memory time series of booked seats per (VenueCode, SessionId,
+    AreaCatCode), fed with successive fetch results.
+
+    Only changes are stored: a point is appended when a category's
+    BookedTickets differs from its last value, carrying the time (uint32
+    epoch seconds), the series id (int32) and the change since the previous
+    point (int32). Tickets sold over any window is then the sum of the
+    changes inside it, so velocity queries are a filter and a bincount
+    over flat arrays. compact() folds old points into coarser buckets and
+    drops points past retention, keeping months of polling small.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}  # (venue_code, session_id, area_cat_code) -> series id
+        self._codes = {group: _Codes() for group in GROUP_COLUMNS}
+        self._attributes = {group: [] for group in GROUP_COLUMNS}  # group -> code per series
+        self._max_seats = []
+        self._last = np.zeros(0, dtype=np.int32)  # last booked value per series
+        self._pending = []  # (times, series, changes) chunks not yet consolidated
+        self._times = np.zeros(0, dtype=np.uint32)
+        self._ids = np.zeros(0, dtype=np.int32)
+        self._changes = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._times) + sum(len(chunk[0]) for chunk in self._pending)
+
+    def _series_ids(self, columns):
+        ids = np.empty(num_rows(columns), dtype=np.int32)
+        keys = zip(columns['VenueCode'], columns['SessionId'], columns['AreaCatCode'])
+        for row, key in enumerate(keys):
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = len(self._max_seats)
+                for group, column in GROUP_COLUMNS.items():
+                    self._attributes[group].append(self._codes[group].encode(columns[column][row]))
+                self._max_seats.append(int(columns['MaxSeats'][row]))
+            ids[row] = series
+        return ids
+
+    def ingest(self, columns, observed_at=None):
+        """
+        Adds one fetch result.
+        Args:
+            columns (dict): Parsed rows (see showtime_parser), e.g. from bms_api.request_showtimes.
+            observed_at (float): Epoch seconds of the fetch; defaults to now.
+        Returns:
+            int: Number of points appended.
+        """
+        if not num_rows(columns):
+            return 0
+        observed_at = int(observed_at if observed_at is not None else time.time())
+        booked = columns['BookedTickets'].astype(np.int32)
+        with self._lock:
+            ids = self._series_ids(columns)
+            known = len(self._last)
+            if len(self._max_seats) > known:
+                self._last = np.concatenate([self._last, np.full(len(self._max_seats) - known, -1, np.int32)])
+            previous = self._last[ids]
+            # First sighting is a baseline (change 0), not tickets sold in this window
+            changed = previous != booked
+            changes = np.where(previous < 0, 0, booked - previous)[changed].astype(np.int32)
+            self._last[ids] = booked
+            ids = ids[changed]
+            if len(ids):
+                self._pending.append((np.full(len(ids), observed_at, np.uint32), ids, changes))
+        return len(ids)
+
+    def ingest_store(self, store, snapshots=None):
+        """
+        Backfills from a SnapshotStore, one snapshot at a time in time order.
+        Returns:
+            int: Number of points appended.
+        """
+        columns = ['VenueCode', 'SessionId', 'AreaCatCode', 'MaxSeats', 'BookedTickets'] + list(GROUP_COLUMNS.values())
+        total = 0
+        for snapshot in snapshots or store.snapshots():
+            table = store.read(snapshots=[snapshot], columns=list(dict.fromkeys(columns)))
+            data = {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+            total += self.ingest(data, snapshot_epoch(snapshot))
+        return total
+
+    def _consolidate(self):
+        # Called with the lock held; keeps points sorted by time for range queries
+        if not self._pending:
+            return
+        times, ids, changes = zip(*self._pending)
+        self._pending = []
+        times = np.concatenate((self._times,) + times)
+        order = np.argsort(times, kind='stable')
+        self._times = times[order]
+        self._ids = np.concatenate((self._ids,) + ids)[order]
+        self._changes = np.concatenate((self._changes,) + changes)[order]
+
+    def _window(self, since, until):
+        self._consolidate()
+        start = 0 if since is None else np.searchsorted(self._times, since, side='right')
+        end = len(self._times) if until is None else np.searchsorted(self._times, until, side='right')
+        return slice(start, end)
+
+    def _span(self):
+        if not len(self._times):
+            return 0, 0
+        return int(self._times[0]), int(self._times[-1])
+
+    def span(self):
+        """
+        Returns:
+            tuple: Epoch seconds of the first and last point.
+        """
+        with self._lock:
+            self._consolidate()
+            return self._span()
+
+    def sold_per_hour(self, by='venue', since=None, until=None):
+        """
+        Tickets sold in (since, until] per group, fastest-selling first.
+        Args:
+            by (str): One of GROUP_COLUMNS ('venue', 'region', 'event', 'session', 'category').
+            since (float): Window start in epoch seconds (None: first point).
+            until (float): Window end in epoch seconds (None: last point).
+        Returns:
+            pandas.DataFrame: by, TicketsSold, TicketsPerHour.
+        """
+        import pandas as pd
+        with self._lock:
+            window = self._window(since, until)
+            groups = np.asarray(self._attributes[by], dtype=np.int32)
+            sold = np.bincount(groups[self._ids[window]], weights=self._changes[window],
+                               minlength=len(self._codes[by].values))
+            first, last = self._span()
+            names = self._codes[by].decode(np.arange(len(sold)))
+        start = since if since is not None else first
+        end = until if until is not None else last
+        hours = max(end - start, 1) / 3600
+        frame = pd.DataFrame({by: names, 'TicketsSold': sold.astype(np.int64), 'TicketsPerHour': sold / hours})
+        return frame[frame['TicketsSold'] != 0].sort_values('TicketsPerHour', ascending=False, ignore_index=True)
+
+    def timeline(self, by='venue', bucket=3600, since=None, until=None):
+        """
+        Tickets sold per group per time bucket.
+        Returns:
+            pandas.DataFrame: Bucket start (IST) index, one column per group.
+        """
+        import pandas as pd
+        with self._lock:
+            window = self._window(since, until)
+            times = self._times[window].astype(np.int64)
+            groups = np.asarray(self._attributes[by], dtype=np.int32)[self._ids[window]]
+            changes = self._changes[window]
+            names = self._codes[by].values[:]
+        if not len(times):
+            return pd.DataFrame()
+        slots = (times - 1) // bucket  # points at a bucket's end belong to it, as in compact()
+        slots -= slots.min()
+        width = len(names)
+        cells = np.bincount(slots * width + groups, weights=changes, minlength=(slots.max() + 1) * width)
+        starts = ((times.min() - 1) // bucket + np.arange(slots.max() + 1)) * bucket
+        index = pd.to_datetime(starts, unit='s', utc=True).tz_convert(IST)
+        frame = pd.DataFrame(cells.reshape(-1, width).astype(np.int64), index=index, columns=names)
+        return frame.loc[:, (frame != 0).any()]
+
+    def compact(self, now=None, raw_for=7 * 86400, bucket=3600, retention=None):
+        """
+        Downsamples and expires old points. Points older than `raw_for` are
+        merged into one point per series and `bucket`, stamped at the bucket
+        end; summing their changes keeps window totals exact at that
+        granularity. Points older than `retention` are dropped.
+        Returns:
+            tuple: (points before, points after)
+        """
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._consolidate()
+            before = len(self._times)
+            if retention is not None:
+                keep = np.searchsorted(self._times, now - retention, side='right')
+                self._times, self._ids, self._changes = self._times[keep:], self._ids[keep:], self._changes[keep:]
+            split = np.searchsorted(self._times, now - raw_for, side='right')
+            old_times = self._times[:split].astype(np.int64)
+            if split:
+                ends = ((old_times - 1) // bucket + 1) * bucket
+                keys = ends * len(self._max_seats) + self._ids[:split]
+                unique, inverse = np.unique(keys, return_inverse=True)
+                merged = np.bincount(inverse, weights=self._changes[:split]).astype(np.int32)
+                nonzero = merged != 0
+                self._times = np.concatenate([(unique // len(self._max_seats))[nonzero].astype(np.uint32),
+                                              self._times[split:]])
+                self._ids = np.concatenate([(unique % len(self._max_seats))[nonzero].astype(np.int32),
+                                            self._ids[split:]])
+                self._changes = np.concatenate([merged[nonzero], self._changes[split:]])
+            after = len(self._times)
+        logger.info(f"Compacted occupancy series: {before} -> {after} points.")
+        return before, after
+
+    def memory_usage(self):
+        """
+        Returns:
+            int: Approximate bytes held by the point arrays and the series index.
+        """
+        with self._lock:
+            self._consolidate()
+            points = self._times.nbytes + self._ids.nbytes + self._changes.nbytes
+            series = self._last.nbytes + len(self._max_seats) * (len(GROUP_COLUMNS) + 1) * 4
+            return points + series
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tickets sold per hour from the snapshot history.")
+    parser.add_argument('--root', default=DEFAULT_ROOT, help="Snapshot store root.")
+    parser.add_argument('--by', choices=sorted(GROUP_COLUMNS), default='venue')
+    parser.add_argument('--hours', type=float, default=None, help="Only the last N hours of the history.")
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    series = OccupancySeries()
+    points = series.ingest_store(SnapshotStore(args.root))
+    print(f"Loaded {points} points ({series.memory_usage() / 1024:.0f} KiB).")
+    since = None
+    if args.hours is not None:
+        since = series.span()[1] - args.hours * 3600
+    print(series.sold_per_hour(args.by, since).head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from bms_api import request_showtimes
+from bms_request import BASE_URL, DEFAULT_EVENT_CODE
+from occupancy_series import OccupancySeries
+from rollups import RollupEngine
+from showtime_parser import num_rows, to_arrow
+from snapshot_store import DEFAULT_ROOT, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+def ist_epoch(values):
+    """
+    Converts ShowDateTime/CutOffDateTime strings ('YYYYMMDDHHMM', IST) to epoch seconds.
+    Args:
+        values (numpy.ndarray): Timestamp strings.
+    Returns:
+        numpy.ndarray: float64 epoch seconds, NaN where a value is missing or malformed.
+    """
+    # A region has a few dozen distinct show times, so parse each distinct value once
+    uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    parsed = np.full(len(uniques), np.nan)
+    for i, value in enumerate(uniques):
+        try:
+            parsed[i] = IST.localize(datetime.strptime(value, '%Y%m%d%H%M')).timestamp()
+        except ValueError:
+            pass
+    return parsed[inverse]
+
+
+class PollPolicy:
+    """
+    Decides how soon a region is polled again from its open sessions.
+
+    A session is open until its CutOffDateTime (or ShowDateTime if no cut-off
+    is given). The next poll comes after `lead_fraction` of the time left
+    until the nearest cut-off, clamped to [min_interval, max_interval]: a
+    show closing in 20 minutes is polled every couple of minutes, one three
+    days away every few hours. A region without open sessions is only
+    re-checked every `idle_interval` for newly added shows.
+    """
+
+    def __init__(self, min_interval=60, max_interval=3 * 3600, idle_interval=6 * 3600, lead_fraction=0.1):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_interval = idle_interval
+        self.lead_fraction = lead_fraction
+
+    @staticmethod
+    def closing_times(columns):
+        cutoff = ist_epoch(columns['CutOffDateTime'])
+        return np.where(np.isnan(cutoff), ist_epoch(columns['ShowDateTime']), cutoff)
+
+    def open_mask(self, columns, now):
+        """
+        Returns:
+            numpy.ndarray: True for category rows of sessions still open for booking.
+        """
+        return self.closing_times(columns) > now  # NaN compares False: unknown times are closed
+
+    def next_interval(self, columns, now):
+        """
+        Returns:
+            float: Seconds until the region should be polled again.
+        """
+        closing = self.closing_times(columns)
+        closing = closing[closing > now]
+        if not len(closing):
+            return self.idle_interval
+        lead = closing.min() - now
+        return float(np.clip(lead * self.lead_fraction, self.min_interval, self.max_interval))
+
+
+class PollDaemon:
+    """
+    Long-running poller over fetch_showtimes' request path. Each region sits
+    in a heap keyed by its next poll time; a small thread pool polls regions
+    as they come due, stores the rows of sessions still open, and reschedules
+    the region using the PollPolicy.
+    """
+
+    def __init__(self, regions, store=None, policy=None, workers=4, base_url=BASE_URL,
+                 event_code=DEFAULT_EVENT_CODE, error_interval=300, clock=time.time, occupancy=None,
+                 rollups=None):
+        """
+        Args:
+            regions (list): (code, name) pairs to poll.
+            store (SnapshotStore): Where rows are written, one snapshot per poll.
+            policy (PollPolicy): Interval policy.
+            workers (int): Concurrent polls.
+            base_url (str): Endpoint to fetch from (live API or a replay server).
+            event_code (str): Event to poll.
+            error_interval (float): Delay before polling a region again after a failed request.
+            clock (callable): Returns the current epoch time.
+            occupancy (OccupancySeries): Optional time series fed with every poll's open sessions.
+            rollups (RollupEngine): Optional running totals updated with every poll's deltas.
+        """
+        self.regions = list(regions)
+        self.store = store or SnapshotStore()
+        self.policy = policy or PollPolicy()
+        self.workers = workers
+        self.base_url = base_url
+        self.event_code = event_code
+        self.error_interval = error_interval
+        self.clock = clock
+        self.occupancy = occupancy
+        self.rollups = rollups
+        self._heap = []
+        self._sequence = itertools.count()
+        self._stats_lock = threading.Lock()  # counters are updated from the pool threads
+        self.polls = 0
+        self.failures = 0
+        self.rows_stored = 0
+        self.rows_closed = 0
+
+    def _record(self, polls=0, failures=0, rows_stored=0, rows_closed=0):
+        with self._stats_lock:
+            self.polls += polls
+            self.failures += failures
+            self.rows_stored += rows_stored
+            self.rows_closed += rows_closed
+
+    def schedule(self, code, name, delay):
+        heapq.heappush(self._heap, (self.clock() + delay, next(self._sequence), code, name))
+
+    def poll(self, code, name):
+        """
+        Polls one region and stores its open sessions.
+        Returns:
+            float: Seconds until the region should be polled again.
+        """
+        try:
+            columns = request_showtimes(code, name, self.base_url, self.event_code)
+        except Exception as e:
+            logger.error(f"Poll of {code} failed: {e}")
+            self._record(failures=1)
+            return self.error_interval
+
+        try:
+            return self._store(code, columns)
+        except Exception as e:
+            # A bad payload or a storage error must not stop the daemon polling every other region
+            logger.error(f"Storing poll of {code} failed: {e!r}")
+            self._record(failures=1)
+            return self.error_interval
+
+    def _store(self, code, columns):
+        now = self.clock()
+        if self.rollups is not None:
+            self.rollups.update(code, columns)
+        open_rows = self.policy.open_mask(columns, now)
+        interval = self.policy.next_interval(columns, now)
+        stored = int(open_rows.sum())
+        if stored:
+            snapshot = datetime.fromtimestamp(now, IST).strftime('%Y%m%d_%H%M%S')
+            # Sessions past cut-off can no longer change, so they are not stored again
+            open_columns = {name: values[open_rows] for name, values in columns.items()}
+            self.store.write_table(snapshot, code, to_arrow(open_columns))
+            if self.occupancy is not None:
+                self.occupancy.ingest(open_columns, now)
+        self._record(polls=1, rows_stored=stored, rows_closed=num_rows(columns) - stored)
+        logger.info(f"Polled {code}: {stored}/{num_rows(columns)} rows in open sessions, "
+                    f"next poll in {interval / 60:.1f} min.")
+        return interval
+
+    def run(self, duration=None):
+        """
+        Polls until interrupted, or for `duration` seconds.
+        """
+        for code, name in self.regions:
+            self.schedule(code, name, 0)
+        deadline = None if duration is None else self.clock() + duration
+        print(f"Polling {len(self.regions)} regions for {self.event_code}.")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = {}
+            try:
+                while deadline is None or self.clock() < deadline:
+                    now = self.clock()
+                    while self._heap and self._heap[0][0] <= now:
+                        _, _, code, name = heapq.heappop(self._heap)
+                        in_flight[executor.submit(self.poll, code, name)] = (code, name)
+                    next_due = max(0.0, self._heap[0][0] - now) if self._heap else None
+                    if deadline is not None:
+                        next_due = min(next_due if next_due is not None else deadline - now, deadline - now)
+                    if not in_flight:
+                        time.sleep(next_due if next_due is not None else 1.0)
+                        continue
+                    done, _ = wait(in_flight, timeout=next_due, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        code, name = in_flight.pop(future)
+                        try:
+                            interval = future.result()
+                        except Exception as e:
+                            logger.error(f"Poll of {code} raised: {e!r}")
+                            self._record(failures=1)
+                            interval = self.error_interval
+                        # Always rescheduled, so one failing region never drops out of the rotation
+                        self.schedule(code, name, interval)
+            except KeyboardInterrupt:
+                print("Stopping poller.")
+        self.log_stats()
+
+    def log_stats(self):
+        message = (f"Polls: {self.polls} ({self.failures} failed), {self.rows_stored} open-session rows stored, "
+                   f"{self.rows_closed} rows of closed sessions skipped.")
+        logger.info(message)
+        print(message)
+        if self.rollups is not None:
+            self.rollups.log_summary()
+        if self.occupancy is not None:
+            velocity = self.occupancy.sold_per_hour('venue')
+            if len(velocity):
+                print(velocity.head(10).to_string(index=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continuously poll showtimes with refresh rates driven by showtimes.")
+    parser.add_argument('--regions', nargs='+', default=['HYD'], help="Region codes to poll.")
+    parser.add_argument('--base-url', default=BASE_URL, help="Endpoint, e.g. a local replay server.")
+    parser.add_argument('--event-code', default=DEFAULT_EVENT_CODE)
+    parser.add_argument('--output', default=DEFAULT_ROOT, help="Snapshot store root.")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent polls.")
+    parser.add_argument('--min-interval', type=float, default=60, help="Fastest poll rate per region, in seconds.")
+    parser.add_argument('--max-interval', type=float, default=3 * 3600, help="Slowest poll rate with open sessions.")
+    parser.add_argument('--idle-interval', type=float, default=6 * 3600, help="Poll rate without open sessions.")
+    parser.add_argument('--lead-fraction', type=float, default=0.1,
+                        help="Poll again after this share of the time left until the nearest cut-off.")
+    parser.add_argument('--duration', type=float, default=None, help="Stop after this many seconds.")
+    parser.add_argument('--velocity', action='store_true', help="Track booking velocity and report it on exit.")
+    parser.add_argument('--rollups', action='store_true', help="Keep running national totals and report them on exit.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    policy = PollPolicy(args.min_interval, args.max_interval, args.idle_interval, args.lead_fraction)
+    daemon = PollDaemon([(code, code) for code in args.regions], SnapshotStore(args.output), policy,
+                        workers=args.workers, base_url=args.base_url, event_code=args.event_code,
+                        occupancy=OccupancySeries() if args.velocity else None,
+                        rollups=RollupEngine() if args.rollups else None)
+    daemon.run(args.duration)
+
+
+if __name__ == "__main__":
+    main()
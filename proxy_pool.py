@@ -0,0 +1,243 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyStats:
+    """
+    Health record of one proxy: EWMA latency and success rate plus cooldown state.
+    """
+
+    __slots__ = ('proxy', 'latency', 'success_rate', 'failures', 'cooldown_until',
+                 'last_success', 'last_failure_reason', 'lock')
+
+    def __init__(self, proxy, latency=None):
+        self.proxy = proxy
+        self.latency = latency  # EWMA of response time in seconds, None until measured
+        self.success_rate = 1.0  # EWMA of 1 (success) / 0 (failure)
+        self.failures = 0  # consecutive failures, drives the cooldown length
+        self.cooldown_until = 0.0
+        self.last_success = None  # wall-clock time
+        self.last_failure_reason = None
+        self.lock = threading.Lock()
+
+    def score(self, default_latency=5.0):
+        """
+        Selection weight: reliable, fast proxies score highest.
+        """
+        latency = self.latency if self.latency is not None else default_latency
+        return max(self.success_rate, 0.01) / max(latency, 0.05)
+
+    def as_dict(self):
+        return {
+            'proxy': self.proxy,
+            'latency': self.latency,
+            'success_rate': self.success_rate,
+            'failures': self.failures,
+            'cooldown_until': self.cooldown_until,
+            'last_success': self.last_success,
+            'last_failure_reason': self.last_failure_reason,
+        }
+
+
+class ProxyPool:
+    """
+    Thread-safe pool of proxies with health scores.
+
+    Membership is copy-on-write: readers grab the current dict without
+    locking, writers (add/merge/remove) swap in a new dict under the pool lock.
+    Per-proxy statistics are guarded by the proxy's own lock, so reports from
+    many worker threads never contend on a single lock.
+
+    A failing proxy is not evicted; it is cooled down for an exponentially
+    growing period and then becomes eligible again. Only proxies that are
+    missing from a refresh *and* keep failing are dropped.
+    """
+
+    def __init__(self, proxies=(), alpha=0.3, base_cooldown=30.0, max_cooldown=1800.0):
+        self.alpha = alpha
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self._entries = {proxy: ProxyStats(proxy) for proxy in proxies}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __contains__(self, proxy):
+        return proxy in self._entries
+
+    def proxies(self):
+        return list(self._entries)
+
+    def stats(self, proxy):
+        return self._entries.get(proxy)
+
+    def add(self, proxy, latency=None):
+        """
+        Adds a single proxy, keeping existing statistics if it is already known.
+        Args:
+            proxy (str): Proxy in 'ip:port' format.
+            latency (float): Measured latency in seconds, if known.
+        Returns:
+            bool: True if the proxy was new.
+        """
+        with self._lock:
+            if proxy in self._entries:
+                existing = self._entries[proxy]
+            else:
+                entries = dict(self._entries)
+                entries[proxy] = ProxyStats(proxy, latency)
+                self._entries = entries
+                return True
+        if latency is not None:
+            self._update_latency(existing, latency)
+        return False
+
+    def restore(self, records):
+        """
+        Adds proxies with statistics carried over from a previous run.
+        Cooldowns are not restored; a proxy that was failing simply starts with
+        a low success rate and is tried again.
+        Args:
+            records (list): Dicts as produced by snapshot() (or ProxyStore.load()).
+        Returns:
+            int: Number of proxies added.
+        """
+        restored = {}
+        for record in records:
+            stats = ProxyStats(record['proxy'], record.get('latency'))
+            stats.success_rate = record.get('success_rate', 1.0)
+            stats.failures = record.get('failures', 0)
+            stats.last_success = record.get('last_success')
+            stats.last_failure_reason = record.get('last_failure_reason')
+            restored[stats.proxy] = stats
+        with self._lock:
+            entries = dict(self._entries)
+            added = 0
+            for proxy, stats in restored.items():
+                if proxy not in entries:
+                    entries[proxy] = stats
+                    added += 1
+            self._entries = entries
+        return added
+
+    def merge(self, proxies):
+        """
+        Atomically merges a refreshed proxy list into the pool.
+        Known proxies keep their scores, new ones are added, and proxies that
+        are absent from the refresh are dropped only while they are failing.
+        Args:
+            proxies (list): Freshly validated proxies in 'ip:port' format.
+        Returns:
+            tuple: (added, dropped) counts.
+        """
+        fresh = set(proxies)
+        with self._lock:
+            entries = {}
+            dropped = 0
+            for proxy, stats in self._entries.items():
+                if proxy in fresh or stats.failures == 0:
+                    entries[proxy] = stats
+                else:
+                    dropped += 1
+            added = 0
+            for proxy in fresh:
+                if proxy not in entries:
+                    entries[proxy] = ProxyStats(proxy)
+                    added += 1
+            self._entries = entries
+        logger.info(f"Proxy pool merged: {added} added, {dropped} dropped, {len(entries)} total.")
+        return added, dropped
+
+    def remove(self, proxy):
+        with self._lock:
+            if proxy in self._entries:
+                entries = dict(self._entries)
+                del entries[proxy]
+                self._entries = entries
+
+    def choose(self):
+        """
+        Picks a proxy at random, weighted by score, among those not cooling down.
+        If every proxy is cooling down, the one that recovers first is returned
+        rather than failing the request outright.
+        Returns:
+            str or None: Proxy in 'ip:port' format, None if the pool is empty.
+        """
+        entries = list(self._entries.values())
+        if not entries:
+            return None
+        now = time.monotonic()
+        available = [stats for stats in entries if stats.cooldown_until <= now]
+        if not available:
+            return min(entries, key=lambda stats: stats.cooldown_until).proxy
+        weights = [stats.score() for stats in available]
+        return random.choices(available, weights=weights)[0].proxy
+
+    def next_available_in(self):
+        """
+        Returns:
+            float: Seconds until at least one proxy is out of cooldown (0 if one already is).
+        """
+        entries = list(self._entries.values())
+        if not entries:
+            return 0.0
+        return max(0.0, min(stats.cooldown_until for stats in entries) - time.monotonic())
+
+    def _update_latency(self, stats, latency):
+        with stats.lock:
+            if stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += self.alpha * (latency - stats.latency)
+
+    def report_success(self, proxy, latency=None):
+        """
+        Records a successful request through `proxy`.
+        Args:
+            proxy (str): Proxy in 'ip:port' format.
+            latency (float): Response time in seconds.
+        """
+        stats = self._entries.get(proxy)
+        if stats is None:
+            return
+        if latency is not None:
+            self._update_latency(stats, latency)
+        with stats.lock:
+            stats.success_rate += self.alpha * (1.0 - stats.success_rate)
+            stats.failures = 0
+            stats.cooldown_until = 0.0
+            stats.last_success = time.time()
+
+    def report_failure(self, proxy, reason=None):
+        """
+        Records a failed request through `proxy` and cools it down.
+        Args:
+            proxy (str): Proxy in 'ip:port' format.
+            reason (str): Short failure description, kept for diagnostics.
+        """
+        stats = self._entries.get(proxy)
+        if stats is None:
+            return
+        with stats.lock:
+            stats.success_rate -= self.alpha * stats.success_rate
+            stats.failures += 1
+            cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (stats.failures - 1))
+            stats.cooldown_until = time.monotonic() + cooldown
+            stats.last_failure_reason = reason
+        logger.debug(f"Proxy {proxy} cooling down for {cooldown:.0f}s after failure: {reason}")
+
+    def snapshot(self):
+        """
+        Returns:
+            list: Per-proxy statistics as dicts, best score first.
+        """
+        entries = sorted(self._entries.values(), key=lambda stats: stats.score(), reverse=True)
+        return [stats.as_dict() for stats in entries]
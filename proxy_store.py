@@ -0,0 +1,121 @@
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "proxy_health.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proxy_health (
+    proxy TEXT PRIMARY KEY,
+    latency REAL,
+    success_rate REAL NOT NULL,
+    failures INTEGER NOT NULL,
+    last_success REAL,
+    last_failure_reason TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class ProxyStore:
+    """
+    SQLite-backed record of what previous runs learned about each proxy, so a
+    new run can warm-start its ProxyPool with proxies known to work against
+    in.bookmyshow.com instead of waiting for validation.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        # One connection per store, used under the lock, instead of a new handle per call
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._lock = threading.Lock()
+
+    def save(self, proxy_pool):
+        """
+        Upserts the current statistics of every proxy in the pool.
+        Args:
+            proxy_pool (ProxyPool): Pool to persist.
+        Returns:
+            int: Number of proxies written.
+        """
+        now = time.time()
+        rows = [
+            (r['proxy'], r['latency'], r['success_rate'], r['failures'],
+             r['last_success'], r['last_failure_reason'], now)
+            for r in proxy_pool.snapshot()
+        ]
+        with self._lock, self._conn as conn:
+            conn.executemany(
+                "INSERT INTO proxy_health (proxy, latency, success_rate, failures, last_success, "
+                "last_failure_reason, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(proxy) DO UPDATE SET latency=excluded.latency, "
+                "success_rate=excluded.success_rate, failures=excluded.failures, "
+                "last_success=COALESCE(excluded.last_success, proxy_health.last_success), "
+                "last_failure_reason=excluded.last_failure_reason, updated_at=excluded.updated_at",
+                rows,
+            )
+        logger.debug(f"Saved health of {len(rows)} proxies to {self.path}")
+        return len(rows)
+
+    def load(self, max_age=3 * 86400, min_success_rate=0.3, limit=None):
+        """
+        Loads proxies worth retrying, most successful first.
+        Args:
+            max_age (float): Ignore proxies without a success in this many seconds.
+            min_success_rate (float): Ignore proxies scoring below this success EWMA.
+            limit (int): Maximum number of proxies to return.
+        Returns:
+            list: Dicts with proxy, latency, success_rate, failures, last_success,
+            last_failure_reason.
+        """
+        query = (
+            "SELECT proxy, latency, success_rate, failures, last_success, last_failure_reason "
+            "FROM proxy_health WHERE last_success >= ? AND success_rate >= ? "
+            "ORDER BY success_rate DESC, latency ASC"
+        )
+        params = [time.time() - max_age, min_success_rate]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock, self._conn as conn:
+            rows = conn.execute(query, params).fetchall()
+        columns = ('proxy', 'latency', 'success_rate', 'failures', 'last_success', 'last_failure_reason')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def warm_start(self, proxy_pool, **kwargs):
+        """
+        Seeds a pool with the known-good proxies of previous runs.
+        Args:
+            proxy_pool (ProxyPool): Pool to seed.
+            **kwargs: Passed on to load().
+        Returns:
+            int: Number of proxies added to the pool.
+        """
+        added = proxy_pool.restore(self.load(**kwargs))
+        logger.info(f"Warm-started proxy pool with {added} proxies from {self.path}")
+        print(f"Warm-started proxy pool with {added} known-good proxies.")
+        return added
+
+    def prune(self, max_age=14 * 86400):
+        """
+        Deletes proxies that have not succeeded (or been seen) for `max_age` seconds.
+        Returns:
+            int: Number of rows deleted.
+        """
+        cutoff = time.time() - max_age
+        with self._lock, self._conn as conn:
+            cursor = conn.execute(
+                "DELETE FROM proxy_health WHERE COALESCE(last_success, 0) < ? AND updated_at < ?",
+                (cutoff, cutoff),
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
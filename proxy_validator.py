@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import threading
+import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+TEST_URL = "https://httpbin.org/get"
+
+
+async def validate_proxy_async(session, proxy, test_url=TEST_URL):
+    """
+    Validates a single proxy and measures its latency.
+    Args:
+        session (aiohttp.ClientSession): Session carrying the connect/total timeouts.
+        proxy (str): Proxy in 'ip:port' format.
+        test_url (str): URL to test the proxy against.
+    Returns:
+        float or None: Round-trip time in seconds, None if the proxy is unusable.
+    """
+    started = time.perf_counter()
+    try:
+        async with session.get(test_url, proxy=f"http://{proxy}") as response:
+            await response.read()
+            if response.status == 200:
+                latency = time.perf_counter() - started
+                logger.debug(f"Proxy {proxy} is valid ({latency:.2f}s).")
+                return latency
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        pass
+    logger.debug(f"Proxy {proxy} is invalid.")
+    return None
+
+
+async def validate_proxies_async(proxy_list, proxy_pool=None, test_url=TEST_URL, concurrency=500,
+                                 connect_timeout=3, timeout=8, target_size=None, on_valid=None):
+    """
+    Validates many proxies concurrently, streaming each one into the pool as soon as it passes.
+    Args:
+        proxy_list (list): Proxies in 'ip:port' format.
+        proxy_pool (ProxyPool): Optional pool that receives valid proxies with their latency.
+        test_url (str): URL to test the proxies against.
+        concurrency (int): Maximum number of proxies tested at once.
+        connect_timeout (float): Seconds allowed to connect to a proxy.
+        timeout (float): Seconds allowed for the whole test request.
+        target_size (int): Stop as soon as this many proxies passed (None tests all).
+        on_valid (callable): Called with (proxy, latency) for every valid proxy.
+    Returns:
+        list: (proxy, latency) tuples, fastest first.
+    """
+    proxy_list = list(dict.fromkeys(proxy_list))  # Drop duplicates, keep order
+    results = []
+    pending = iter(proxy_list)
+    client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+    connector = aiohttp.TCPConnector(limit=concurrency, force_close=True)
+    workers = []
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+
+        async def worker():
+            # All workers share one iterator; next() never awaits, so no proxy is tested twice
+            for proxy in pending:
+                latency = await validate_proxy_async(session, proxy, test_url)
+                if latency is None:
+                    continue
+                results.append((proxy, latency))
+                if proxy_pool is not None:
+                    proxy_pool.add(proxy, latency)
+                if on_valid is not None:
+                    on_valid(proxy, latency)
+                if target_size and len(results) >= target_size:
+                    # Early cut-off: abandon the proxies still being tested
+                    for task in workers:
+                        if task is not asyncio.current_task():
+                            task.cancel()
+                    return
+
+        workers.extend(asyncio.create_task(worker()) for _ in range(min(concurrency, len(proxy_list))))
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    results.sort(key=lambda item: item[1])
+    logger.info(f"Validated proxies: {len(results)} out of {len(proxy_list)}")
+    print(f"Validated proxies: {len(results)} out of {len(proxy_list)}")
+    return results
+
+
+def validate_in_background(proxy_list, proxy_pool, min_ready=5, **kwargs):
+    """
+    Runs the async validator on a background thread so fetching can start
+    as soon as the first few proxies are known to work.
+    Args:
+        proxy_list (list): Proxies in 'ip:port' format.
+        proxy_pool (ProxyPool): Pool that receives valid proxies as they pass.
+        min_ready (int): Number of valid proxies after which `ready` is set.
+        **kwargs: Passed on to validate_proxies_async.
+    Returns:
+        tuple: (thread, ready) where `ready` is a threading.Event that is also
+        set when validation finishes without reaching `min_ready`.
+    """
+    ready = threading.Event()
+
+    def on_valid(proxy, latency):
+        if len(proxy_pool) >= min_ready:
+            ready.set()
+
+    def run():
+        try:
+            asyncio.run(validate_proxies_async(proxy_list, proxy_pool, on_valid=on_valid, **kwargs))
+        except Exception as e:
+            logger.error(f"Proxy validation failed: {e}")
+        finally:
+            ready.set()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, ready
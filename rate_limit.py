@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean "slow down" rather than "this request is broken"
+THROTTLE_STATUSES = (403, 429)
+
+
+def is_throttle(status_code=None, error=None):
+    """
+    Tells whether a response or exception is the server pushing back.
+    Args:
+        status_code (int): HTTP status code of the response, if any.
+        error (Exception): Exception raised by the request, if any.
+    Returns:
+        bool: True for 429/403 and Cloudflare challenge errors.
+    """
+    if status_code in THROTTLE_STATUSES:
+        return True
+    if error is not None:
+        response = getattr(error, 'response', None)
+        if getattr(response, 'status_code', None) in THROTTLE_STATUSES:
+            return True
+        # cloudscraper.exceptions.CloudflareChallengeError and friends, without importing cloudscraper
+        return any(cls.__name__.startswith('Cloudflare') for cls in type(error).__mro__)
+    return False
+
+
+def retry_after_seconds(response, default=None):
+    """
+    Reads a numeric Retry-After header.
+    Returns:
+        float or None: Seconds to wait, or `default` if the header is missing/unparseable.
+    """
+    value = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `burst` saved up.
+    Tokens are reserved up front and may go negative, so callers only ever
+    sleep once for exactly the time their reservation needs.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def reserve(self):
+        """
+        Takes one token.
+        Returns:
+            float: Seconds the caller has to wait before using it.
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def pause(self, seconds):
+        """
+        Empties the bucket so that no token is available for `seconds`.
+        """
+        if not self.rate:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def acquire(self):
+        time.sleep(self.reserve())
+
+    async def acquire_async(self):
+        await asyncio.sleep(self.reserve())
+
+
+class RateLimiter:
+    """
+    Token buckets per host and per proxy. A request has to fit into both
+    budgets: the host budget protects the target, the proxy budget keeps any
+    single exit IP under the radar.
+    """
+
+    def __init__(self, host_rate=2.0, proxy_rate=0.5, host_burst=None, proxy_burst=None):
+        self.host_rate = host_rate
+        self.proxy_rate = proxy_rate
+        self.host_burst = host_burst
+        self.proxy_burst = proxy_burst
+        self._buckets = {}  # (kind, key) -> TokenBucket
+        self._lock = threading.Lock()
+
+    def bucket(self, kind, key):
+        with self._lock:
+            bucket = self._buckets.get((kind, key))
+            if bucket is None:
+                if kind == 'host':
+                    bucket = TokenBucket(self.host_rate, self.host_burst)
+                else:
+                    bucket = TokenBucket(self.proxy_rate, self.proxy_burst)
+                self._buckets[(kind, key)] = bucket
+            return bucket
+
+    def reserve(self, host, proxy=None):
+        wait = self.bucket('host', host).reserve()
+        if proxy:
+            wait = max(wait, self.bucket('proxy', proxy).reserve())
+        return wait
+
+    def acquire(self, host, proxy=None):
+        """
+        Blocks the calling thread until the request fits the host and proxy budgets.
+        Args:
+            host (str): Target host.
+            proxy (str): Proxy in 'ip:port' format, or None.
+        """
+        time.sleep(self.reserve(host, proxy))
+
+    async def acquire_async(self, host, proxy=None):
+        await asyncio.sleep(self.reserve(host, proxy))
+
+    def penalize(self, host=None, proxy=None, seconds=10.0):
+        """
+        Stops handing out tokens for a throttled host and/or proxy for `seconds`.
+        """
+        if host:
+            self.bucket('host', host).pause(seconds)
+        if proxy:
+            self.bucket('proxy', proxy).pause(seconds)
+        logger.debug(f"Rate limiter paused host={host} proxy={proxy} for {seconds:.1f}s")
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency controller with slow start.
+
+    Healthy responses raise the limit (by one per success until the first
+    throttle, then by one per `limit` successes); a throttle response halves
+    it, at most once per `cooldown` seconds so a burst of 429s from requests
+    that were already in flight counts as a single signal.
+    """
+
+    def __init__(self, initial=10, min_limit=1, max_limit=100, decrease_factor=0.5, cooldown=2.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._threshold = float(max_limit)  # slow-start threshold
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self.throttles = 0
+        self._condition = threading.Condition()
+        self._async_condition = None
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def record_success(self):
+        with self._condition:
+            if self._limit < self._threshold:
+                self._limit += 1
+            else:
+                self._limit += 1 / self._limit
+            self._limit = min(self._limit, self.max_limit)
+            self._condition.notify_all()
+
+    def record_throttle(self):
+        with self._condition:
+            self.throttles += 1
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+            self._threshold = max(self.min_limit, self._limit)
+            logger.info(f"Throttled: concurrency limit lowered to {self.limit}")
+
+    def record(self, status_code=None, error=None):
+        """
+        Feeds one request outcome into the controller.
+        Args:
+            status_code (int): HTTP status code, if a response was received.
+            error (Exception): Exception raised by the request, if any.
+        """
+        if is_throttle(status_code, error):
+            self.record_throttle()
+        elif error is None and status_code is not None and status_code < 400:
+            self.record_success()
+
+    def _try_enter(self):
+        with self._condition:
+            if self._in_flight < self.limit:
+                self._in_flight += 1
+                return True
+            return False
+
+    def _exit(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """
+        Holds one concurrency slot for the calling thread.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._exit()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """
+        Holds one concurrency slot for the calling coroutine.
+        """
+        if self._async_condition is None:
+            self._async_condition = asyncio.Condition()
+        async with self._async_condition:
+            await self._async_condition.wait_for(self._try_enter)
+        try:
+            yield
+        finally:
+            self._exit()
+            async with self._async_condition:
+                self._async_condition.notify_all()
+
+
+_default_rate_limiter = None
+_default_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Returns the process-wide RateLimiter shared by the serial and threaded fetchers.
+    Returns:
+        RateLimiter
+    """
+    global _default_rate_limiter
+    with _default_rate_limiter_lock:
+        if _default_rate_limiter is None:
+            _default_rate_limiter = RateLimiter()
+        return _default_rate_limiter
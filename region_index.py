@@ -0,0 +1,171 @@
+import argparse
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+
+from snapshot_store import DEFAULT_ROOT, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# A category row is the same seat inventory whichever overlapping sub-region returned it
+DEDUP_KEYS = ['VenueCode', 'SessionId', 'AreaCatCode']
+
+
+class DedupIndex:
+    """
+    Thread-safe index of the (VenueCode, SessionId, AreaCatCode) rows already
+    stored for a snapshot. Overlapping sub-regions (MUMBAI/MWEST/MCENT,
+    NCR/DELHI/GURG, ...) return the same venues; only the first region to
+    report a row keeps it.
+    """
+
+    def __init__(self, max_snapshots=2):
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()  # snapshot -> set of keys
+
+    def claim(self, snapshot, keys):
+        """
+        Marks keys as seen for a snapshot.
+        Args:
+            snapshot (str): Snapshot timestamp.
+            keys (iterable): (VenueCode, SessionId, AreaCatCode) tuples.
+        Returns:
+            numpy.ndarray: Boolean mask, True where the key was new.
+        """
+        with self._lock:
+            seen = self._seen.get(snapshot)
+            if seen is None:
+                seen = self._seen[snapshot] = set()
+                # Older sweeps are finished; keep memory bounded for long-running pollers
+                while len(self._seen) > self.max_snapshots:
+                    self._seen.popitem(last=False)
+            mask = []
+            for key in keys:
+                mask.append(key not in seen)
+                seen.add(key)
+        return np.array(mask, dtype=bool)
+
+    def filter(self, snapshot, columns):
+        """
+        Drops rows of a parsed region already claimed by another region.
+        Args:
+            snapshot (str): Snapshot timestamp.
+            columns (dict): Output of one of the showtime_parser parse_* functions.
+        Returns:
+            dict: Columns with duplicate rows removed.
+        """
+        mask = self.claim(snapshot, zip(*(columns[name] for name in DEDUP_KEYS)))
+        if mask.all():
+            return columns
+        logger.debug(f"Dropped {int((~mask).sum())} rows already stored for {snapshot}")
+        return {name: values[mask] for name, values in columns.items()}
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(seen) for seen in self._seen.values())
+
+
+def _combined(table):
+    # Dataset reads yield one dictionary per file; group_by needs a single one per column
+    return table.unify_dictionaries().combine_chunks()
+
+
+def drop_duplicate_rows(table, keys=DEDUP_KEYS):
+    """
+    Keeps the first row of every (VenueCode, SessionId, AreaCatCode), per
+    snapshot when the table spans several.
+    Args:
+        table (pyarrow.Table): Category rows, e.g. from SnapshotStore.read.
+    Returns:
+        pyarrow.Table
+    """
+    if not table.num_rows:
+        return table
+    if 'snapshot' in table.column_names:
+        keys = keys + ['snapshot']
+    indexed = _combined(table.select(keys)).append_column('_row', pa.array(np.arange(table.num_rows)))
+    first = indexed.group_by(keys, use_threads=False).aggregate([('_row', 'min')])['_row_min']
+    return table.take(np.sort(first.to_numpy()))
+
+
+def venue_coverage(table):
+    """
+    Args:
+        table (pyarrow.Table): Category rows with 'region' and 'VenueCode' columns.
+    Returns:
+        dict: Region code -> set of VenueCodes it returned.
+    """
+    coverage = {}
+    pairs = _combined(table.select(['region', 'VenueCode']))
+    pairs = pairs.group_by(['region', 'VenueCode'], use_threads=False).aggregate([])
+    for region, venue in zip(pairs['region'].to_pylist(), pairs['VenueCode'].to_pylist()):
+        coverage.setdefault(region, set()).add(venue)
+    return coverage
+
+
+def minimal_cover(coverage):
+    """
+    Picks a small set of regions that together return every venue.
+    Exact set cover is NP-hard, so this is the greedy approximation (largest
+    number of still-uncovered venues first) followed by a pass that drops
+    any picked region whose venues are all covered by the others.
+    Args:
+        coverage (dict): Region code -> set of VenueCodes.
+    Returns:
+        list: Region codes, sorted.
+    """
+    remaining = set().union(*coverage.values()) if coverage else set()
+    cover = []
+    while remaining:
+        # Sorted so ties resolve the same way on every run
+        best = max(sorted(coverage), key=lambda region: len(coverage[region] & remaining))
+        cover.append(best)
+        remaining -= coverage[best]
+
+    for region in reversed(list(cover)):
+        others = set().union(*(coverage[other] for other in cover if other != region))
+        if coverage[region] <= others:
+            cover.remove(region)
+    return sorted(cover)
+
+
+def plan_regions(store, snapshots=None):
+    """
+    Computes the minimal region set covering all venues seen in prior snapshots.
+    Args:
+        store (SnapshotStore): Parquet snapshot store to learn coverage from.
+        snapshots (list): Snapshot timestamps to use (None uses all).
+    Returns:
+        tuple: (cover, coverage) - sorted region codes and the region -> venues map.
+    """
+    table = store.read(snapshots=snapshots, columns=['region', 'VenueCode'])
+    if not table.num_rows:
+        return [], {}
+    coverage = venue_coverage(table)
+    return minimal_cover(coverage), coverage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan the minimal set of regions covering all known venues.")
+    parser.add_argument('--root', default=DEFAULT_ROOT, help="Snapshot store root.")
+    parser.add_argument('--snapshots', nargs='*', default=None, help="Snapshots to learn from (default: all).")
+    parser.add_argument('--output', default=None, help="Write the planned region codes to this file, one per line.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    cover, coverage = plan_regions(SnapshotStore(args.root), args.snapshots)
+    venues = set().union(*coverage.values()) if coverage else set()
+    print(f"{len(cover)} of {len(coverage)} regions with venues cover all {len(venues)} venues.")
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write('\n'.join(cover) + '\n')
+    else:
+        print(' '.join(cover))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import glob
+import gzip
+import json
+import logging
+import os
+import random
+from collections import Counter
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SHOWTIMES_PATH = "/api/movies-data/showtimes-by-event"
+
+# Returned for regions that are not in the snapshot, mirroring the live "no shows" payload
+EMPTY_RESPONSE = json.dumps({"ShowDetails": [], "ShowDatesArray": []}).encode('utf-8')
+
+
+def latest_snapshot(base_directory='data'):
+    """
+    Finds the most recent data/<timestamp>/ snapshot directory.
+    Args:
+        base_directory (str): Parent directory for all snapshots.
+    Returns:
+        str or None: Path of the newest snapshot directory.
+    """
+    snapshots = sorted(d for d in glob.glob(os.path.join(base_directory, '*')) if os.path.isdir(d))
+    return snapshots[-1] if snapshots else None
+
+
+def load_snapshot(directory_name):
+    """
+    Loads every <CODE>.json (or gzipped <CODE>.json.gz) response of a snapshot as raw bytes.
+    Args:
+        directory_name (str): data/<timestamp>/ or a snapshot store raw/<timestamp>/ directory.
+    Returns:
+        dict: Region code -> response body bytes.
+    """
+    responses = {}
+    paths = glob.glob(os.path.join(directory_name, '*.json')) + glob.glob(os.path.join(directory_name, '*.json.gz'))
+    for path in paths:
+        code = os.path.basename(path).split('.', 1)[0]
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            # Re-encode compactly; the recorded files are pretty-printed
+            responses[code] = json.dumps(json.load(f), ensure_ascii=False).encode('utf-8')
+    logger.info(f"Loaded {len(responses)} responses from {directory_name}")
+    return responses
+
+
+# Body of a Cloudflare interstitial; cloudscraper recognises the title and challenge script
+CHALLENGE_BODY = (
+    "<!DOCTYPE html><html><head><title>Just a moment...</title></head><body>"
+    "<script>window._cf_chl_opt={cType: 'managed'};</script>"
+    "<div id=\"challenge-body-text\">Checking if the site connection is secure</div></body></html>"
+)
+
+
+class FaultProfile:
+    """
+    What the stand-in server does besides replaying: added latency, and the
+    share of requests answered with a 5xx error, a 429 or a Cloudflare-like
+    challenge page.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 challenge_rate=0.0, retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.challenge_rate = challenge_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+    def delay(self):
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def pick_fault(self):
+        """
+        Returns:
+            str or None: 'error', 'throttle', 'challenge' or None for a normal response.
+        """
+        roll = self.random.random()
+        for fault, rate in (('error', self.error_rate), ('throttle', self.throttle_rate),
+                            ('challenge', self.challenge_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+
+def create_app(directory_name, faults=None):
+    """
+    Creates an aiohttp app that replays a recorded snapshot for showtimes-by-event.
+    Args:
+        directory_name (str): Snapshot directory to replay.
+        faults (FaultProfile): Optional latency and failure injection.
+    Returns:
+        aiohttp.web.Application
+    """
+    responses = load_snapshot(directory_name)
+    faults = faults or FaultProfile()
+    counters = Counter()
+
+    async def showtimes_by_event(request):
+        counters['requests'] += 1
+        delay = faults.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        fault = faults.pick_fault()
+        if fault:
+            counters[fault] += 1
+        if fault == 'error':
+            return web.Response(status=502, text="Bad Gateway")
+        if fault == 'throttle':
+            return web.Response(status=429, text="Too Many Requests",
+                                headers={'Retry-After': str(faults.retry_after)})
+        if fault == 'challenge':
+            return web.Response(status=403, text=CHALLENGE_BODY, content_type='text/html',
+                                headers={'Server': 'cloudflare', 'cf-mitigated': 'challenge'})
+        query = request.query
+        body = responses.get(query.get('subRegion', '')) or responses.get(query.get('regionCode', ''))
+        counters['ok'] += 1
+        return web.Response(body=body or EMPTY_RESPONSE, content_type='application/json')
+
+    async def stats(request):
+        return web.json_response(dict(counters))
+
+    app = web.Application()
+    app['responses'] = responses
+    app['counters'] = counters
+    app.router.add_get(SHOWTIMES_PATH, showtimes_by_event)
+    app.router.add_get('/stats', stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for in.bookmyshow.com showtimes-by-event.")
+    parser.add_argument('--snapshot', default=None, help="Snapshot directory (defaults to the latest under data/).")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="Added response latency in seconds.")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Uniform +/- jitter on the latency in seconds.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 502.")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Share of requests answered with 429.")
+    parser.add_argument('--challenge-rate', type=float, default=0.0,
+                        help="Share of requests answered with a Cloudflare-like 403 challenge page.")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429s.")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    directory_name = args.snapshot or latest_snapshot()
+    faults = FaultProfile(args.latency, args.jitter, args.error_rate, args.throttle_rate,
+                          args.challenge_rate, args.retry_after, args.seed)
+    print(f"Replaying '{directory_name}' at http://{args.host}:{args.port}{SHOWTIMES_PATH}")
+    web.run_app(create_app(directory_name, faults), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
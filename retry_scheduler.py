@@ -0,0 +1,103 @@
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class RetryScheduler:
+    """
+    Delay queue for failed work items. Instead of a worker thread sleeping
+    through its own backoff, a failed item is pushed onto a heap keyed by the
+    time it is due again, and the coordinating loop resubmits it once that
+    time has passed. Backoff is exponential with +/- `jitter` so retries of
+    regions that failed together don't all come due at the same moment.
+    """
+
+    def __init__(self, base=2, max_delay=300, jitter=0.5, max_attempts=3, rng=None):
+        self.base = base
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.random = rng or random.Random()
+        self._heap = []  # (due_at, sequence, key)
+        self._sequence = itertools.count()
+        self.retries = Counter()  # key -> retries scheduled
+        self.backoff_seconds = 0.0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+    def backoff(self, attempt):
+        """
+        Returns:
+            float: Jittered delay before attempt number `attempt + 1` (1s, 2s, 4s... for base 2).
+        """
+        delay = min(self.max_delay, self.base ** max(0, attempt - 1))
+        return delay * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def schedule(self, key, attempt, now=None):
+        """
+        Schedules another attempt for a failed item.
+        Args:
+            key: Item to retry, e.g. a region code.
+            attempt (int): Attempts made so far.
+        Returns:
+            float or None: Delay until the retry is due, None if attempts are exhausted.
+        """
+        if attempt >= self.max_attempts:
+            logger.warning(f"Giving up on {key} after {attempt} attempts.")
+            return None
+        delay = self.backoff(attempt)
+        heapq.heappush(self._heap, ((now or time.monotonic()) + delay, next(self._sequence), key))
+        self.retries[key] += 1
+        self.backoff_seconds += delay
+        logger.debug(f"Retrying {key} in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts}).")
+        return delay
+
+    def pop_due(self, now=None):
+        """
+        Returns:
+            list: Keys whose retry is due, earliest first.
+        """
+        now = now or time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def next_due_in(self, now=None):
+        """
+        Returns:
+            float or None: Seconds until the next retry is due, None when nothing is scheduled.
+        """
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - (now or time.monotonic()))
+
+    def stats(self):
+        """
+        Returns:
+            dict: retries, retried (items retried at least once), backoff_seconds, most_retried.
+        """
+        return {
+            'retries': sum(self.retries.values()),
+            'retried': len(self.retries),
+            'backoff_seconds': self.backoff_seconds,
+            'most_retried': self.retries.most_common(5),
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        message = (f"Retries: {stats['retries']} for {stats['retried']} items, "
+                   f"{stats['backoff_seconds']:.1f}s of backoff kept off worker threads.")
+        logger.info(message)
+        print(message)
+        for key, count in stats['most_retried']:
+            logger.info(f"  {key}: {count} retries")
@@ -0,0 +1,216 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pyarrow as pa
+
+from showtime_parser import event_languages, num_rows, parse_showtimes
+from snapshot_pipeline import AGGREGATE_COLUMNS, region_files
+
+logger = logging.getLogger(__name__)
+
+# Rollup level -> grouping columns; 'language' is the event level relabelled through ChildEvents
+LEVELS = {
+    'show': ('VenueName', 'ShowTime'),
+    'venue': ('VenueName',),
+    'city': ('SubRegCode',),
+    'event': ('EventCode',),
+    'national': (),
+}
+
+SEAT_COLUMNS = ['MaxSeats', 'SeatsAvailable', 'BookedTickets']
+
+ROW_KEY = ('VenueCode', 'SessionId', 'AreaCatCode')
+
+
+class RollupEngine:
+    """
+    Running AggregatedData totals at show, venue, city, event/language and
+    national level, maintained as category rows arrive.
+
+    Every (VenueCode, SessionId, AreaCatCode) row keeps the values it last
+    contributed. A region's response only adds the difference between the
+    new and the contributed values to each level's accumulator, so a re-poll
+    where a handful of categories sold seats touches only those rows, and
+    totals are read straight from the accumulators. A row returned by several
+    overlapping regions is counted once, and is subtracted again only when
+    the last region returning it stops doing so.
+    """
+
+    def __init__(self, languages=None):
+        self._lock = threading.Lock()
+        self.languages = dict(languages or {})  # EventCode -> EventLang
+        self._rows = {}  # row key -> row id
+        self._values = np.zeros((0, len(AGGREGATE_COLUMNS)))  # contributed values per row
+        self._active = np.zeros(0, dtype=bool)
+        self._reporters = np.zeros(0, dtype=np.int32)  # number of regions whose last response has the row
+        self._regions = {}  # region -> code
+        self._region_rows = {}  # region code -> row ids in its last response
+        self._groups = {level: {} for level in LEVELS}  # level -> group key -> group id
+        self._row_groups = {level: np.zeros(0, dtype=np.int64) for level in LEVELS}
+        self._totals = {level: np.zeros((0, len(AGGREGATE_COLUMNS))) for level in LEVELS}
+        self._counts = {level: np.zeros(0, dtype=np.int64) for level in LEVELS}
+
+    def _add_rows(self, columns, new_rows):
+        # Assigns group ids to rows seen for the first time and grows the per-row arrays
+        for level, keys in LEVELS.items():
+            groups = self._groups[level]
+            ids = [groups.setdefault(tuple(columns[key][row] for key in keys), len(groups)) for row in new_rows]
+            self._row_groups[level] = np.concatenate([self._row_groups[level], np.asarray(ids, dtype=np.int64)])
+            grow = len(groups) - len(self._counts[level])
+            if grow:
+                self._totals[level] = np.vstack([self._totals[level], np.zeros((grow, len(AGGREGATE_COLUMNS)))])
+                self._counts[level] = np.concatenate([self._counts[level], np.zeros(grow, dtype=np.int64)])
+        added = len(new_rows)
+        self._values = np.vstack([self._values, np.zeros((added, len(AGGREGATE_COLUMNS)))])
+        self._active = np.concatenate([self._active, np.zeros(added, dtype=bool)])
+        self._reporters = np.concatenate([self._reporters, np.zeros(added, dtype=np.int32)])
+
+    def _apply(self, ids, delta, count_delta):
+        for level in LEVELS:
+            groups = self._row_groups[level][ids]
+            np.add.at(self._totals[level], groups, delta)
+            np.add.at(self._counts[level], groups, count_delta)
+
+    def update(self, region, columns):
+        """
+        Applies a region's latest response.
+        Args:
+            region (str): Region code the response was fetched for.
+            columns (dict): Parsed rows (see showtime_parser); the region's complete current state.
+        Returns:
+            int: Number of rows whose contribution changed (added, updated or removed).
+        """
+        with self._lock:
+            region_code = self._regions.setdefault(region, len(self._regions))
+            rows = num_rows(columns)
+            ids = np.empty(rows, dtype=np.int64)
+            new_rows = []
+            for row, key in enumerate(zip(*(columns[name] for name in ROW_KEY))):
+                row_id = self._rows.get(key)
+                if row_id is None:
+                    row_id = self._rows[key] = len(self._rows)
+                    new_rows.append(row)
+                ids[row] = row_id
+            if new_rows:
+                self._add_rows(columns, new_rows)
+
+            values = np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in AGGREGATE_COLUMNS]) \
+                if rows else np.zeros((0, len(AGGREGATE_COLUMNS)))
+            # A row repeated within one response counts once, with its last values
+            ids, last = np.unique(ids[::-1], return_index=True)
+            values = values[::-1][last]
+
+            changed = 0
+            previous = self._region_rows.get(region_code)
+            joined = ids
+            if previous is not None:
+                joined = np.setdiff1d(ids, previous, assume_unique=True)
+                gone = np.setdiff1d(previous, ids, assume_unique=True)
+                self._reporters[gone] -= 1
+                # Rows another region still returns stay counted
+                gone = gone[self._reporters[gone] == 0]
+                if len(gone):
+                    self._apply(gone, -self._values[gone], -1)
+                    self._values[gone] = 0
+                    self._active[gone] = False
+                    changed += len(gone)
+            self._reporters[joined] += 1
+
+            joining = ~self._active[ids]
+            delta = values - self._values[ids]
+            moved = joining | (delta != 0).any(axis=1)
+            if moved.any():
+                self._apply(ids[moved], delta[moved], joining[moved].astype(np.int64))
+                self._values[ids[moved]] = values[moved]
+                self._active[ids] = True
+            self._region_rows[region_code] = ids
+            changed += int(moved.sum())
+        logger.debug(f"Rollups updated from {region}: {changed}/{rows} rows changed")
+        return changed
+
+    def update_response(self, region, data):
+        """
+        Applies a decoded showtimes-by-event response, learning its event languages.
+        Returns:
+            int: Number of rows whose contribution changed.
+        """
+        if not isinstance(data, dict):
+            return 0
+        with self._lock:
+            self.languages.update(event_languages(data))
+        return self.update(region, parse_showtimes(data))
+
+    def totals(self, level='show'):
+        """
+        Current totals of one level.
+        Args:
+            level (str): One of LEVELS, or 'language'.
+        Returns:
+            pyarrow.Table: Group columns followed by AGGREGATE_COLUMNS, sorted by group.
+        """
+        if level == 'language':
+            return self._language_totals()
+        with self._lock:
+            keys = list(self._groups[level])
+            totals = self._totals[level].copy()
+            live = self._counts[level] > 0
+        order = sorted(np.flatnonzero(live), key=lambda group: keys[group])
+        arrays = [pa.array([keys[group][i] for group in order], type=pa.string()) for i in range(len(LEVELS[level]))]
+        for i, name in enumerate(AGGREGATE_COLUMNS):
+            values = totals[order, i] if order else np.zeros(0)
+            arrays.append(pa.array(values.round().astype(np.int64) if name in SEAT_COLUMNS else values))
+        return pa.Table.from_arrays(arrays, names=list(LEVELS[level]) + AGGREGATE_COLUMNS)
+
+    def _language_totals(self):
+        events = self.totals('event')
+        with self._lock:
+            languages = [self.languages.get(code, code) for code in events.column('EventCode').to_pylist()]
+        table = events.drop_columns(['EventCode']).add_column(0, 'Language', pa.array(languages, type=pa.string()))
+        result = table.group_by('Language').aggregate([(name, 'sum') for name in AGGREGATE_COLUMNS])
+        result = result.rename_columns([name.removesuffix('_sum') for name in result.column_names])
+        return result.select(['Language'] + AGGREGATE_COLUMNS).sort_by('Language')
+
+    def national(self):
+        """
+        Returns:
+            dict: AGGREGATE_COLUMNS -> national total.
+        """
+        row = self.totals('national').to_pylist()
+        return row[0] if row else {name: 0 for name in AGGREGATE_COLUMNS}
+
+    def log_summary(self):
+        totals = self.national()
+        message = (f"National: {totals['BookedTickets']}/{totals['MaxSeats']} seats booked, "
+                   f"gross {totals['BookedGross']:,.0f} of {totals['TotalGross']:,.0f}.")
+        logger.info(message)
+        print(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build running rollups from snapshot directories, applied in order as re-polls.")
+    parser.add_argument('directories', nargs='+', help="Snapshot directories with <CODE>.json(.gz) files, oldest first.")
+    parser.add_argument('--level', choices=sorted(LEVELS) + ['language'], default='city')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    engine = RollupEngine()
+    for directory in args.directories:
+        changed = 0
+        for path in region_files(directory):
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rb') as f:
+                changed += engine.update_response(os.path.basename(path).split('.', 1)[0], json.load(f))
+        print(f"Applied {directory}: {changed} rows changed.")
+    engine.log_summary()
+    totals = engine.totals(args.level).sort_by([('BookedGross', 'descending')])
+    print(totals.slice(0, args.top).to_pandas().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
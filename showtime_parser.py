@@ -0,0 +1,293 @@
+import gzip
+import json
+import logging
+import os
+
+import numpy as np
+
+try:
+    import ijson  # Optional: incremental parsing of large responses
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# Columns of the DetailedData sheet, in sheet order
+DETAIL_COLUMNS = [
+    'VenueName', 'ShowTime', 'Category', 'MaxSeats', 'SeatsAvailable',
+    'BookedTickets', 'CurrentPrice', 'BookedGross', 'TotalGross',
+]
+
+# Venue/session identifiers carried alongside every category row
+METADATA_COLUMNS = [
+    'VenueCode', 'SubRegCode', 'EventCode', 'SessionId', 'AreaCatCode',
+    'ShowDateTime', 'CutOffDateTime', 'PercentAvail', 'AvailStatus',
+]
+
+STRING_COLUMNS = ['VenueName', 'ShowTime', 'Category'] + METADATA_COLUMNS
+
+VENUES_PREFIX = 'ShowDetails.item.Venues.item'
+
+# Payloads smaller than this are decoded with json.loads: the C decoder beats ijson's per-object
+# building by ~30% on typical 1-2 MB responses, so streaming only pays off as a memory bound
+STREAM_MIN_BYTES = 32 * 1024 * 1024
+
+
+def _empty_lists():
+    return {name: [] for name in STRING_COLUMNS + ['MaxSeats', 'SeatsAvailable', 'CurrentPrice']}
+
+
+def _collect(venues, lists):
+    """
+    Single pass over the Venues -> ShowTimes -> Categories tree that only
+    gathers raw field values; all arithmetic happens later on whole columns.
+    """
+    venue_name = lists['VenueName'].append
+    venue_code = lists['VenueCode'].append
+    sub_reg_code = lists['SubRegCode'].append
+    show_time = lists['ShowTime'].append
+    event_code = lists['EventCode'].append
+    session_id = lists['SessionId'].append
+    show_date_time = lists['ShowDateTime'].append
+    cut_off = lists['CutOffDateTime'].append
+    category_name = lists['Category'].append
+    area_cat_code = lists['AreaCatCode'].append
+    percent_avail = lists['PercentAvail'].append
+    avail_status = lists['AvailStatus'].append
+    max_seats = lists['MaxSeats'].append
+    seats_avail = lists['SeatsAvailable'].append
+    cur_price = lists['CurrentPrice'].append
+
+    for venue in venues:
+        v_name = venue.get('VenueName', '')
+        v_code = venue.get('VenueCode', '')
+        v_sub_reg = venue.get('SubRegCode', '')
+        for show in venue.get('ShowTimes', []):
+            s_time = show.get('ShowTime', '')
+            s_event = show.get('EventCode', '')
+            s_id = show.get('SessionId', '')
+            s_date_time = show.get('ShowDateTime', '')
+            s_cut_off = show.get('CutOffDateTime', '')
+            for category in show.get('Categories', []):
+                venue_name(v_name)
+                venue_code(v_code)
+                sub_reg_code(v_sub_reg)
+                show_time(s_time)
+                event_code(s_event)
+                session_id(s_id)
+                show_date_time(s_date_time)
+                cut_off(s_cut_off)
+                category_name(category.get('PriceDesc', ''))
+                area_cat_code(category.get('AreaCatCode', ''))
+                percent_avail(category.get('PercentAvail', ''))
+                avail_status(category.get('AvailStatus', ''))
+                max_seats(category.get('MaxSeats') or '0')
+                seats_avail(category.get('SeatsAvail') or '0')
+                cur_price(category.get('CurPrice') or '0')
+
+
+def _to_numbers(values, arrow_type, numpy_type):
+    # Arrow casts a whole column of numeric strings in C; unexpected values (ints, '44.0') take the per-item path
+    import pyarrow as pa
+    try:
+        return pa.array(values, type=pa.string()).cast(arrow_type).to_numpy(zero_copy_only=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return np.fromiter(map(numpy_type, map(float, values)), numpy_type, len(values))
+
+
+def _to_columns(lists):
+    """
+    Converts gathered values to NumPy columns and derives the computed ones.
+    """
+    import pyarrow as pa
+    columns = {name: np.fromiter(lists[name], dtype=object, count=len(lists[name])) for name in STRING_COLUMNS}
+    max_seats = _to_numbers(lists['MaxSeats'], pa.int64(), np.int64)
+    seats_avail = _to_numbers(lists['SeatsAvailable'], pa.int64(), np.int64)
+    price = _to_numbers(lists['CurrentPrice'], pa.float64(), np.float64)
+    booked = max_seats - seats_avail
+    columns['MaxSeats'] = max_seats
+    columns['SeatsAvailable'] = seats_avail
+    columns['BookedTickets'] = booked
+    columns['CurrentPrice'] = price
+    columns['BookedGross'] = booked * price
+    columns['TotalGross'] = max_seats * price
+    return columns
+
+
+def parse_venues(venues):
+    """
+    Flattens an iterable of Venue objects into columnar arrays.
+    Args:
+        venues (iterable): Venue dicts from a showtimes-by-event response.
+    Returns:
+        dict: Column name -> NumPy array (DETAIL_COLUMNS + METADATA_COLUMNS).
+    """
+    lists = _empty_lists()
+    _collect(venues, lists)
+    return _to_columns(lists)
+
+
+def iter_venues(data):
+    for show_detail in data.get('ShowDetails', []) or []:
+        yield from show_detail.get('Venues', []) or []
+
+
+def child_events(data):
+    """
+    Returns:
+        list: EventCodes of the language/format variants listed under Event.ChildEvents.
+    """
+    codes = []
+    for show_detail in data.get('ShowDetails', []) or []:
+        for child in (show_detail.get('Event') or {}).get('ChildEvents', []) or []:
+            code = child.get('EventCode')
+            if code and code not in codes:
+                codes.append(code)
+    return codes
+
+
+def event_languages(data):
+    """
+    Returns:
+        dict: EventCode -> EventLang of the variants listed under Event.ChildEvents.
+    """
+    languages = {}
+    for show_detail in data.get('ShowDetails', []) or []:
+        for child in (show_detail.get('Event') or {}).get('ChildEvents', []) or []:
+            if child.get('EventCode') and child.get('EventLang'):
+                languages[child['EventCode']] = child['EventLang']
+    return languages
+
+
+def show_dates(data):
+    """
+    Returns:
+        list: DateCodes (YYYYMMDD) of the enabled dates in ShowDatesArray.
+    """
+    dates = data.get('ShowDatesArray', []) or []
+    return [d['DateCode'] for d in dates if d.get('DateCode') and not d.get('isDisabled')]
+
+
+def returned_dates(data):
+    """
+    Returns:
+        list: Dates (YYYYMMDD) whose showtimes are actually in this response.
+    """
+    return [show_detail.get('Date') for show_detail in data.get('ShowDetails', []) or [] if show_detail.get('Date')]
+
+
+def parse_showtimes(data):
+    """
+    Flattens an already decoded showtimes-by-event response.
+    Args:
+        data (dict): Decoded JSON response.
+    Returns:
+        dict: Column name -> NumPy array.
+    """
+    return parse_venues(iter_venues(data))
+
+
+def iter_venues_stream(fp):
+    """
+    Yields Venue objects one at a time from a JSON byte stream, so the full
+    response is never held as one dict. Falls back to json.load without ijson.
+    Args:
+        fp: Binary file-like object (open file, response.raw, ...).
+    """
+    if ijson is not None:
+        # use_float keeps numbers as floats instead of Decimals
+        yield from ijson.items(fp, VENUES_PREFIX, use_float=True)
+    else:
+        logger.warning("ijson is not installed; decoding a large response in one piece with json.load.")
+        yield from iter_venues(json.load(fp))
+
+
+def parse_stream(fp):
+    """
+    Flattens a showtimes-by-event response read incrementally from a stream.
+    Args:
+        fp: Binary file-like object.
+    Returns:
+        dict: Column name -> NumPy array.
+    """
+    return parse_venues(iter_venues_stream(fp))
+
+
+def parse_file(path):
+    """
+    Flattens a saved response such as data/<timestamp>/<CODE>.json (or a
+    gzipped .json.gz); files of STREAM_MIN_BYTES or more are parsed incrementally.
+    Returns:
+        dict: Column name -> NumPy array.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        if os.path.getsize(path) >= STREAM_MIN_BYTES:
+            return parse_stream(f)
+        return parse_showtimes(json.loads(f.read()))
+
+
+def parse_response(response, streamed=False):
+    """
+    Flattens a requests response. A streamed response (sent with
+    stream=True) whose Content-Length is at least STREAM_MIN_BYTES is parsed
+    straight off the socket; anything else is decoded in one piece.
+    Args:
+        response (requests.Response): Response to parse.
+        streamed (bool): The request was sent with stream=True, so the body is still unread.
+    Returns:
+        dict: Column name -> NumPy array.
+    """
+    length = int(response.headers.get('Content-Length') or 0)
+    if streamed and length >= STREAM_MIN_BYTES:
+        response.raw.decode_content = True
+        return parse_stream(response.raw)
+    return parse_showtimes(response.json())
+
+
+def num_rows(columns):
+    return len(columns['MaxSeats'])
+
+
+def concat_columns(chunks):
+    """
+    Concatenates several column dicts (e.g. one per region) into one.
+    """
+    chunks = [chunk for chunk in chunks if chunk and num_rows(chunk)]
+    if not chunks:
+        return _to_columns(_empty_lists())
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def to_dataframe(columns, metadata=False):
+    """
+    Builds the DetailedData DataFrame from columnar arrays.
+    Args:
+        columns (dict): Output of one of the parse_* functions.
+        metadata (bool): Also include METADATA_COLUMNS.
+    Returns:
+        pandas.DataFrame
+    """
+    import pandas as pd
+    names = DETAIL_COLUMNS + (METADATA_COLUMNS if metadata else [])
+    return pd.DataFrame({name: columns[name] for name in names}, columns=names)
+
+
+def to_arrow(columns, metadata=True):
+    """
+    Builds a pyarrow Table with dictionary-encoded string columns.
+    Args:
+        columns (dict): Output of one of the parse_* functions.
+        metadata (bool): Also include METADATA_COLUMNS.
+    Returns:
+        pyarrow.Table
+    """
+    import pyarrow as pa
+    names = DETAIL_COLUMNS + (METADATA_COLUMNS if metadata else [])
+    arrays = []
+    for name in names:
+        if name in STRING_COLUMNS:
+            arrays.append(pa.array(columns[name], type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(columns[name]))
+    return pa.Table.from_arrays(arrays, names=names)
@@ -0,0 +1,146 @@
+import argparse
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from region_index import drop_duplicate_rows
+from showtime_parser import num_rows, parse_file, parse_venues, to_arrow
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns summed into the AggregatedData sheet (Category and CurrentPrice are dropped)
+AGGREGATE_COLUMNS = ['MaxSeats', 'SeatsAvailable', 'BookedTickets', 'BookedGross', 'TotalGross']
+AGGREGATE_KEYS = ['VenueName', 'ShowTime']
+
+
+def region_files(directory_name):
+    """
+    Lists the region responses of a snapshot directory.
+    Args:
+        directory_name (str): data/<timestamp>/ or a snapshot store raw/<timestamp>/ directory.
+    Returns:
+        list: Paths of <CODE>.json and <CODE>.json.gz files, sorted by name.
+    """
+    paths = glob.glob(os.path.join(directory_name, '*.json')) + glob.glob(os.path.join(directory_name, '*.json.gz'))
+    return sorted(paths)
+
+
+def parse_region_file(path):
+    """
+    Process-pool worker: parses one region file into an Arrow IPC buffer.
+    Strings are dictionary-encoded, so each venue name or session id crosses
+    the process boundary once per file rather than once per category row.
+    Args:
+        path (str): Path of a <CODE>.json(.gz) response.
+    Returns:
+        tuple: (region_code, rows, bytes or None)
+    """
+    region_code = os.path.basename(path).split('.', 1)[0]
+    columns = parse_file(path)
+    rows = num_rows(columns)
+    if not rows:
+        return region_code, 0, None
+    table = to_arrow(columns)
+    region = pa.DictionaryArray.from_arrays(pa.array([0] * rows, pa.int32()), pa.array([region_code]))
+    table = table.append_column('region', region)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return region_code, rows, sink.getvalue().to_pybytes()
+
+
+def _read_chunk(buffer):
+    return pa.ipc.open_stream(buffer).read_all()
+
+
+def parse_directory(directory_name, workers=None):
+    """
+    Parses every region file of a snapshot across a process pool and merges
+    the columnar chunks into one national table.
+    Args:
+        directory_name (str): Snapshot directory.
+        workers (int): Worker processes (defaults to the CPU count; 1 parses in-process).
+    Returns:
+        pyarrow.Table: Category rows of all regions, with a 'region' column.
+    """
+    paths = region_files(directory_name)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        return _merge(map(parse_region_file, paths))
+    # A few chunks per worker keeps IPC overhead low while still balancing uneven file sizes
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _merge(executor.map(parse_region_file, paths, chunksize=chunksize))
+
+
+def _merge(results):
+    tables = []
+    for region_code, rows, buffer in results:
+        if buffer is None:
+            logger.debug(f"No rows for {region_code}")
+            continue
+        tables.append(_read_chunk(buffer))
+    if not tables:
+        table = to_arrow(parse_venues([]))
+        return table.append_column('region', pa.array([], pa.string()).dictionary_encode())
+    # Per-file dictionaries are unified once here instead of re-encoding every row
+    return pa.concat_tables(tables).unify_dictionaries().combine_chunks()
+
+
+def aggregate(table):
+    """
+    Builds the AggregatedData table: per (VenueName, ShowTime) sums, as in bms_api.
+    Args:
+        table (pyarrow.Table): Category rows.
+    Returns:
+        pyarrow.Table
+    """
+    grouped = table.select(AGGREGATE_KEYS + AGGREGATE_COLUMNS).group_by(AGGREGATE_KEYS, use_threads=False)
+    result = grouped.aggregate([(name, 'sum') for name in AGGREGATE_COLUMNS])
+    return result.rename_columns([name.removesuffix('_sum') for name in result.column_names])
+
+
+def write_excel(table, aggregated, filename):
+    """
+    Writes the national DetailedData/AggregatedData workbook, streaming rows in constant memory.
+    """
+    from excel_export import write_xlsx
+    write_xlsx([('DetailedData', table), ('AggregatedData', aggregated)], filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a snapshot directory across a process pool into one national dataset.")
+    parser.add_argument('directory', help="Snapshot directory with <CODE>.json(.gz) files.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument('--output', default=None, help="National DetailedData Parquet file (default: <snapshot>_national.parquet).")
+    parser.add_argument('--aggregated', default=None, help="AggregatedData Parquet file (default: <snapshot>_aggregated.parquet).")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Count each venue/session/category once even if overlapping regions returned it.")
+    parser.add_argument('--excel', default=None, help="Also write both tables to this .xlsx file.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    snapshot = os.path.basename(os.path.normpath(args.directory))
+    started = time.perf_counter()
+    table = parse_directory(args.directory, args.workers)
+    if args.dedup:
+        table = drop_duplicate_rows(table)
+    aggregated = aggregate(table)
+    elapsed = time.perf_counter() - started
+
+    output = args.output or f"{snapshot}_national.parquet"
+    pq.write_table(table, output, compression='zstd')
+    pq.write_table(aggregated, args.aggregated or f"{snapshot}_aggregated.parquet", compression='zstd')
+    if args.excel:
+        write_excel(table, aggregated, args.excel)
+    print(f"Parsed {table.num_rows} rows from {len(region_files(args.directory))} files "
+          f"into {aggregated.num_rows} venue/showtime groups in {elapsed:.2f}s; saved to '{output}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from showtime_parser import num_rows, parse_showtimes, to_arrow
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = "snapshots"
+
+# Hive-style partitions: <root>/rows/snapshot=<timestamp>/region=<CODE>/part-<part>.parquet,
+# where part is 0 for a plain sweep or <eventCode>-<date> when several events/dates are fetched
+PARTITIONING = ds.partitioning(pa.schema([('snapshot', pa.string()), ('region', pa.string())]), flavor='hive')
+
+
+class SnapshotStore:
+    """
+    Columnar storage for fetched showtimes.
+
+    Every region response is flattened into category rows (with venue and
+    session identifiers) and written as a zstd-compressed Parquet file with
+    dictionary-encoded strings, partitioned by snapshot timestamp and region.
+    The raw response can optionally be kept as compact gzipped JSON. With a
+    region_index.DedupIndex, rows already stored by an overlapping region in
+    the same snapshot are skipped.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, compression='zstd', keep_raw=False, dedup_index=None):
+        self.root = root
+        self.compression = compression
+        self.keep_raw = keep_raw
+        self.dedup_index = dedup_index
+        self.rows_root = os.path.join(root, 'rows')
+        self.raw_root = os.path.join(root, 'raw')
+
+    def region_path(self, snapshot, region_code, part=0):
+        return os.path.join(self.rows_root, f"snapshot={snapshot}", f"region={region_code}", f"part-{part}.parquet")
+
+    def raw_path(self, snapshot, region_code, extension='json.gz', part=None):
+        name = f"{region_code}.{part}" if part else region_code
+        return os.path.join(self.raw_root, snapshot, f"{name}.{extension}")
+
+    def write_table(self, snapshot, region_code, table, part=0):
+        """
+        Writes an Arrow table of category rows for one region.
+        Args:
+            snapshot (str): Snapshot timestamp, e.g. '20240924_204353'.
+            region_code (str): Region/sub-region code.
+            table (pyarrow.Table): Category rows.
+            part (str): File name suffix within the region partition.
+        Returns:
+            str: Path of the written Parquet file.
+        """
+        path = self.region_path(snapshot, region_code, part)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, path, compression=self.compression, use_dictionary=True)
+        return path
+
+    def write_raw(self, snapshot, region_code, data, part=None):
+        """
+        Keeps the raw response as compact gzipped JSON (or gzipped text if it was not JSON).
+        Returns:
+            str: Path of the written file.
+        """
+        if isinstance(data, (dict, list)):
+            path = self.raw_path(snapshot, region_code, part=part)
+            payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        else:
+            path = self.raw_path(snapshot, region_code, 'txt.gz', part)
+            payload = data
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            f.write(payload)
+        return path
+
+    def write_region(self, snapshot, region_code, data, part=None):
+        """
+        Stores one region's response.
+        Args:
+            snapshot (str): Snapshot timestamp.
+            region_code (str): Region/sub-region code.
+            data (dict or str): Decoded JSON response, or raw text if it was not JSON.
+            part (str): Distinguishes several responses for one region, e.g. '<eventCode>-<date>'.
+        Returns:
+            int: Number of category rows written.
+        Raises:
+            Exception: If the response could not be stored, so the caller can retry the region
+                instead of recording it as done.
+        """
+        try:
+            if self.keep_raw or not isinstance(data, dict):
+                self.write_raw(snapshot, region_code, data, part)
+            if not isinstance(data, dict):
+                logger.warning(f"Non-JSON response for {region_code} kept as raw text only.")
+                return 0
+            columns = parse_showtimes(data)
+            if self.dedup_index is not None:
+                columns = self.dedup_index.filter(snapshot, columns)
+            rows = num_rows(columns)
+            if rows:
+                self.write_table(snapshot, region_code, to_arrow(columns), part or 0)
+            logger.info(f"Stored {rows} rows for {region_code} in snapshot {snapshot}")
+            return rows
+        except Exception as e:
+            logger.error(f"Error saving data for city {region_code}: {e}")
+            print(f"Error saving data for {region_code}: {e}")
+            raise
+
+    def snapshots(self):
+        """
+        Returns:
+            list: Snapshot timestamps present in the store, oldest first.
+        """
+        paths = glob.glob(os.path.join(self.rows_root, 'snapshot=*'))
+        return sorted(os.path.basename(path).split('=', 1)[1] for path in paths)
+
+    def regions(self, snapshot):
+        paths = glob.glob(os.path.join(self.rows_root, f"snapshot={snapshot}", 'region=*'))
+        return sorted(os.path.basename(path).split('=', 1)[1] for path in paths)
+
+    def dataset(self):
+        return ds.dataset(self.rows_root, format='parquet', partitioning=PARTITIONING)
+
+    def read(self, snapshots=None, regions=None, columns=None):
+        """
+        Reads category rows, pruning partitions that are not needed.
+        Args:
+            snapshots (list): Snapshot timestamps to read (None reads all).
+            regions (list): Region codes to read (None reads all).
+            columns (list): Columns to read (None reads all, incl. snapshot/region).
+        Returns:
+            pyarrow.Table
+        """
+        if not os.path.isdir(self.rows_root):
+            return pa.table({})
+        expression = None
+        if snapshots is not None:
+            expression = ds.field('snapshot').isin(list(snapshots))
+        if regions is not None:
+            region_filter = ds.field('region').isin(list(regions))
+            expression = region_filter if expression is None else expression & region_filter
+        return self.dataset().to_table(columns=columns, filter=expression)
+
+    def import_json_directory(self, directory_name, snapshot=None):
+        """
+        Converts a legacy data/<timestamp>/ directory of pretty-printed JSON files.
+        Args:
+            directory_name (str): Directory with <CODE>.json files.
+            snapshot (str): Snapshot id; defaults to the directory name.
+        Returns:
+            int: Number of category rows written.
+        """
+        snapshot = snapshot or os.path.basename(os.path.normpath(directory_name))
+        total = 0
+        for path in sorted(glob.glob(os.path.join(directory_name, '*.json'))):
+            region_code = os.path.splitext(os.path.basename(path))[0]
+            with open(path, 'r', encoding='utf-8') as f:
+                total += self.write_region(snapshot, region_code, json.load(f))
+        print(f"Imported {total} rows from '{directory_name}' as snapshot {snapshot}.")
+        return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert data/<timestamp>/ JSON snapshots to Parquet.")
+    parser.add_argument('directories', nargs='+', help="Legacy snapshot directories to import.")
+    parser.add_argument('--root', default=DEFAULT_ROOT, help="Snapshot store root.")
+    parser.add_argument('--keep-raw', action='store_true', help="Also keep gzipped raw JSON.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = SnapshotStore(args.root, keep_raw=args.keep_raw)
+    for directory_name in args.directories:
+        store.import_json_directory(directory_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
 import os
 
+from viewer_data import DOWNLOAD_FORMATS, DownloadCache, FilterIndex, SnapshotCatalog, date_range, load_export
+
 # Optional: Set page configuration
 st.set_page_config(
     page_title="📊 Interactive Showtimes Viewer",
@@ -15,26 +16,92 @@ st.title("📊 Interactive Showtimes Viewer")
 # Define the path to the Excel file
 EXCEL_FILE_PATH = "showtimes.xlsx"
 
-@st.cache_data
-def load_data(path):
+@st.cache_resource
+def load_data(path, mtime):
     """
-    Load Excel data into pandas DataFrames.
-    Returns two DataFrames: Sheet1 and Sheet2.
+    Load the detailed and aggregated tables from their Parquet copies
+    (converted from the workbook once, memory-mapped on later loads), with
+    VenueName/ShowTime/Category as categoricals, plus a FilterIndex over the
+    detailed data. `mtime` is part of the cache key so an updated workbook is reloaded.
+    Returns:
+        tuple: (detailed DataFrame, aggregated DataFrame, FilterIndex), or Nones on error.
     """
     try:
-        xls = pd.ExcelFile(path, engine='openpyxl')
-        sheet1 = pd.read_excel(xls, 'Sheet1')
-        sheet2 = pd.read_excel(xls, 'Sheet2')
-        return sheet1, sheet2
-    except FileNotFoundError:
-        st.error(f"❌ The file '{path}' was not found in the directory.")
-        return None, None
+        sheet1, sheet2 = load_export(path)
+        return sheet1, sheet2, FilterIndex(sheet1)
     except Exception as e:
         st.error(f"❌ An error occurred while loading the file: {e}")
-        return None, None
+        return None, None, None
+
+@st.cache_resource
+def get_catalog():
+    """
+    Snapshot catalog shared by all sessions; its manifest persists across restarts.
+    """
+    return SnapshotCatalog()
+
+@st.cache_resource
+def get_downloads():
+    return DownloadCache()
+
+@st.cache_data(max_entries=32)
+def load_venue_trend(city, since, until, generation):
+    # generation changes when a rescan finds new or changed partitions, invalidating cached trends
+    return get_catalog().venue_trend(city, since, until)
+
+def to_ist(epochs):
+    return pd.to_datetime(epochs, unit='s', utc=True).tz_convert('Asia/Kolkata').tz_localize(None)
+
+def show_time_travel():
+    """
+    Occupancy trends of one city across every indexed snapshot in a time range.
+    """
+    catalog = get_catalog()
+    if st.sidebar.button("🔄 Rescan snapshots"):
+        catalog.refresh()
+    cities = catalog.cities()
+    if not cities:
+        st.info("📝 No snapshots found: export workbooks (<City>_<timestamp>.xlsx) or data/<timestamp>/ directories.")
+        return
+    city = st.sidebar.selectbox("City", cities, index=cities.index('HYD') if 'HYD' in cities else 0)
+    partitions = catalog.partitions(city)
+    first, last = to_ist([partitions[0]['epoch'], partitions[-1]['epoch']]).to_pydatetime()
+    if first < last:
+        start, end = st.sidebar.slider("Time range", min_value=first, max_value=last, value=(first, last), format="DD MMM HH:mm")
+    else:
+        start, end = first, last
+    since = partitions[0]['epoch'] + int((start - first).total_seconds())
+    until = partitions[0]['epoch'] + int((end - first).total_seconds())
+
+    st.header(f"🕰️ {city} across snapshots")
+    trend = catalog.trend(city, since, until)
+    if trend.empty:
+        st.info("No snapshots in this time range.")
+        return
+    trend.insert(0, 'Time', to_ist(trend.pop('Epoch')))
+    st.line_chart(trend.set_index('Time')['Occupancy'])
+    st.dataframe(trend)
+
+    if st.checkbox("Show per-venue occupancy (loads the snapshots in range)"):
+        venues = load_venue_trend(city, since, until, catalog.generation)
+        chosen = st.multiselect("Venues", sorted(venues['VenueName'].unique()))
+        if chosen:
+            venues = venues[venues['VenueName'].isin(chosen)]
+        chart = venues.assign(Time=to_ist(venues['Epoch'])).pivot_table(index='Time', columns='VenueName', values='Occupancy')
+        st.line_chart(chart if chosen else chart.mean(axis=1).rename('Average venue occupancy'))
+        st.dataframe(venues.drop(columns='Epoch'))
+
+mode = st.sidebar.radio("Mode", ["📄 Latest export", "🕰️ Time travel"])
+if mode == "🕰️ Time travel":
+    show_time_travel()
+    st.stop()
 
 # Load data
-sheet1_df, sheet2_df = load_data(EXCEL_FILE_PATH)
+if os.path.exists(EXCEL_FILE_PATH):
+    sheet1_df, sheet2_df, filter_index = load_data(EXCEL_FILE_PATH, os.path.getmtime(EXCEL_FILE_PATH))
+else:
+    st.error(f"❌ The file '{EXCEL_FILE_PATH}' was not found in the directory.")
+    sheet1_df = sheet2_df = filter_index = None
 
 if sheet1_df is not None and sheet2_df is not None:
     st.sidebar.success("✅ 'showtimes.xlsx' loaded successfully!")
@@ -46,32 +113,29 @@ if sheet1_df is not None and sheet2_df is not None:
     # Filtering options in the sidebar
     st.sidebar.header("🛠️ Filters for Detailed Data")
 
-    # Initialize filtered dataframe
-    filtered_sheet1 = sheet1_df.copy()
+    # Collect the filter state; rows are selected once below, memoised on this state
+    filter_state = {}
 
     # Create filters based on column types
     for column in sheet1_df.columns:
-        if sheet1_df[column].dtype == 'object' or pd.api.types.is_categorical_dtype(sheet1_df[column]):
-            unique_values = sheet1_df[column].dropna().unique().tolist()
-            selected_values = st.sidebar.multiselect(
+        if sheet1_df[column].dtype == 'object' or isinstance(sheet1_df[column].dtype, pd.CategoricalDtype):
+            unique_values = filter_index.options(column)
+            filter_state[column] = st.sidebar.multiselect(
                 f"Filter by {column}",
                 options=unique_values,
                 default=unique_values
             )
-            if selected_values:
-                filtered_sheet1 = filtered_sheet1[filtered_sheet1[column].isin(selected_values)]
         elif pd.api.types.is_numeric_dtype(sheet1_df[column]):
             min_val = float(sheet1_df[column].min())
             max_val = float(sheet1_df[column].max())
             step = (max_val - min_val) / 100 if max_val != min_val else 1
-            selected_range = st.sidebar.slider(
+            filter_state[column] = st.sidebar.slider(
                 f"Filter by {column}",
                 min_value=min_val,
                 max_value=max_val,
                 value=(min_val, max_val),
                 step=step
             )
-            filtered_sheet1 = filtered_sheet1[filtered_sheet1[column].between(*selected_range)]
         elif pd.api.types.is_datetime64_any_dtype(sheet1_df[column]):
             min_date = sheet1_df[column].min()
             max_date = sheet1_df[column].max()
@@ -82,9 +146,9 @@ if sheet1_df is not None and sheet2_df is not None:
                 max_value=max_date
             )
             if len(selected_dates) == 2:
-                filtered_sheet1 = filtered_sheet1[
-                    sheet1_df[column].between(pd.to_datetime(selected_dates[0]), pd.to_datetime(selected_dates[1]))
-                ]
+                filter_state[column] = date_range(selected_dates)
+
+    filtered_sheet1 = filter_index.filtered(filter_state)
 
     st.subheader("📈 Filtered Detailed Data")
     st.dataframe(filtered_sheet1)
@@ -93,25 +157,23 @@ if sheet1_df is not None and sheet2_df is not None:
     st.header("📊 Aggregated Showtimes Data")
     st.dataframe(sheet2_df)
 
-    # Download button for filtered data
-    def convert_df_to_excel(df):
-        """
-        Convert DataFrame to Excel bytes.
-        """
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
-        processed_data = output.getvalue()
-        return processed_data
-
-    filtered_excel = convert_df_to_excel(filtered_sheet1)
-
-    st.download_button(
-        label="📥 Download Filtered Detailed Data as Excel",
-        data=filtered_excel,
-        file_name='filtered_showtimes.xlsx',
-        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    # Download for filtered data: built only when asked for, then reused for the same filters and format
+    downloads = get_downloads()
+    source = (EXCEL_FILE_PATH, os.path.getmtime(EXCEL_FILE_PATH))
+    download_format = st.radio("Download format", list(DOWNLOAD_FORMATS), horizontal=True)
+    download_path = downloads.cached(source, filter_state, download_format)
+    if download_path is None and st.button(f"📦 Prepare {download_format.upper()} download ({len(filtered_sheet1)} rows)"):
+        with st.spinner("Preparing download..."):
+            download_path = downloads.build(filtered_sheet1, source, filter_state, download_format)
+
+    if download_path is not None:
+        with open(download_path, 'rb') as f:
+            st.download_button(
+                label=f"📥 Download Filtered Detailed Data as {download_format.upper()}",
+                data=f,
+                file_name=f'filtered_showtimes.{download_format}',
+                mime=DOWNLOAD_FORMATS[download_format]
+            )
 
 else:
     st.info(f"📝 Please ensure that '{EXCEL_FILE_PATH}' is present in the project directory.")
@@ -0,0 +1,204 @@
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join("snapshots", "sweeps.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    snapshot TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS sweep_regions (
+    snapshot TEXT NOT NULL,
+    region TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (snapshot, region)
+);
+"""
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+
+class SweepJournal:
+    """
+    Checkpoint journal of a sweep: the status of every region within one
+    snapshot. A sweep that crashes or is killed can be resumed under the same
+    snapshot id, fetching only the regions that are not done yet, and failed
+    regions carry the time their next attempt is due.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # One small commit per region; WAL + NORMAL keeps that an append without fsync
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def start(self, snapshot, regions):
+        """
+        Records a new sweep with all its regions pending.
+        Args:
+            snapshot (str): Snapshot timestamp of the sweep.
+            regions (iterable): Region codes to fetch.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO sweeps (snapshot, started_at) VALUES (?, ?)", (snapshot, now))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sweep_regions (snapshot, region, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(snapshot, region, PENDING, now) for region in regions],
+            )
+
+    def unfinished(self):
+        """
+        Returns:
+            str or None: Snapshot id of the most recent sweep that never finished.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT snapshot FROM sweeps WHERE finished_at IS NULL ORDER BY started_at DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def resume_or_start(self, snapshot, regions):
+        """
+        Continues the last unfinished sweep, or starts a new one.
+        Args:
+            snapshot (str): Snapshot id to use if a new sweep is started.
+            regions (iterable): Region codes of a new sweep.
+        Returns:
+            tuple: (snapshot, resumed)
+        """
+        previous = self.unfinished()
+        if previous is None:
+            self.start(snapshot, regions)
+            return snapshot, False
+        # Regions queued or in flight when the previous run died never reported back;
+        # that attempt did not complete, so it is not counted against them
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE sweep_regions SET status = ?, next_attempt_at = 0, attempts = MAX(attempts - 1, 0) "
+                "WHERE snapshot = ? AND status = ?",
+                (PENDING, previous, RUNNING),
+            )
+        logger.info(f"Resuming unfinished sweep {previous}: {self.summary(previous)}")
+        return previous, True
+
+    def _update(self, snapshot, region, status, error=None, next_attempt_at=0, attempt=False):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE sweep_regions SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ?, "
+                "attempts = attempts + ? WHERE snapshot = ? AND region = ?",
+                (status, error, next_attempt_at, time.time(), int(attempt), snapshot, region),
+            )
+
+    def mark_running(self, snapshot, region):
+        self._update(snapshot, region, RUNNING, attempt=True)
+
+    def mark_done(self, snapshot, region):
+        self._update(snapshot, region, DONE)
+
+    def mark_failed(self, snapshot, region, error=None, retry_in=0):
+        """
+        Records a failed attempt; the region becomes due again after retry_in seconds.
+        """
+        self._update(snapshot, region, FAILED, error, time.time() + retry_in)
+
+    def attempts(self, snapshot, region):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM sweep_regions WHERE snapshot = ? AND region = ?", (snapshot, region)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def due(self, snapshot, max_attempts=3, now=None):
+        """
+        Returns:
+            list: Region codes that are pending, or failed with a retry due and attempts left.
+        """
+        now = now or time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT region FROM sweep_regions WHERE snapshot = ? AND (status = ? OR "
+                "(status = ? AND attempts < ? AND next_attempt_at <= ?)) ORDER BY rowid",
+                (snapshot, PENDING, FAILED, max_attempts, now),
+            )
+            return [row[0] for row in cursor]
+
+    def next_retry_in(self, snapshot, max_attempts=3, now=None):
+        """
+        Returns:
+            float or None: Seconds until the next failed region is due, None if none will be.
+        """
+        now = now or time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM sweep_regions WHERE snapshot = ? AND status = ? AND attempts < ?",
+                (snapshot, FAILED, max_attempts),
+            ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - now)
+
+    def finish(self, snapshot):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE sweeps SET finished_at = ? WHERE snapshot = ?", (time.time(), snapshot))
+
+    def summary(self, snapshot):
+        """
+        Returns:
+            dict: Status -> number of regions.
+        """
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM sweep_regions WHERE snapshot = ? GROUP BY status", (snapshot,)
+            ))
+
+    def failed(self, snapshot):
+        """
+        Returns:
+            list: (region, attempts, last_error) of regions that ended the sweep failed.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT region, attempts, last_error FROM sweep_regions WHERE snapshot = ? AND status = ? "
+                "ORDER BY region",
+                (snapshot, FAILED),
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the state of checkpointed sweeps.")
+    parser.add_argument('--journal', default=DEFAULT_PATH, help="Sweep journal database.")
+    parser.add_argument('snapshot', nargs='?', default=None, help="Sweep to show (default: the unfinished one).")
+    args = parser.parse_args()
+
+    journal = SweepJournal(args.journal)
+    snapshot = args.snapshot or journal.unfinished()
+    if snapshot is None:
+        print("No unfinished sweep.")
+        return
+    print(f"Sweep {snapshot}: {journal.summary(snapshot)}")
+    for region, attempts, error in journal.failed(snapshot):
+        print(f"  {region}: {attempts} attempts, last error: {error}")
+
+
+if __name__ == "__main__":
+    main()
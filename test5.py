@@ -1,16 +1,25 @@
 import cloudscraper
 import logging
-import os
 from datetime import datetime
 import pytz
-import json
 import urllib.parse as urlparse
 import time
-import random
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import requests  # Ensure requests is imported
 from bs4 import BeautifulSoup  # For parsing HTML if needed
 import threading
+import asyncio
+from contextlib import nullcontext
+from functools import partial
+from bms_request import BASE_URL, DEFAULT_EVENT_CODE, build_city_request, load_cities
+from http_pool import get_session_pool
+from proxy_pool import ProxyPool
+from proxy_store import ProxyStore
+from snapshot_store import SnapshotStore
+from sweep_journal import SweepJournal
+from proxy_validator import validate_in_background, validate_proxies_async
+from rate_limit import AdaptiveConcurrency, get_rate_limiter, is_throttle, retry_after_seconds
+from retry_scheduler import RetryScheduler
 
 # Configure logging to file and console with DEBUG level for detailed logs
 logging.basicConfig(
@@ -23,15 +32,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# List of User-Agents for rotation
-user_agents = [
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
-    "Chrome/115.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) "
-    "Version/14.0.3 Safari/605.1.15",
-    # Add more User-Agents as needed
-]
-
 def fetch_proxies_from_multiple_sources():
     """
     Fetches proxies from multiple free proxy providers.
@@ -107,112 +107,64 @@ def validate_proxy(proxy, test_url="https://httpbin.org/get", timeout=10):
     logger.debug(f"Proxy {proxy} is invalid.")
     return False
 
-def get_valid_proxies(proxy_list, max_workers=50):
+def get_valid_proxies(proxy_list, max_workers=500, target_size=None):
     """
     Filters the provided proxy list and returns only the valid proxies.
     Args:
         proxy_list (list): List of proxies in 'ip:port' format.
-        max_workers (int): Number of threads for concurrent validation.
+        max_workers (int): Number of proxies validated concurrently.
+        target_size (int): Stop once this many valid proxies were found (None validates all).
     Returns:
-        list: List of valid proxies.
-    """
-    valid_proxies = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_proxy = {executor.submit(validate_proxy, proxy): proxy for proxy in proxy_list}
-        for future in as_completed(future_to_proxy):
-            proxy = future_to_proxy[future]
-            try:
-                if future.result():
-                    valid_proxies.append(proxy)
-            except Exception as e:
-                logger.error(f"Error validating proxy {proxy}: {e}")
-    logger.info(f"Validated proxies: {len(valid_proxies)} out of {len(proxy_list)}")
-    print(f"Validated proxies: {len(valid_proxies)} out of {len(proxy_list)}")
-    return valid_proxies
-
-def load_cities(file_path):
+        list: List of valid proxies, fastest first.
     """
-    Loads city data from a JSON file.
-    Args:
-        file_path (str): Path to the JSON file containing city data.
-    Returns:
-        list: List of city dictionaries.
-    """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            cities = json.load(f)
-            logger.debug(f"Loaded {len(cities)} cities from {file_path}.")
-            print(f"Loaded {len(cities)} cities from '{file_path}'.")
-            return cities
-    except Exception as e:
-        logger.error(f"Error loading cities from {file_path}: {e}")
-        print(f"Error loading cities from '{file_path}': {e}")
-        return []
+    results = asyncio.run(validate_proxies_async(proxy_list, concurrency=max_workers, target_size=target_size))
+    return [proxy for proxy, _ in results]
 
-def fetch_data_for_city(city, proxies, retries=3, backoff_factor=2):
+def fetch_data_for_city(city, proxy_pool, retries=1, rate_limiter=None, concurrency=None, base_url=BASE_URL):
     """
-    Fetches data for a single city using a proxy from the provided proxy list.
+    Fetches data for a single city using a proxy picked from the proxy pool.
+    Never sleeps between attempts: backoff for a failed city is scheduled by
+    the caller (see RetryScheduler) so it does not hold a worker thread.
     Args:
         city (dict): City data dictionary.
-        proxies (list): List of validated proxies.
-        retries (int): Number of retry attempts.
-        backoff_factor (int): Backoff factor for sleep between retries.
+        proxy_pool (ProxyPool): Scored pool of validated proxies; None connects directly.
+        retries (int): Number of back-to-back attempts, each with a freshly chosen proxy.
+        rate_limiter (RateLimiter): Per-host/per-proxy budgets; defaults to the shared one.
+        concurrency (AdaptiveConcurrency): Optional controller gating in-flight requests.
+        base_url (str): Endpoint to fetch from (live API or a replay server).
     Returns:
         dict or str: JSON data if successful, raw text otherwise.
     """
-    url = (
-        f"https://in.bookmyshow.com/api/movies-data/showtimes-by-event?"
-        f"appCode=MOBAND2&appVersion=14304&language=en&eventCode=ET00310216&"
-        f"regionCode={city['region_code']}&subRegion={city['sub_region_code']}&"
-        f"bmsId=1.21345445.1703250084656&token=67x1xa33b4x422b361ba&"
-        f"lat={city['latitude']}&lon={city['longitude']}&query="
-    )
-    
-    headers = {
-        "Host": "in.bookmyshow.com",
-        "x-bms-id": "1.21345445.1703250084656",
-        "x-region-code": city['region_code'],
-        "x-subregion-code": city['sub_region_code'],
-        "x-region-slug": city['region_slug'],
-        "x-platform": "AND",
-        "x-platform-code": "ANDROID",
-        "x-app-code": "MOBAND2",
-        "x-device-make": "Google-Pixel XL",
-        "x-screen-height": "2392",
-        "x-screen-width": "1440",
-        "x-screen-density": "3.5",
-        "x-app-version": "14.3.4",
-        "x-app-version-code": "14304",
-        "x-network": "Android | WIFI",
-        "x-latitude": city['latitude'],
-        "x-longitude": city['longitude'],
-        "lang": "en",
-        "User-Agent": random.choice(user_agents)  # Rotate User-Agent
-    }
+    url, headers = build_city_request(city, base_url=base_url)
+    host = urlparse.urlsplit(url).netloc
+    rate_limiter = rate_limiter or get_rate_limiter()
 
-    scraper = cloudscraper.create_scraper()
+    # Shared cloudscraper sessions, one per proxy, so Cloudflare cookies and connections are reused
+    session_pool = get_session_pool(cloudflare=True)
 
     for attempt in range(retries):
-        if not proxies:
+        proxy = proxy_pool.choose() if proxy_pool is not None else None
+        if proxy_pool is not None and proxy is None:
             logger.error("Proxy pool is empty. Exiting.")
             print("Proxy pool is empty. Exiting.")
             return None
-        proxy = random.choice(proxies)
-        proxies_dict = {
-            "http": f"http://{proxy}",
-            "https": f"http://{proxy}",  # Using HTTP proxy for HTTPS requests
-        }
         try:
             logger.debug(f"Attempt {attempt + 1}: Sending GET request to {url} using proxy {proxy}")
             print(f"Fetching data for {city['city_code']} (Attempt {attempt + 1}) using proxy {proxy}...")
             
-            response = scraper.get(url, headers=headers, proxies=proxies_dict, timeout=30)
+            rate_limiter.acquire(host, proxy)
+            with concurrency.slot() if concurrency else nullcontext():
+                response = session_pool.get(url, proxy=proxy, headers=headers, timeout=30)
+            if concurrency:
+                concurrency.record(response.status_code)
 
             # Raise an exception for HTTP error codes
             response.raise_for_status()
 
             # Parse JSON response
             data = response.json()
+            if proxy:
+                proxy_pool.report_success(proxy, response.elapsed.total_seconds())
             logger.info(f"Data fetched successfully for city: {city['city_code']}")
             print(f"Successfully fetched data for {city['city_code']}.")
             return data
@@ -220,10 +172,18 @@ def fetch_data_for_city(city, proxies, retries=3, backoff_factor=2):
         except cloudscraper.exceptions.CloudflareChallengeError as e:
             logger.error(f"Cloudflare challenge error for city {city['city_code']}: {e}")
             print(f"Cloudflare challenge error for {city['city_code']}: {e}")
-            proxies.remove(proxy)  # Remove faulty proxy
+            if concurrency:
+                concurrency.record(error=e)
+            # A challenged proxy only cools down itself; the shared host bucket pauses for direct requests
+            rate_limiter.penalize(None if proxy else host, proxy, seconds=30)
+            if proxy:
+                proxy_pool.report_failure(proxy, "cloudflare challenge")  # Cool down faulty proxy
         except requests.exceptions.HTTPError as e:
             logger.error(f"HTTP error for city {city['city_code']}: {e}")
             print(f"HTTP error for {city['city_code']}: {e}")
+            if is_throttle(error=e):
+                rate_limiter.penalize(None if proxy else host, proxy,
+                                      seconds=retry_after_seconds(response, default=30))
             # Log response content if available
             if response.content:
                 try:
@@ -234,75 +194,48 @@ def fetch_data_for_city(city, proxies, retries=3, backoff_factor=2):
                     # If response is not JSON
                     logger.debug(f"Response text for {city['city_code']}: {response.text}")
                     print(f"Response text for {city['city_code']}: {response.text}")
-            proxies.remove(proxy)  # Remove faulty proxy
+            if proxy:
+                proxy_pool.report_failure(proxy, f"HTTP {response.status_code}")  # Cool down faulty proxy
         except requests.exceptions.RequestException as e:
             logger.error(f"Request exception for city {city['city_code']}: {e}")
             print(f"Request exception for {city['city_code']}: {e}")
-            proxies.remove(proxy)  # Remove faulty proxy
+            if proxy:
+                proxy_pool.report_failure(proxy, type(e).__name__)  # Cool down faulty proxy
         except ValueError:
             # If response is not JSON, log raw text
             logger.warning(f"Response is not in JSON format for city {city['city_code']}.")
             print(f"Non-JSON response for {city['city_code']}. Saving raw text.")
             return response.text
 
-        # Exponential backoff before retrying
-        sleep_time = backoff_factor ** attempt
-        logger.debug(f"Sleeping for {sleep_time} seconds before retrying.")
-        print(f"Retrying in {sleep_time} seconds...")
-        time.sleep(sleep_time)
+        if attempt + 1 < retries:
+            # The failed proxy is cooling down in the pool, so the next attempt goes through another one
+            logger.debug(f"Retrying {city['city_code']} immediately with another proxy.")
 
     logger.error(f"All {retries} attempts failed for city {city['city_code']}.")
     print(f"Failed to fetch data for {city['city_code']} after {retries} attempts.")
     return None
 
-def save_data(directory_name, city_code, data):
-    """
-    Saves fetched data to a file.
-    Args:
-        directory_name (str): Directory to save the data.
-        city_code (str): Code of the city, used for filename.
-        data (dict or str): Data to save.
-    """
-    try:
-        if isinstance(data, dict):
-            # Define filename
-            filename = f"{city_code}.json"
-            # Full path to save the JSON file
-            file_path = os.path.join(directory_name, filename)
-            # Save JSON data to file
-            with open(file_path, 'w', encoding='utf-8') as json_file:
-                json.dump(data, json_file, ensure_ascii=False, indent=4)
-                logger.info(f"Data saved to {file_path}")
-                print(f"Saved JSON data for {city_code} to {file_path}.")
-        else:
-            # If data is raw text
-            filename = f"{city_code}.txt"
-            file_path = os.path.join(directory_name, filename)
-            with open(file_path, 'w', encoding='utf-8') as text_file:
-                text_file.write(data)
-                logger.info(f"Raw response saved to {file_path}")
-                print(f"Saved raw response for {city_code} to {file_path}.")
-    except Exception as e:
-        logger.error(f"Error saving data for city {city_code}: {e}")
-        print(f"Error saving data for {city_code}: {e}")
-
-def refresh_proxies(proxies_container, interval=3600):
+def refresh_proxies(proxy_pool, interval=3600, proxy_store=None):
     """
     Refreshes the proxy pool at regular intervals.
     Args:
-        proxies_container (dict): A dictionary to store proxies.
+        proxy_pool (ProxyPool): Pool to merge freshly validated proxies into.
+        proxy_store (ProxyStore): Optional store the pool's health is persisted to on every refresh.
         interval (int): Refresh interval in seconds.
     """
     def refresh():
         while True:
             print("Refreshing proxies...")
+            if proxy_store is not None:
+                proxy_store.save(proxy_pool)
             new_proxies = fetch_proxies_from_multiple_sources()
             if new_proxies:
                 valid_proxies = get_valid_proxies(new_proxies)
                 if valid_proxies:
-                    proxies_container['proxies'] = valid_proxies
-                    logger.info(f"Proxy pool refreshed with {len(valid_proxies)} proxies.")
-                    print(f"Proxy pool refreshed with {len(valid_proxies)} proxies.")
+                    # Merge atomically so known proxies keep their health scores
+                    proxy_pool.merge(valid_proxies)
+                    logger.info(f"Proxy pool refreshed with {len(valid_proxies)} proxies ({len(proxy_pool)} in pool).")
+                    print(f"Proxy pool refreshed with {len(valid_proxies)} proxies ({len(proxy_pool)} in pool).")
                 else:
                     logger.warning("No valid proxies found during refresh.")
                     print("No valid proxies found during refresh.")
@@ -314,101 +247,185 @@ def refresh_proxies(proxies_container, interval=3600):
     thread = threading.Thread(target=refresh, daemon=True)
     thread.start()
 
-def fetch_and_save_all_cities_parallel():
+def fetch_regions(cities_by_region, formatted_time, journal, snapshot_store, fetch, max_workers,
+                  concurrency=None, coverage_cache=None, max_attempts=3, backoff_factor=2):
+    """
+    Fetches every region of a journaled sweep that is not done yet on a
+    thread pool, storing responses as they arrive. Failed regions wait in a
+    RetryScheduler heap instead of sleeping inside a worker.
+    Args:
+        cities_by_region (dict): sub_region_code -> city dictionary.
+        formatted_time (str): Snapshot id of the sweep (already started in the journal).
+        journal (SweepJournal): Checkpoint journal of the sweep.
+        snapshot_store (SnapshotStore or DeltaCapture): Where responses are stored.
+        fetch (callable): fetch(city) -> data or None, e.g. fetch_data_for_city with its proxy pool bound.
+        max_workers (int): Worker threads.
+        concurrency (AdaptiveConcurrency): Controller whose limit is reported in the progress line.
+        coverage_cache (CoverageCache): Optional cache updated with each stored response.
+        max_attempts (int): Attempts per region before it is left failed.
+        backoff_factor (int): Base of the jittered exponential backoff between attempts of a region.
+    Returns:
+        int: Regions fetched and stored in this run.
+    """
+    # Failed regions wait in a heap of due times instead of sleeping inside a worker
+    retry_scheduler = RetryScheduler(base=backoff_factor, max_attempts=max_attempts)
+    success_count = 0
+    completed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_region = {}
+
+        def submit(region):
+            journal.mark_running(formatted_time, region)
+            future = executor.submit(fetch, cities_by_region[region])
+            future_to_region[future] = region
+
+        # Everything not done yet, including failed regions with attempts left from an interrupted run
+        pending = journal.due(formatted_time, max_attempts, now=float('inf'))
+        for region in pending:
+            submit(region)
+        logger.debug(f"Submitted {len(pending)} fetch tasks.")
+        print(f"Submitted {len(pending)} fetch tasks.")
+
+        while future_to_region or retry_scheduler:
+            for region in retry_scheduler.pop_due():
+                submit(region)
+            if not future_to_region:
+                # Only retries that are not due yet remain
+                time.sleep(retry_scheduler.next_due_in())
+                continue
+
+            done, _ = wait(future_to_region, timeout=retry_scheduler.next_due_in(), return_when=FIRST_COMPLETED)
+            for future in done:
+                region = future_to_region.pop(future)
+                city = cities_by_region[region]
+                error = None
+                try:
+                    data = future.result()
+                    if data:
+                        # Raises if the response could not be stored, so the region is retried, not marked done
+                        snapshot_store.write_region(formatted_time, region, data)
+                        if coverage_cache is not None:
+                            coverage_cache.record_response(DEFAULT_EVENT_CODE, region, data)
+                        journal.mark_done(formatted_time, region)
+                        success_count += 1
+                    else:
+                        logger.warning(f"No data returned for city {city['city_code']}.")
+                        print(f"No data returned for {city['city_code']}.")
+                        error = "no data"
+                except Exception as e:
+                    logger.error(f"Unhandled exception for city {city['city_code']}: {e}")
+                    print(f"Unhandled exception for {city['city_code']}: {e}")
+                    error = str(e)
+                if error is not None:
+                    retry_in = retry_scheduler.schedule(region, journal.attempts(formatted_time, region))
+                    journal.mark_failed(formatted_time, region, error, retry_in or 0)
+
+                completed += 1
+                limit = concurrency.limit if concurrency else max_workers
+                print(f"Progress: {completed} attempts, {success_count} regions done, "
+                      f"{len(retry_scheduler)} waiting to retry (concurrency limit {limit}).")
+
+    retry_scheduler.log_stats()
+    return success_count
+
+def fetch_and_save_all_cities_parallel(snapshot_store=None, coverage_cache=None, journal=None,
+                                       max_attempts=3, backoff_factor=2):
     """
     Orchestrates the fetching and saving of data for all cities using proxies.
+    Args:
+        snapshot_store (SnapshotStore or DeltaCapture): Where responses are stored; defaults
+            to the Parquet store under 'snapshots/' without raw JSON. Pass a DeltaCapture for
+            high-frequency polling to only record changed seat availability.
+        coverage_cache (CoverageCache): Optional cache used to skip regions known to have no
+            shows and to fetch the largest regions first.
+        journal (SweepJournal): Checkpoint journal; an unfinished sweep found in it is resumed
+            under its original snapshot id, fetching only regions that are not done yet.
+        max_attempts (int): Attempts per region before it is left failed.
+        backoff_factor (int): Base of the jittered exponential backoff between attempts of a region.
     """
     # Get current IST time
     ist_timezone = pytz.timezone('Asia/Kolkata')
     current_ist_time = datetime.now(ist_timezone)
     formatted_time = current_ist_time.strftime('%Y%m%d_%H%M%S')  # Example: 20240924_153045
 
-    # Define base directory
-    base_directory = 'data'
-
-    # Define directory name using current IST time
-    directory_name = os.path.join(base_directory, formatted_time)
+    # Load city data
+    cities = load_cities('region_data_output.json')
+    if not cities:
+        logger.critical("No cities loaded. Exiting script.")
+        print("Critical Error: No cities loaded. Exiting script.")
+        return
+    cities_by_region = {}
+    for city in cities:
+        cities_by_region.setdefault(city['sub_region_code'], city)
+    if coverage_cache is not None:
+        cities, skipped = coverage_cache.plan(DEFAULT_EVENT_CODE, cities)
+        print(f"Fetching {len(cities)} regions, skipping {len(skipped)} known-empty regions.")
+
+    # Continue an interrupted sweep where it stopped instead of starting over
+    journal = journal or SweepJournal()
+    formatted_time, resumed = journal.resume_or_start(
+        formatted_time, dict.fromkeys(city['sub_region_code'] for city in cities))
+    if resumed:
+        print(f"Resuming interrupted sweep {formatted_time}: {journal.summary(formatted_time)}")
+    pending = journal.due(formatted_time, max_attempts, now=float('inf'))
+    if not pending:
+        # e.g. every region was skipped as known-empty: no proxies, workers or controller to set up
+        journal.finish(formatted_time)
+        logger.info(f"Nothing to fetch for sweep {formatted_time}.")
+        print("Nothing to fetch: every region is done or skipped.")
+        return
 
-    # Create base directory if it doesn't exist
-    if not os.path.exists(base_directory):
-        os.makedirs(base_directory)
-        logger.info(f"Created base directory: {base_directory}")
-        print(f"Created base directory: '{base_directory}'.")
+    # Responses are stored as columnar rows partitioned by snapshot timestamp and region
+    snapshot_store = snapshot_store or SnapshotStore()
+    logger.info(f"Storing snapshot {formatted_time} in {snapshot_store.root}")
+    print(f"Storing snapshot {formatted_time} in '{snapshot_store.root}'.")
 
-    # Create time-stamped directory
-    if not os.path.exists(directory_name):
-        os.makedirs(directory_name)
-        logger.info(f"Created directory: {directory_name}")
-        print(f"Created time-stamped directory: '{directory_name}'.")
+    # Warm-start the scored pool with proxies that worked against BookMyShow in previous runs
+    proxy_store = ProxyStore()
+    proxy_pool = ProxyPool()
+    proxy_store.warm_start(proxy_pool)
 
     # Fetch proxies from multiple sources
     proxy_list = fetch_proxies_from_multiple_sources()
-    if not proxy_list:
+    if not proxy_list and not proxy_pool:
         logger.critical("No proxies fetched. Exiting script.")
         print("Critical Error: No proxies fetched. Exiting script.")
         return
 
-    # Validate proxies
-    valid_proxies = get_valid_proxies(proxy_list)
-    if not valid_proxies:
+    # Validate proxies in the background, streaming them into the scored pool as they pass,
+    # and start fetching as soon as a handful are known to work
+    min_ready = 5
+    _, proxies_ready = validate_in_background(proxy_list, proxy_pool, min_ready=min_ready, target_size=500)
+    if len(proxy_pool) < min_ready:
+        proxies_ready.wait()
+    if not proxy_pool:
         logger.critical("No valid proxies available after validation. Exiting script.")
         print("Critical Error: No valid proxies available after validation. Exiting script.")
         return
 
-    # Initialize proxy pool container
-    proxies_container = {'proxies': valid_proxies}
-
     # Start proxy refreshing in the background
-    refresh_proxies(proxies_container, interval=3600)  # Refresh every hour
+    refresh_proxies(proxy_pool, interval=3600, proxy_store=proxy_store)  # Refresh every hour
 
-    # Define the number of worker threads
-    max_workers = min(10, len(cities))  # Adjust based on your needs
+    # Define the number of worker threads; the adaptive controller decides how many are in flight
+    max_workers = max(1, min(32, len(pending)))  # Adjust based on your needs
+    concurrency = AdaptiveConcurrency(initial=min(10, max_workers), max_limit=max_workers)
     logger.debug(f"Using {max_workers} worker threads for fetching data.")
     print(f"Starting data fetch with {max_workers} worker threads.")
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all fetch tasks
-        future_to_city = {
-            executor.submit(fetch_data_for_city, city, proxies_container['proxies']): city
-            for city in cities
-        }
-        total_cities = len(cities)
-        logger.debug(f"Submitted {total_cities} fetch tasks.")
-        print(f"Submitted {total_cities} fetch tasks.")
-
-        completed = 0
-        success_count = 0
-        failure_count = 0
-
-        for future in as_completed(future_to_city):
-            city = future_to_city[future]
-            try:
-                data = future.result()
-                if data:
-                    save_data(directory_name, city['city_code'], data)
-                    success_count += 1
-                else:
-                    logger.warning(f"No data returned for city {city['city_code']}.")
-                    print(f"No data returned for {city['city_code']}.")
-                    failure_count += 1
+    success_count = fetch_regions(cities_by_region, formatted_time, journal, snapshot_store,
+                                  partial(fetch_data_for_city, proxy_pool=proxy_pool, concurrency=concurrency),
+                                  max_workers, concurrency, coverage_cache, max_attempts, backoff_factor)
+    journal.finish(formatted_time)
 
-                completed += 1
-                print(f"Progress: {completed}/{total_cities} cities processed.")
-
-                # Optional: Random delay to be polite
-                delay = random.uniform(1, 3)
-                logger.debug(f"Sleeping for {delay:.2f} seconds before next request.")
-                print(f"Sleeping for {delay:.2f} seconds before next request.")
-                time.sleep(delay)
-            except Exception as e:
-                logger.error(f"Unhandled exception for city {city['city_code']}: {e}")
-                print(f"Unhandled exception for {city['city_code']}: {e}")
-                failure_count += 1
-
-    # Summary
-    summary = f"Data fetching completed: {success_count} succeeded, {failure_count} failed."
+    # Summary, over the whole sweep including regions done before a resume
+    totals = journal.summary(formatted_time)
+    summary = (f"Data fetching completed: {totals.get('done', 0)} succeeded, {totals.get('failed', 0)} failed "
+               f"({success_count} fetched in this run).")
     print(summary)
     logger.info(summary)
+    logger.info(f"Final concurrency limit {concurrency.limit}, {concurrency.throttles} throttled responses.")
+    get_session_pool(cloudflare=True).log_stats()
+    proxy_store.save(proxy_pool)
 
 if __name__ == "__main__":
     fetch_and_save_all_cities_parallel()
@@ -0,0 +1,120 @@
+import copy
+import json
+import os
+import sqlite3
+
+import pytest
+
+from delta_capture import DeltaCapture
+
+SNAPSHOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', '20240924_204353')
+
+
+@pytest.fixture
+def data():
+    with open(os.path.join(SNAPSHOT, 'CHEN.json')) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def capture(tmp_path):
+    capture = DeltaCapture(str(tmp_path / 'deltas.db'))
+    yield capture
+    capture.close()
+
+
+def first_category(data):
+    venue = data['ShowDetails'][0]['Venues'][0]
+    show = venue['ShowTimes'][0]
+    return venue['VenueCode'], show['SessionId'], show['Categories'][0]
+
+
+def book(data, seats):
+    data = copy.deepcopy(data)
+    _, _, category = first_category(data)
+    category['SeatsAvail'] = str(int(category['SeatsAvail']) - seats)
+    return data
+
+
+def test_first_capture_records_every_row(capture, data):
+    rows_seen, rows_changed = capture.capture('20240924_200000', 'CHEN', data)
+    assert rows_seen > 0
+    assert rows_changed == rows_seen
+    assert len(capture.availability()) == rows_seen
+
+
+def test_unchanged_poll_writes_nothing(capture, data):
+    rows_seen, _ = capture.capture('20240924_200000', 'CHEN', data)
+    assert capture.capture('20240924_200500', 'CHEN', data) == (rows_seen, 0)
+
+
+def test_only_changed_categories_are_appended(capture, data):
+    capture.capture('20240924_200000', 'CHEN', data)
+    before = first_category(data)[2]['SeatsAvail']
+    rows_seen, rows_changed = capture.capture('20240924_200500', 'CHEN', book(data, 3))
+    assert rows_changed == 1
+
+    venue_code, session_id, category = first_category(data)
+    history = [row for row in capture.history(venue_code, session_id) if row[1] == category['AreaCatCode']]
+    assert [(row[0], row[2]) for row in history] == [
+        ('20240924_200000', int(before)), ('20240924_200500', int(before) - 3),
+    ]
+    # Availability as of the first poll still shows the old count
+    seats = {(row[0], row[1], row[2]): row[3] for row in capture.availability('20240924_200000')}
+    assert seats[(venue_code, session_id, category['AreaCatCode'])] == int(before)
+
+
+def test_state_survives_reopening(tmp_path, data):
+    path = str(tmp_path / 'deltas.db')
+    first = DeltaCapture(path)
+    rows_seen, _ = first.capture('20240924_200000', 'CHEN', data)
+    first.close()
+
+    reopened = DeltaCapture(path)
+    assert reopened.capture('20240924_200500', 'CHEN', data) == (rows_seen, 0)
+    assert reopened.capture('20240924_201000', 'CHEN', book(data, 1))[1] == 1
+    reopened.close()
+
+
+class FailingConnection:
+    """
+    Wraps a sqlite3 connection and fails the availability insert, like a full disk mid-transaction.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self.conn.__exit__(*exc)
+
+    def executemany(self, sql, rows):
+        if 'availability' in sql:
+            raise sqlite3.OperationalError('database or disk is full')
+        return self.conn.executemany(sql, rows)
+
+
+def test_failed_commit_is_retried_next_poll(capture, data):
+    conn = capture._conn
+    capture._conn = FailingConnection(conn)
+    with pytest.raises(sqlite3.OperationalError):
+        capture.capture('20240924_200000', 'CHEN', data)
+    capture._conn = conn
+
+    # Nothing was committed, so the next poll must still see every row as new
+    rows_seen, rows_changed = capture.capture('20240924_200500', 'CHEN', data)
+    assert rows_changed == rows_seen
+    assert len(capture.availability()) == rows_seen
+
+
+def test_write_region_raises_when_the_capture_fails(capture, data):
+    conn = capture._conn
+    capture._conn = FailingConnection(conn)
+    with pytest.raises(sqlite3.OperationalError):
+        capture.write_region('20240924_200000', 'CHEN', data)
+    capture._conn = conn
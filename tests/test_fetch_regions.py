@@ -0,0 +1,83 @@
+import importlib
+import json
+import os
+
+import pytest
+
+from snapshot_store import SnapshotStore
+from sweep_journal import DONE, FAILED, SweepJournal
+
+REGIONS = ['BANG', 'CHEN', 'HYD']
+SNAPSHOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', '20240924_204353')
+
+
+class FlakyStore:
+    """
+    Store whose writes fail for `region` the first `failures` times.
+    """
+
+    def __init__(self, region, failures):
+        self.region = region
+        self.failures = failures
+        self.written = []
+
+    def write_region(self, snapshot, region_code, data):
+        if region_code == self.region and self.failures:
+            self.failures -= 1
+            raise OSError('disk full')
+        self.written.append(region_code)
+        return 1
+
+
+@pytest.fixture
+def fetch_regions(tmp_path, monkeypatch):
+    # test5 opens fetch_data.log in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module('test5').fetch_regions
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = SweepJournal(str(tmp_path / 'sweeps.db'))
+    journal.start('20240924_200000', REGIONS)
+    yield journal
+    journal.close()
+
+
+def fetch(city):
+    return {'ShowDetails': [], 'region': city['sub_region_code']}
+
+
+def cities():
+    return {region: {'city_code': region, 'sub_region_code': region} for region in REGIONS}
+
+
+def test_failed_save_is_retried(fetch_regions, journal):
+    store = FlakyStore('CHEN', failures=1)
+    assert fetch_regions(cities(), '20240924_200000', journal, store, fetch, max_workers=2, backoff_factor=1) == 3
+    assert sorted(store.written) == REGIONS
+    assert journal.summary('20240924_200000') == {DONE: 3}
+    assert journal.attempts('20240924_200000', 'CHEN') == 2
+
+
+def test_save_that_keeps_failing_is_left_failed(fetch_regions, journal):
+    store = FlakyStore('CHEN', failures=5)
+    assert fetch_regions(cities(), '20240924_200000', journal, store, fetch, max_workers=2, max_attempts=1) == 2
+    assert journal.summary('20240924_200000') == {DONE: 2, FAILED: 1}
+    assert journal.failed('20240924_200000') == [('CHEN', 1, 'disk full')]
+    # A resumed sweep still has the region to fetch
+    assert journal.due('20240924_200000', max_attempts=2, now=float('inf')) == ['CHEN']
+
+
+def test_snapshot_store_write_error_reaches_the_journal(fetch_regions, journal, tmp_path, monkeypatch):
+    with open(os.path.join(SNAPSHOT, 'CHEN.json')) as f:
+        data = json.load(f)
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+
+    def write_table(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(store, 'write_table', write_table)
+    assert fetch_regions(cities(), '20240924_200000', journal, store, lambda city: data,
+                         max_workers=2, max_attempts=1) == 0
+    assert journal.summary('20240924_200000') == {FAILED: 3}
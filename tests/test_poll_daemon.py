@@ -0,0 +1,30 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import poll_daemon
+from poll_daemon import PollDaemon
+from showtime_parser import num_rows, parse_file
+from snapshot_store import SnapshotStore
+
+SNAPSHOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', '20240924_204353')
+
+
+def test_counters_add_up_across_pool_threads(tmp_path, monkeypatch):
+    columns = parse_file(os.path.join(SNAPSHOT, 'CHEN.json'))
+    calls = iter(range(10 ** 6))
+
+    def request_showtimes(code, name, base_url, event_code):
+        # Every fifth request fails; the rest return CHEN, whose sessions are all long closed
+        if next(calls) % 5 == 0:
+            raise OSError('connection reset')
+        return columns
+
+    monkeypatch.setattr(poll_daemon, 'request_showtimes', request_showtimes)
+    daemon = PollDaemon([('CHEN', 'Chennai')], store=SnapshotStore(str(tmp_path / 'snapshots')))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: daemon.poll('CHEN', 'Chennai'), range(2000)))
+
+    assert daemon.failures == 400
+    assert daemon.polls == 1600
+    assert daemon.rows_stored == 0
+    assert daemon.rows_closed == 1600 * num_rows(columns)
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from retry_scheduler import RetryScheduler
+
+
+def test_backoff_is_exponential_and_capped():
+    scheduler = RetryScheduler(base=2, max_delay=10, jitter=0)
+    assert [scheduler.backoff(attempt) for attempt in range(1, 7)] == [1, 2, 4, 8, 10, 10]
+
+
+@pytest.mark.parametrize('attempt', [1, 2, 3])
+def test_backoff_jitter_stays_in_bounds(attempt):
+    scheduler = RetryScheduler(base=2, jitter=0.5, rng=random.Random(7))
+    delays = [scheduler.backoff(attempt) for _ in range(200)]
+    assert min(delays) >= 0.5 * 2 ** (attempt - 1)
+    assert max(delays) <= 1.5 * 2 ** (attempt - 1)
+    assert len(set(delays)) > 1
+
+
+def test_pop_due_returns_due_items_earliest_first():
+    scheduler = RetryScheduler(base=2, jitter=0, max_attempts=5)
+    now = 1000.0
+    scheduler.schedule('BANG', 3, now=now)  # due in 4s
+    scheduler.schedule('CHEN', 1, now=now)  # due in 1s
+    scheduler.schedule('HYD', 2, now=now)  # due in 2s
+
+    assert scheduler.pop_due(now=now + 0.5) == []
+    assert scheduler.next_due_in(now=now + 0.5) == pytest.approx(0.5)
+    assert scheduler.pop_due(now=now + 2) == ['CHEN', 'HYD']
+    assert len(scheduler) == 1
+    assert scheduler.pop_due(now=now + 10) == ['BANG']
+    assert not scheduler
+    assert scheduler.next_due_in(now=now + 10) is None
+
+
+def test_items_due_together_keep_scheduling_order():
+    scheduler = RetryScheduler(jitter=0)
+    for key in ['MUMBAI', 'AHD', 'BANG', 'CHEN']:
+        scheduler.schedule(key, 1, now=1000.0)
+    assert scheduler.pop_due(now=1001.0) == ['MUMBAI', 'AHD', 'BANG', 'CHEN']
+
+
+def test_exhausted_items_are_not_rescheduled():
+    scheduler = RetryScheduler(jitter=0, max_attempts=3)
+    assert scheduler.schedule('BANG', 1, now=1000.0) == 1
+    assert scheduler.schedule('BANG', 2, now=1000.0) == 2
+    assert scheduler.schedule('BANG', 3, now=1000.0) is None
+    assert len(scheduler) == 2
+    stats = scheduler.stats()
+    assert stats['retries'] == 2
+    assert stats['retried'] == 1
+    assert stats['backoff_seconds'] == 3
@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rollups import LEVELS, ROW_KEY, RollupEngine
+from showtime_parser import parse_file
+from snapshot_pipeline import AGGREGATE_COLUMNS
+
+SNAPSHOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', '20240924_204353')
+
+
+def load(region):
+    return parse_file(os.path.join(SNAPSHOT, f'{region}.json'))
+
+
+def sell(columns, rows, tickets):
+    # A re-poll where `tickets` more seats were booked in each of `rows`
+    columns = {name: np.array(values, copy=True) for name, values in columns.items()}
+    columns['BookedTickets'][rows] += tickets
+    columns['SeatsAvailable'][rows] -= tickets
+    columns['BookedGross'][rows] += tickets * columns['CurrentPrice'][rows]
+    return columns
+
+
+def subset(columns, rows):
+    return {name: np.asarray(values)[rows] for name, values in columns.items()}
+
+
+def recompute(updates):
+    """
+    Totals from scratch: each region's latest response, later updates winning for rows several regions return.
+    """
+    latest = {}
+    for region, columns in updates:
+        latest.pop(region, None)
+        latest[region] = pd.DataFrame(columns)
+    return pd.concat(latest.values()).drop_duplicates(list(ROW_KEY), keep='last')
+
+
+def assert_totals_match(engine, updates):
+    rows = recompute(updates)
+    for level, keys in LEVELS.items():
+        totals = engine.totals(level).to_pandas()
+        if keys:
+            expected = rows.groupby(list(keys))[AGGREGATE_COLUMNS].sum().reset_index()
+            expected = expected.sort_values(list(keys)).reset_index(drop=True)
+            assert totals[list(keys)].values.tolist() == expected[list(keys)].values.tolist(), level
+        else:
+            expected = rows[AGGREGATE_COLUMNS].sum().to_frame().T
+        np.testing.assert_allclose(totals[AGGREGATE_COLUMNS].to_numpy(dtype=float),
+                                   expected[AGGREGATE_COLUMNS].to_numpy(dtype=float), err_msg=level)
+
+
+@pytest.fixture
+def updates():
+    return [(region, load(region)) for region in ('BANG', 'CHEN', 'ADIL', 'AALU')]
+
+
+def test_totals_match_recompute(updates):
+    engine = RollupEngine()
+    for region, columns in updates:
+        engine.update(region, columns)
+    assert_totals_match(engine, updates)
+
+
+def test_overlapping_regions_count_rows_once(updates):
+    engine = RollupEngine()
+    for region, columns in updates:
+        engine.update(region, columns)
+    national = engine.national()
+
+    # A second region returning the same venues (e.g. a sub-region of BANG) adds nothing
+    bang = dict(updates)['BANG']
+    assert engine.update('BANG-SUB', bang) == 0
+    assert engine.national() == national
+    assert_totals_match(engine, updates + [('BANG-SUB', bang)])
+
+
+def test_repolls_apply_only_changes(updates):
+    engine = RollupEngine()
+    for region, columns in updates:
+        engine.update(region, columns)
+    assert engine.update('CHEN', dict(updates)['CHEN']) == 0
+
+    bang, chen = dict(updates)['BANG'], dict(updates)['CHEN']
+    repolls = [
+        ('BANG-SUB', bang),
+        ('BANG', sell(bang, [0, 5, 9], 2)),  # seats sold in three categories
+        ('CHEN', subset(chen, slice(0, len(chen['VenueCode']) - 4))),  # four categories no longer listed
+        ('BANG-SUB', sell(bang, [5], 3)),  # the overlapping region sees a later booking
+    ]
+    assert engine.update(*repolls[0]) == 0
+    assert engine.update(*repolls[1]) == 3
+    assert engine.update(*repolls[2]) == 4
+    assert engine.update(*repolls[3]) == 3
+    assert_totals_match(engine, updates + repolls)
+
+
+def test_empty_response_removes_region(updates):
+    engine = RollupEngine()
+    for region, columns in updates:
+        engine.update(region, columns)
+    chen = dict(updates)['CHEN']
+    engine.update('CHEN', subset(chen, slice(0, 0)))
+    assert 'CHEN' not in engine.totals('city').column('SubRegCode').to_pylist()
+    assert_totals_match(engine, updates + [('CHEN', subset(chen, slice(0, 0)))])
+
+
+def test_row_stays_counted_while_an_overlapping_region_returns_it(updates):
+    engine = RollupEngine()
+    for region, columns in updates:
+        engine.update(region, columns)
+    bang = dict(updates)['BANG']
+    kept = subset(bang, slice(0, len(bang['VenueCode']) - 4))
+    national = engine.national()
+
+    # BANG owns the rows, but BANG-SUB still returns the four BANG drops: nothing is subtracted
+    repolls = [('BANG-SUB', bang), ('BANG', kept)]
+    assert engine.update(*repolls[0]) == 0
+    assert engine.update(*repolls[1]) == 0
+    assert engine.national() == national
+    assert_totals_match(engine, updates + repolls)
+
+    # Once the last region returning them drops them too, they are subtracted
+    repolls.append(('BANG-SUB', kept))
+    assert engine.update(*repolls[2]) == 4
+    assert_totals_match(engine, updates + repolls)
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from showtime_cache import FRESH, LOADING, ShowtimeCache
+from showtime_index import ShowtimeIndex
+from showtime_parser import parse_showtimes, to_dataframe
+
+RENDERERS = {
+    'index': lambda entry: ShowtimeIndex(entry.df, entry.version),
+    'json': lambda entry: entry.df.to_json(orient='records'),
+}
+
+
+def test_city_without_shows_is_cached():
+    cache = ShowtimeCache(lambda code, name: to_dataframe(parse_showtimes({})), [('BANG', 'Bangalore')],
+                          renderers=RENDERERS)
+    assert cache.status('BANG') == LOADING
+    assert cache.refresh('BANG')
+
+    json_fragment, entry, status = cache.fragment('BANG', 'json', RENDERERS['json'])
+    assert status == FRESH
+    assert json.loads(json_fragment) == []
+    index = entry.fragments['index']
+    assert index.columns == list(entry.df.columns)
+    _, body = index.response('BANG', sort='-BookedGross')
+    assert json.loads(body)['total'] == 0
+    assert cache.failures == 0
+
+
+@pytest.mark.parametrize('fetch_result', [None, RuntimeError('connection reset')])
+def test_failed_fetch_keeps_cached_copy(fetch_result):
+    results = [to_dataframe(parse_showtimes({})), fetch_result]
+
+    def fetch(code, name):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    cache = ShowtimeCache(fetch, [('BANG', 'Bangalore')], renderers=RENDERERS)
+    cache.refresh('BANG')
+    version = cache.get('BANG')[0].version
+    assert not cache.refresh('BANG')
+    assert cache.failures == 1
+    assert cache.get('BANG')[0].version == version
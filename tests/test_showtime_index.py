@@ -0,0 +1,82 @@
+import gzip
+import json
+
+import pandas as pd
+import pytest
+
+from showtime_index import QueryError, ShowtimeIndex
+
+
+@pytest.fixture
+def df():
+    venues = ['PVR Forum', 'INOX Garuda', 'Cinepolis Orion']
+    return pd.DataFrame({
+        'Id': range(30),
+        'VenueName': [venues[i % 3] for i in range(30)],
+        'ShowTime': [f'{10 + i % 4}:00 AM' for i in range(30)],
+        'Category': ['GOLD' if i % 2 else 'SILVER' for i in range(30)],
+        'Price': [100 + (i * 37) % 250 for i in range(30)],
+    })
+
+
+def pages(index, filters=None, sort=None, limit=7):
+    rows = []
+    cursor = None
+    while True:
+        result = index.query(filters, sort, cursor, limit)
+        rows += json.loads(result['rows'])
+        cursor = result['next_cursor']
+        if cursor is None:
+            return rows, result['total']
+
+
+@pytest.mark.parametrize('sort', [None, 'Price', '-Price', 'VenueName'])
+def test_cursor_pages_cover_query_in_sort_order(df, sort):
+    filters = {'venue': ['PVR Forum', 'INOX Garuda'], 'category': ['GOLD']}
+    rows, total = pages(ShowtimeIndex(df, 'v1'), filters, sort)
+
+    expected = df[df['VenueName'].isin(filters['venue']) & df['Category'].isin(filters['category'])]
+    if sort:
+        expected = expected.sort_values(sort.lstrip('-'), ascending=not sort.startswith('-'), kind='stable')
+    assert total == len(expected)
+    # Every matching row exactly once, in the same order as a full sort, across page boundaries
+    assert [row['Id'] for row in rows] == expected['Id'].tolist()
+
+
+def test_cursor_from_older_version_is_rejected(df):
+    cursor = ShowtimeIndex(df, 'v1').query(limit=5)['next_cursor']
+    with pytest.raises(QueryError):
+        ShowtimeIndex(df, 'v2').query(cursor=cursor, limit=5)
+
+
+def test_cursor_from_other_sort_is_rejected(df):
+    index = ShowtimeIndex(df, 'v1')
+    cursor = index.query(sort='Price', limit=5)['next_cursor']
+    with pytest.raises(QueryError):
+        index.query(sort='-Price', cursor=cursor, limit=5)
+
+
+def test_unknown_sort_column_is_rejected(df):
+    with pytest.raises(QueryError):
+        ShowtimeIndex(df, 'v1').query(sort='Nope')
+
+
+def test_etag_ignores_filter_order_and_tracks_version(df):
+    index = ShowtimeIndex(df, 'v1')
+    a = index.etag({'venue': ['PVR Forum', 'INOX Garuda'], 'category': []}, 'Price', None, 10)
+    b = index.etag({'venue': ['INOX Garuda', 'PVR Forum']}, 'Price', None, 10)
+    assert a == b
+    assert a != index.etag({'venue': ['PVR Forum']}, 'Price', None, 10)
+    assert a != ShowtimeIndex(df, 'v2').etag({'venue': ['PVR Forum', 'INOX Garuda']}, 'Price', None, 10)
+
+
+def test_response_etag_depends_on_encoding(df):
+    index = ShowtimeIndex(df, 'v1')
+    plain_etag, plain = index.response('BANG', sort='Price', limit=10)
+    gzip_etag, gzipped = index.response('BANG', sort='Price', limit=10, compress=True)
+
+    assert plain_etag == index.etag(None, 'Price', None, 10)
+    assert gzip_etag == index.etag(None, 'Price', None, 10, compress=True)
+    assert plain_etag != gzip_etag
+    assert gzip.decompress(gzipped) == plain
+    assert json.loads(plain)['count'] == 10
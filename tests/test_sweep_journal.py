@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from sweep_journal import DONE, FAILED, PENDING, SweepJournal
+
+REGIONS = ['MUMBAI', 'NCR', 'BANG', 'HYD', 'CHEN']
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = SweepJournal(str(tmp_path / 'sweeps.db'))
+    yield journal
+    journal.close()
+
+
+def test_pending_regions_are_due_in_submission_order(journal):
+    journal.start('20240924_200000', REGIONS)
+    assert journal.due('20240924_200000') == REGIONS
+
+    journal.mark_running('20240924_200000', 'NCR')
+    journal.mark_done('20240924_200000', 'BANG')
+    assert journal.due('20240924_200000') == ['MUMBAI', 'HYD', 'CHEN']
+
+
+def test_failed_region_is_due_only_once_its_retry_time_passes(journal):
+    journal.start('20240924_200000', REGIONS)
+    for region in REGIONS:
+        journal.mark_running('20240924_200000', region)
+    journal.mark_done('20240924_200000', 'MUMBAI')
+    journal.mark_failed('20240924_200000', 'NCR', 'HTTP 503', retry_in=60)
+    journal.mark_failed('20240924_200000', 'HYD', 'HTTP 429', retry_in=5)
+
+    now = time.time()
+    assert journal.due('20240924_200000', now=now) == []
+    assert journal.next_retry_in('20240924_200000', now=now) == pytest.approx(5, abs=1)
+    assert journal.due('20240924_200000', now=now + 10) == ['HYD']
+    assert journal.due('20240924_200000', now=now + 120) == ['NCR', 'HYD']
+
+
+def test_failed_region_stops_being_due_after_max_attempts(journal):
+    journal.start('20240924_200000', ['BANG'])
+    for _ in range(3):
+        journal.mark_running('20240924_200000', 'BANG')
+        journal.mark_failed('20240924_200000', 'BANG', 'timeout')
+    assert journal.attempts('20240924_200000', 'BANG') == 3
+    assert journal.due('20240924_200000', max_attempts=3, now=time.time() + 1) == []
+    assert journal.next_retry_in('20240924_200000', max_attempts=3) is None
+    assert journal.failed('20240924_200000') == [('BANG', 3, 'timeout')]
+
+
+def test_resume_continues_unfinished_sweep(tmp_path):
+    path = str(tmp_path / 'sweeps.db')
+    journal = SweepJournal(path)
+    journal.start('20240924_200000', REGIONS)
+    journal.mark_running('20240924_200000', 'MUMBAI')
+    journal.mark_done('20240924_200000', 'MUMBAI')
+    journal.mark_running('20240924_200000', 'NCR')  # in flight when the process died
+    journal.close()
+
+    journal = SweepJournal(path)
+    snapshot, resumed = journal.resume_or_start('20240924_210000', REGIONS)
+    assert (snapshot, resumed) == ('20240924_200000', True)
+    # The interrupted attempt is not counted, and the remaining regions keep their order
+    assert journal.attempts(snapshot, 'NCR') == 0
+    assert journal.due(snapshot) == ['NCR', 'BANG', 'HYD', 'CHEN']
+    assert journal.summary(snapshot) == {DONE: 1, PENDING: 4}
+
+    journal.finish(snapshot)
+    assert journal.resume_or_start('20240924_210000', REGIONS) == ('20240924_210000', False)
+    assert FAILED not in journal.summary('20240924_210000')
+    journal.close()
@@ -0,0 +1,93 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from viewer_data import FilterIndex, date_range
+
+VENUES = ['PVR Forum', 'INOX Garuda', 'Cinepolis Orion', 'AMB Cinemas', 'Sathyam']
+CATEGORIES = ['GOLD', 'SILVER', 'RECLINER', 'PLATINUM']
+
+
+@pytest.fixture(scope='module')
+def df():
+    rng = np.random.default_rng(3)
+    rows = 2000
+    venue = pd.Categorical(rng.choice(VENUES, rows), categories=VENUES)
+    venue[rng.random(rows) < 0.02] = np.nan
+    price = rng.integers(100, 800, rows).astype(float)
+    price[rng.random(rows) < 0.02] = np.nan
+    return pd.DataFrame({
+        'VenueName': venue,
+        'Category': pd.Categorical(rng.choice(CATEGORIES, rows)),
+        'Status': rng.choice(['Available', 'Filling Fast', 'Sold Out'], rows),  # plain object column
+        'CurrentPrice': price,
+        'BookedTickets': rng.integers(0, 300, rows),
+        'ShowDateTime': pd.Timestamp('2024-09-24') + pd.to_timedelta(rng.integers(0, 96, rows), unit='h'),
+    })
+
+
+def reference(df, state):
+    """
+    The viewer's filters with plain pandas: isin for non-empty multiselects, between for ranges.
+    """
+    mask = pd.Series(True, index=df.index)
+    for column, selection in state.items():
+        if isinstance(selection, tuple):
+            mask &= df[column].between(*selection)
+        elif selection:
+            mask &= df[column].isin(selection)
+    return np.flatnonzero(mask.to_numpy())
+
+
+def random_state(df, rng):
+    state = {}
+    for column in ['VenueName', 'Category', 'Status']:
+        options = list(df[column].dropna().unique())
+        state[column] = rng.sample(options, rng.randint(0, len(options)))
+    for column in ['CurrentPrice', 'BookedTickets', 'ShowDateTime']:
+        low, high = sorted(rng.choice(df[column].dropna().tolist()) for _ in range(2))
+        state[column] = (low, high) if rng.random() < 0.8 else (df[column].min(), df[column].max())
+    return state
+
+
+def test_select_matches_isin_and_between(df):
+    index = FilterIndex(df)
+    rng = random.Random(11)
+    for _ in range(300):
+        state = random_state(df, rng)
+        np.testing.assert_array_equal(index.select(state), reference(df, state), err_msg=repr(state))
+
+
+def test_repeated_state_is_served_from_cache(df):
+    index = FilterIndex(df)
+    state = {'VenueName': ['PVR Forum', 'Sathyam'], 'CurrentPrice': (200.0, 450.0)}
+    first = index.select(state)
+    assert index.select(dict(reversed(state.items()))) is first
+    assert (index.hits, index.misses) == (1, 1)
+    pd.testing.assert_frame_equal(index.filtered(state), df.iloc[reference(df, state)])
+
+
+def test_unknown_values_match_nothing(df):
+    index = FilterIndex(df)
+    assert len(index.select({'VenueName': ['Nowhere']})) == 0
+    assert len(index.select({'Status': ['Nowhere']})) == 0
+
+
+def test_date_range_matches_baseline_between(df):
+    # The viewer's date_input hands back dates; the baseline filtered with between(start, end) at midnight
+    index = FilterIndex(df)
+    days = sorted(set(df['ShowDateTime'].dt.date))
+    rng = random.Random(5)
+    for _ in range(50):
+        start, end = sorted(rng.sample(days, 2))
+        expected = np.flatnonzero(df['ShowDateTime'].between(pd.to_datetime(start), pd.to_datetime(end)).to_numpy())
+        np.testing.assert_array_equal(index.select({'ShowDateTime': date_range((start, end))}), expected)
+
+
+def test_date_range_stops_at_midnight_of_end_date():
+    shows = pd.to_datetime(['2024-09-24 10:00', '2024-09-25 00:00', '2024-09-25 09:30', '2024-09-26 00:00'])
+    index = FilterIndex(pd.DataFrame({'ShowDateTime': shows}))
+    state = {'ShowDateTime': date_range((pd.Timestamp('2024-09-24').date(), pd.Timestamp('2024-09-25').date()))}
+    assert index.select(state).tolist() == [0, 1]
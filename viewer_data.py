@@ -0,0 +1,523 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Snapshot index kept between viewer sessions, so exports are listed (and summarised) once
+MANIFEST_PATH = ".snapshot_manifest.json"
+MANIFEST_VERSION = 1
+
+# Workbook exports are named <City>_<YYYYMMDD_HHMMSS>.xlsx
+EXPORT_PATTERN = re.compile(r'^(?P<city>.+)_(?P<snapshot>\d{8}_\d{6})\.xlsx$')
+
+# Export city names -> region codes used by data/<timestamp>/<CODE>.json and the snapshot store
+CITY_ALIASES = {
+    'BANGALORE': 'BANG',
+    'BENGALURU': 'BANG',
+    'CHENNAI': 'CHEN',
+    'HYDERABAD': 'HYD',
+}
+
+# Preferred source when the same city and snapshot appear more than once
+SOURCE_PRIORITY = {'store': 0, 'json': 1, 'xlsx': 2}
+
+SUMMARY_COLUMNS = ['MaxSeats', 'BookedTickets', 'BookedGross', 'TotalGross']
+
+# Download formats offered by the viewer and their MIME types
+DOWNLOAD_FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+DOWNLOAD_DIR = os.path.join(tempfile.gettempdir(), 'showtimes_downloads')
+
+# Sheet names of the detailed and aggregated tables: current exports first, then the older Sheet1/Sheet2 layout
+DETAIL_SHEETS = ('DetailedData', 'Sheet1')
+AGGREGATED_SHEETS = ('AggregatedData', 'Sheet2')
+
+# Low-cardinality string columns loaded as pandas categoricals
+CATEGORICAL_COLUMNS = ['VenueName', 'ShowTime', 'Category']
+
+
+def columnar_paths(path):
+    """
+    Returns:
+        tuple: Parquet sidecar paths (detailed, aggregated) of a workbook or Parquet export.
+    """
+    stem, extension = os.path.splitext(path)
+    if extension == '.parquet':
+        return path, f"{stem}_aggregated.parquet"
+    return f"{stem}.detailed.parquet", f"{stem}.aggregated.parquet"
+
+
+def _first_sheet(sheets, names):
+    for name in names:
+        if name in sheets:
+            return sheets[name]
+    return None
+
+
+def ensure_columnar(path):
+    """
+    Converts a workbook to Parquet sidecars the first time it is opened (or
+    after it changes), so openpyxl parses each workbook once rather than on
+    every cache miss of the viewer.
+    Args:
+        path (str): .xlsx export or .parquet file.
+    Returns:
+        tuple: (detailed, aggregated) Parquet paths; aggregated is None if there is none.
+    """
+    detailed, aggregated = columnar_paths(path)
+    if not path.endswith('.parquet'):
+        if not os.path.exists(detailed) or os.path.getmtime(detailed) < os.path.getmtime(path):
+            sheets = pd.read_excel(path, sheet_name=None, engine='openpyxl')
+            detail_df = _first_sheet(sheets, DETAIL_SHEETS)
+            if detail_df is None:
+                detail_df = next(iter(sheets.values()))
+            aggregated_df = _first_sheet(sheets, AGGREGATED_SHEETS)
+            detail_df.to_parquet(detailed, index=False, compression='zstd')
+            if aggregated_df is not None:
+                aggregated_df.to_parquet(aggregated, index=False, compression='zstd')
+            logger.info(f"Converted '{path}' to Parquet sidecars.")
+    return detailed, aggregated if os.path.exists(aggregated) else None
+
+
+def read_columnar(path, columns=None):
+    """
+    Reads a Parquet file memory-mapped, with CATEGORICAL_COLUMNS as pandas categoricals.
+    Returns:
+        pandas.DataFrame
+    """
+    schema = pq.read_schema(path)
+    categorical = [name for name in CATEGORICAL_COLUMNS if name in schema.names]
+    table = pq.read_table(path, columns=columns, memory_map=True, read_dictionary=categorical)
+    return table.to_pandas()
+
+
+def load_export(path):
+    """
+    Loads an export's detailed and aggregated tables through their columnar copies.
+    Returns:
+        tuple: (detailed DataFrame, aggregated DataFrame or None)
+    """
+    detailed, aggregated = ensure_columnar(path)
+    return read_columnar(detailed), read_columnar(aggregated) if aggregated else None
+
+
+def date_range(selected_dates):
+    """
+    Filter bounds of a two-date date_input selection. Both bounds are midnight, as with the
+    viewer's original between(start, end): rows later on the end date are not included.
+    Returns:
+        tuple: (low, high) as numpy datetime64.
+    """
+    low, high = (pd.Timestamp(date).to_datetime64() for date in selected_dates)
+    return low, high
+
+
+def filter_key(state):
+    """
+    Canonical, hashable form of a filter state {column: selection}.
+    """
+    return tuple(sorted(
+        (column, tuple(selection) if isinstance(selection, (list, tuple)) else selection)
+        for column, selection in state.items()
+    ))
+
+
+class FilterIndex:
+    """
+    Precomputed per-column structures for the viewer's sidebar filters.
+
+    Categorical columns keep their integer codes, so a multiselect becomes a
+    lookup of each row's code in a small boolean table instead of an isin
+    over strings; numeric columns keep a sorted order, so a range slider is
+    two binary searches. Selections that keep every value are skipped.
+    Masks are memoised per (column, selection) and results per whole filter
+    state: a rerun that moves one widget recomputes only that column's mask.
+    """
+
+    def __init__(self, df, cache_size=64):
+        self.df = df
+        self._codes = {}
+        self._categories = {}
+        self._has_missing = {}
+        self._sorted = {}
+        for column in df.columns:
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                self._codes[column] = series.cat.codes.to_numpy()
+                self._categories[column] = series.cat.categories
+                self._has_missing[column] = bool((self._codes[column] < 0).any())
+            elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+                values = series.to_numpy()
+                order = np.argsort(values, kind='stable')
+                self._sorted[column] = (order, values[order])
+        self._masks = OrderedDict()
+        self._results = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def options(self, column):
+        """
+        Returns:
+            list: Values offered in a multiselect for the column.
+        """
+        if column in self._categories:
+            return list(self._categories[column])
+        return self.df[column].dropna().unique().tolist()
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        if len(cache) > self._cache_size:
+            cache.popitem(last=False)
+
+    def _column_mask(self, column, selection):
+        key = (column, tuple(selection) if isinstance(selection, list) else selection)
+        mask = self._masks.get(key)
+        if mask is not None:
+            self._masks.move_to_end(key)
+            return mask
+        if column in self._codes:
+            wanted = np.zeros(len(self._categories[column]) + 1, dtype=bool)  # last slot: code -1 (missing)
+            wanted[self._categories[column].get_indexer(list(selection))] = True
+            wanted[-1] = False
+            mask = wanted[self._codes[column]]
+        elif column in self._sorted:
+            low, high = selection
+            order, values = self._sorted[column]
+            mask = np.zeros(len(self.df), dtype=bool)
+            mask[order[np.searchsorted(values, low, 'left'):np.searchsorted(values, high, 'right')]] = True
+        else:
+            mask = self.df[column].isin(list(selection)).to_numpy()
+        self._remember(self._masks, key, mask)
+        return mask
+
+    def _is_everything(self, column, selection):
+        if column in self._codes:
+            # isin drops rows with a missing value, so selecting every category only filters nothing without them
+            return not selection or (not self._has_missing[column]
+                                     and set(selection).issuperset(self._categories[column]))
+        if column in self._sorted:
+            # NaN/NaT sort last and fail any comparison, so a column with missing values is never skipped
+            values = self._sorted[column][1]
+            return not len(values) or (selection[0] <= values[0] and selection[1] >= values[-1])
+        return not selection
+
+    def select(self, state):
+        """
+        Row positions matching a filter state.
+        Args:
+            state (dict): Column -> list of accepted values, or (low, high) for numeric/date columns.
+        Returns:
+            numpy.ndarray: Positions of the matching rows, in row order.
+        """
+        key = filter_key(state)
+        with self._lock:
+            rows = self._results.get(key)
+            if rows is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return rows
+            self.misses += 1
+            mask = None
+            for column, selection in state.items():
+                if self._is_everything(column, selection):
+                    continue
+                column_mask = self._column_mask(column, selection)
+                mask = column_mask if mask is None else mask & column_mask
+            rows = np.arange(len(self.df)) if mask is None else np.flatnonzero(mask)
+            self._remember(self._results, key, rows)
+            return rows
+
+    def filtered(self, state):
+        """
+        Returns:
+            pandas.DataFrame: Rows matching the filter state (a view-sized take, not a copy of the whole frame).
+        """
+        return self.df.iloc[self.select(state)]
+
+
+class DownloadCache:
+    """
+    Filtered-data downloads built on demand and kept on disk, keyed by a
+    hash of the source, the filter state and the format, so moving a
+    filter costs nothing until a download is asked for, and asking again
+    for the same rows reuses the file. Workbooks are streamed by
+    excel_export.write_xlsx row by row; CSV and Parquet are written from
+    Arrow directly. Only the newest `max_files` downloads are kept.
+    """
+
+    def __init__(self, directory=DOWNLOAD_DIR, max_files=32):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, source, state, fmt):
+        """
+        Args:
+            source (tuple): Identifies the data version, e.g. (path, mtime).
+            state (dict): Filter state, as passed to FilterIndex.select.
+            fmt (str): One of DOWNLOAD_FORMATS.
+        Returns:
+            str: Where this download is (or will be) stored.
+        """
+        if fmt not in DOWNLOAD_FORMATS:
+            raise ValueError(f"Unsupported download format '{fmt}'.")
+        digest = hashlib.blake2b(repr((source, filter_key(state))).encode(), digest_size=12).hexdigest()
+        return os.path.join(self.directory, f"{digest}.{fmt}")
+
+    def cached(self, source, state, fmt):
+        """
+        Returns:
+            str: Path of an already built download, or None.
+        """
+        path = self.path(source, state, fmt)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # keeps recently used downloads from being pruned first
+        return path
+
+    def build(self, df, source, state, fmt):
+        """
+        Writes the download unless it is already cached.
+        Args:
+            df (pandas.DataFrame): The filtered rows.
+        Returns:
+            str: Path of the download.
+        """
+        path = self.cached(source, state, fmt)
+        if path is not None:
+            return path
+        path = self.path(source, state, fmt)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        if fmt == 'xlsx':
+            from excel_export import write_xlsx
+            write_xlsx([('Sheet1', table)], temporary)
+        elif fmt == 'csv':
+            pcsv.write_csv(table, temporary)
+        else:
+            pq.write_table(table, temporary, compression='zstd')
+        os.replace(temporary, path)
+        logger.info(f"Built {fmt} download of {len(df)} rows: {path}")
+        self._prune()
+        return path
+
+    def _prune(self):
+        with self._lock:
+            paths = sorted(
+                (os.path.join(self.directory, name) for name in os.listdir(self.directory) if not name.endswith('.tmp')),
+                key=os.path.getmtime,
+            )
+            for path in paths[:-self.max_files]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def city_code(name):
+    name = name.upper()
+    return CITY_ALIASES.get(name, name)
+
+
+class SnapshotCatalog:
+    """
+    Index of every snapshot the viewer can show, across three sources:
+    workbook exports (<City>_<timestamp>.xlsx), saved responses
+    (data/<timestamp>/<CODE>.json) and the Parquet snapshot store.
+
+    Each (city, snapshot) is a partition. Listing partitions only touches
+    file names and mtimes, and the manifest is cached on disk, so a restart
+    does not reopen any workbook. A partition is read only when a query
+    needs it, with just the columns it needs, and its totals are written
+    back to the manifest, so a trend over a time range reads each partition
+    at most once until its file changes.
+    """
+
+    def __init__(self, root='.', data_dir='data', store_root=None, manifest_path=MANIFEST_PATH):
+        from snapshot_store import DEFAULT_ROOT, SnapshotStore
+        self.root = root
+        self.data_dir = os.path.join(root, data_dir)
+        self.store = SnapshotStore(os.path.join(root, store_root or DEFAULT_ROOT))
+        self.manifest_path = os.path.join(root, manifest_path)
+        self._entries = {}  # path -> partition entry
+        self._lock = threading.Lock()
+        self.generation = 0  # bumped whenever a rescan changes the partitions
+        self._load_manifest()
+        self.refresh()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self._entries = manifest['partitions']
+        except (OSError, ValueError, KeyError):
+            self._entries = {}
+
+    def _save_manifest(self):
+        temporary = f"{self.manifest_path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'partitions': self._entries}, f)
+        os.replace(temporary, self.manifest_path)
+
+    def _scan(self):
+        # Yields (kind, path, city, snapshot) for every partition on disk
+        for path in glob.glob(os.path.join(self.root, '*.xlsx')):
+            match = EXPORT_PATTERN.match(os.path.basename(path))
+            if match:
+                yield 'xlsx', path, city_code(match['city']), match['snapshot']
+        for directory in glob.glob(os.path.join(self.data_dir, '*_*')):
+            snapshot = os.path.basename(directory)
+            if not re.fullmatch(r'\d{8}_\d{6}', snapshot):
+                continue
+            for path in glob.glob(os.path.join(directory, '*.json')) + glob.glob(os.path.join(directory, '*.json.gz')):
+                yield 'json', path, os.path.basename(path).split('.', 1)[0], snapshot
+        for snapshot in self.store.snapshots():
+            for region in self.store.regions(snapshot):
+                path = os.path.dirname(self.store.region_path(snapshot, region))
+                yield 'store', path, region, snapshot
+
+    def refresh(self):
+        """
+        Re-lists the sources, keeping the cached totals of unchanged partitions.
+        Returns:
+            int: Number of partitions.
+        """
+        from occupancy_series import snapshot_epoch
+        with self._lock:
+            entries = {}
+            for kind, path, city, snapshot in self._scan():
+                mtime = os.path.getmtime(path)
+                entry = self._entries.get(path)
+                if entry is None or entry['mtime'] != mtime:
+                    entry = {
+                        'kind': kind, 'path': path, 'city': city, 'snapshot': snapshot,
+                        'epoch': snapshot_epoch(snapshot), 'mtime': mtime, 'summary': None,
+                    }
+                entries[path] = entry
+            changed = entries != self._entries
+            self._entries = entries
+            if changed:
+                self.generation += 1
+                self._save_manifest()
+            logger.info(f"Indexed {len(entries)} snapshot partitions.")
+            return len(entries)
+
+    def cities(self):
+        return sorted({entry['city'] for entry in self._entries.values()})
+
+    def partitions(self, city, since=None, until=None):
+        """
+        Partitions of a city within [since, until] (epoch seconds), oldest
+        first, with one source per snapshot.
+        Returns:
+            list: Manifest entries.
+        """
+        chosen = {}
+        for entry in self._entries.values():
+            if entry['city'] != city:
+                continue
+            if (since is not None and entry['epoch'] < since) or (until is not None and entry['epoch'] > until):
+                continue
+            current = chosen.get(entry['snapshot'])
+            if current is None or SOURCE_PRIORITY[entry['kind']] < SOURCE_PRIORITY[current['kind']]:
+                chosen[entry['snapshot']] = entry
+        return [chosen[snapshot] for snapshot in sorted(chosen)]
+
+    def load(self, entry, columns=None):
+        """
+        Reads one partition.
+        Args:
+            entry (dict): Manifest entry from partitions().
+            columns (list): Columns to read (None reads all).
+        Returns:
+            pandas.DataFrame
+        """
+        if entry['kind'] == 'xlsx':
+            detailed, _ = ensure_columnar(entry['path'])
+            return read_columnar(detailed, columns)
+        if entry['kind'] == 'store':
+            table = self.store.read(snapshots=[entry['snapshot']], regions=[entry['city']], columns=columns)
+            return table.to_pandas()
+        from showtime_parser import parse_file
+        df = pd.DataFrame(parse_file(entry['path']))
+        return df[columns] if columns else df
+
+    def summary(self, entry, save=True):
+        """
+        Args:
+            save (bool): Write a newly computed summary to the manifest right away.
+        Returns:
+            dict: Row count and SUMMARY_COLUMNS totals of a partition, computed once per file version.
+        """
+        summary = entry.get('summary')
+        if summary is None:
+            df = self.load(entry, SUMMARY_COLUMNS)
+            summary = {'Rows': len(df), **{name: int(df[name].sum()) if name in df else 0 for name in SUMMARY_COLUMNS}}
+            with self._lock:
+                entry['summary'] = summary
+                if save:
+                    self._save_manifest()
+        return summary
+
+    def trend(self, city, since=None, until=None):
+        """
+        Per-snapshot totals and occupancy of a city.
+        Returns:
+            pandas.DataFrame: One row per snapshot with Snapshot, Epoch, Source, Rows,
+            SUMMARY_COLUMNS and Occupancy (% of seats booked).
+        """
+        partitions = self.partitions(city, since, until)
+        missing = any(entry['summary'] is None for entry in partitions)
+        rows = [
+            {'Snapshot': entry['snapshot'], 'Epoch': entry['epoch'], 'Source': entry['kind'], **self.summary(entry, save=False)}
+            for entry in partitions
+        ]
+        if missing:
+            with self._lock:
+                self._save_manifest()
+        df = pd.DataFrame(rows, columns=['Snapshot', 'Epoch', 'Source', 'Rows'] + SUMMARY_COLUMNS)
+        df['Occupancy'] = (100 * df['BookedTickets'] / df['MaxSeats'].where(df['MaxSeats'] > 0)).round(2)
+        return df
+
+    def venue_trend(self, city, since=None, until=None, venues=None):
+        """
+        Occupancy per venue and snapshot, reading only VenueName and seat
+        counts from the partitions in range.
+        Returns:
+            pandas.DataFrame: Snapshot, Epoch, VenueName, MaxSeats, BookedTickets, Occupancy.
+        """
+        frames = []
+        for entry in self.partitions(city, since, until):
+            df = self.load(entry, ['VenueName', 'MaxSeats', 'BookedTickets'])
+            if venues:
+                df = df[df['VenueName'].isin(venues)]
+            grouped = df.groupby('VenueName', observed=True, as_index=False)[['MaxSeats', 'BookedTickets']].sum()
+            grouped.insert(0, 'Epoch', entry['epoch'])
+            grouped.insert(0, 'Snapshot', entry['snapshot'])
+            frames.append(grouped)
+        if not frames:
+            return pd.DataFrame(columns=['Snapshot', 'Epoch', 'VenueName', 'MaxSeats', 'BookedTickets', 'Occupancy'])
+        df = pd.concat(frames, ignore_index=True)
+        df['VenueName'] = df['VenueName'].astype(str)
+        df['Occupancy'] = (100 * df['BookedTickets'] / df['MaxSeats'].where(df['MaxSeats'] > 0)).round(2)
+        return df